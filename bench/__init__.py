@@ -0,0 +1,45 @@
+"""Performance benchmarks for the controller firmware and the host tools.
+
+Everything runs on a Linux machine without hardware:
+
+* :mod:`bench.decode`: host decode throughput of the text and binary
+  streams, for the incremental decoders and the NumPy batch decoder.
+* :mod:`bench.latency`: end-to-end latency of samples written into a pty
+  and read back through ``AsyncCopClient``.
+* :mod:`bench.firmware`: host CPU cost of each firmware stage, from the
+  host build (``host/bench.cpp``), for the float and fixed-point variants.
+* :mod:`bench.avr`: CPU cycles of the same stages and of one ``loop()`` per
+  mode on an emulated Nano (``bench/avr/``), and the headroom left in the
+  frame budget.
+
+``python -m bench.run`` writes every result to one JSON file, and
+``python -m bench.compare`` compares two such files, e.g. from two commits::
+
+    python -m bench.run                      # bench/results/<commit>.json
+    python -m bench.compare bench/results/a1b2c3d.json bench/results/e4f5a6b.json
+
+Each result is ``{"value": ..., "unit": ..., "better": "higher" | "lower"}``
+under a dotted name such as ``decode.binary`` or ``firmware.fixed.calc_cop``.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict
+
+Results = Dict[str, Dict[str, object]]
+
+
+def result(value: float, unit: str, better: str) -> Dict[str, object]:
+    """One measurement; ``better`` is ``"higher"`` or ``"lower"``."""
+    return {"value": value, "unit": unit, "better": better}
+
+
+def best_time(fn: Callable[[], object], repeats: int = 5) -> float:
+    """Fastest of ``repeats`` calls of ``fn``, seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,42 @@
+"""Cycle counts of the firmware's per-frame path on an emulated Nano.
+
+Builds the sketch for the ATmega328P with ``COP_AVR_BENCH=1`` and runs it
+under simavr with ``cop_avr_bench`` (see ``bench/avr/cop_avr_bench.c``),
+for the float and the ``COP_FIXED_POINT`` build. Unlike
+:mod:`bench.firmware`, these are the board's own numbers: the slowest
+call of each stage in CPU cycles at 16 MHz, for one ``loop()`` that handled
+a frame in each mode, the acquisition interrupt, the outlier filter, the
+CoP, each output format and the calibration command, plus the headroom
+each mode leaves in the 200000-cycle budget of one frame at 80 SPS.
+
+Needs ``make``, ``arduino-cli`` with the ``arduino:avr`` core and the HX711
+library, and simavr; see ``bench/avr/Makefile``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+
+from .. import Results, result
+
+_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run(quick: bool = False) -> Results:
+    out: Results = {}
+    for fixed in (0, 1):
+        subprocess.check_call(["make", "-s", "-C", _DIR, "FIXED=%d" % fixed],
+                              stdout=subprocess.DEVNULL)
+        variant = "fixed" if fixed else "float"
+        elf = os.path.join(_DIR, "build", variant, "cop_controller.ino.elf")
+        command = [os.path.join(_DIR, "build", "cop_avr_bench"), elf]
+        if quick:
+            command.insert(1, "-q")
+        report = json.loads(subprocess.check_output(command))
+        for stage, cycles in report["stages"].items():
+            out["avr.%s.%s" % (variant, stage)] = result(cycles["max"], "cycles", "lower")
+        for mode, percent in report["headroom"].items():
+            out["avr.%s.headroom.%s" % (variant, mode)] = result(percent, "%", "higher")
+    return out
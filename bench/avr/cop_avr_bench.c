@@ -0,0 +1,385 @@
+/**
+ * @file   cop_avr_bench.c
+ * @brief  Cycle counts of the firmware's hot path on an emulated ATmega328P.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-15
+ *
+ * Runs the sketch, built with COP_AVR_BENCH=1, under simavr at 16 MHz with
+ * four HX711 modules modelled at the pin level: each converts at RATE_SPS,
+ * pulls DOUT low when a conversion is ready and shifts its 24 bits out on
+ * the rising SCK edges, so the real read path and data-ready interrupt run
+ * unchanged. A fixed scenario boots the controller, idles, streams each of
+ * r, c, b and a, and calibrates with 'k'. Every BENCH_BEGIN/BENCH_END pair
+ * written to GPIOR0 (see avr_bench.h) becomes one sample of its span, and
+ * the result is printed as one JSON object of this shape:
+ *
+ *     {"f_cpu": 16000000, "budget_cycles": 200000, "missed": <conversions>,
+ *      "stages": {"<span>": {"count": <n>, "min": <cycles>,
+ *                            "mean": <cycles>, "max": <cycles>}, ...},
+ *      "headroom": {"<mode>": <percent of budget_cycles>, ...}}
+ *
+ * Spans exclude the acquisition interrupts that land inside them, which
+ * are reported on their own as "acquire"; interrupt entry and exit and the
+ * pin-change interrupts of non-ready edges, a few dozen cycles each, are
+ * not separated. Output spans include any wait for room in the 64-byte
+ * Serial transmit buffer, as on the board. "headroom" is the share of the
+ * frame budget left by the slowest loop() that handled a frame in each
+ * mode plus the slowest acquisition.
+ *
+ * Usage: cop_avr_bench [-q] [-v] cop_controller.ino.elf
+ *   -q  shorter scenario
+ *   -v  copy the sketch's Serial output to stderr
+ *
+ * Built by bench/avr/Makefile; bench/avr/__init__.py runs both variants.
+ */
+
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+#include <simavr/avr_ioport.h>
+#include <simavr/avr_uart.h>
+#include <simavr/sim_avr.h>
+#include <simavr/sim_cycle_timers.h>
+#include <simavr/sim_elf.h>
+#include <simavr/sim_io.h>
+
+#include "../../cop_controller/avr_bench.h"
+
+/// Nano clock.
+#define F_CPU_HZ 16000000UL
+
+/// HX711 output rate with RATE tied high.
+#define RATE_SPS 80
+
+/// Cycles between conversions, the budget of one frame.
+#define BUDGET_CYCLES (F_CPU_HZ / RATE_SPS)
+
+/// GPIOR0 in the data address space of the ATmega328P.
+#define GPIOR0_ADDR 0x3E
+
+/// Deepest nesting of spans: loop(), a stage, the interrupt.
+#define STACK_MAX 8
+
+/// Modules on the plate.
+#define NUM_SCALES 4
+
+/// Raw counts of the empty plate, per module.
+static const int32_t OFFSETS[NUM_SCALES] = {84000, -41500, 131000, 17200};
+
+/// Span names, by marker id; ids without a name are not reported.
+static const char* const NAMES[BENCH_MARKER_COUNT] = {
+    [BENCH_LOOP_SPIN] = "loop_spin",
+    [BENCH_LOOP_IDLE] = "loop_idle",
+    [BENCH_LOOP_READINGS] = "loop_readings",
+    [BENCH_LOOP_COP] = "loop_cop",
+    [BENCH_LOOP_BINARY] = "loop_binary",
+    [BENCH_LOOP_ALL] = "loop_all",
+    [BENCH_ACQUIRE] = "acquire",
+    [BENCH_FILTER] = "filter_frame",
+    [BENCH_COP] = "compute_cop",
+    [BENCH_OUTPUT_READINGS] = "print_readings",
+    [BENCH_OUTPUT_COP] = "print_cop",
+    [BENCH_OUTPUT_BINARY] = "print_binary",
+    [BENCH_OUTPUT_ALL] = "print_all",
+    [BENCH_CALIBRATE] = "calibrate_all",
+    [BENCH_FINISH_CALIBRATION] = "finish_calibration",
+};
+
+/// One step of the scenario: send a command, then run.
+struct Step {
+    const char* command;   ///< Line sent to the sketch, or NULL
+    int32_t load;          ///< Counts added to every module
+    double seconds;        ///< Emulated time to run afterwards
+};
+
+static const struct Step SCENARIO[] = {
+    {NULL, 0, 3.0},        // boot, tare and settle
+    {NULL, 0, 1.0},        // idle
+    {"r", 0, 2.0},
+    {"c", 0, 2.0},
+    {"b", 0, 2.0},
+    {"a", 0, 2.0},
+    {"s", 25000, 0.5},     // put a load on, idle
+    {"k 10", 25000, 1.0},  // calibrate; the job takes JOB_FRAMES frames
+    {"s", 0, 0.5},
+};
+
+/// Samples of one span.
+struct Stat {
+    uint64_t count;
+    uint64_t sum;
+    uint64_t min;
+    uint64_t max;
+};
+
+/// An open span.
+struct Open {
+    uint8_t id;
+    avr_cycle_count_t start;
+    avr_cycle_count_t nested;   ///< Cycles spent in interrupts inside the span
+};
+
+static struct Stat stats[BENCH_MARKER_COUNT];
+static struct Open stack[STACK_MAX];
+static int depth;
+static unsigned long unmatched;
+
+/// The four modules, which share SCK and convert in step.
+static struct {
+    avr_irq_t* dout[NUM_SCALES];
+    int32_t data[NUM_SCALES];
+    int32_t load;
+    int ready;          ///< A conversion waits to be read
+    int pulses;         ///< SCK pulses of the read in progress
+    uint32_t sck;       ///< Last SCK level
+    unsigned long missed;
+    uint32_t noise;     ///< LCG state
+} hx;
+
+static int verbose;
+
+/**
+ * @brief  Record the end of the innermost span that @p id closes.
+ */
+static void close_span(avr_t* avr, uint8_t id) {
+    // The loop() span opens as BENCH_LOOP and closes as whatever it did
+    uint8_t begin = (id >= BENCH_LOOP_SPIN && id <= BENCH_LOOP_ALL) ? BENCH_LOOP : id;
+    int d = depth;
+    while (d > 0 && stack[d - 1].id != begin) {
+        d--;
+    }
+    if (d == 0) {
+        unmatched++;
+        return;
+    }
+    unmatched += depth - d;
+    depth = d - 1;
+
+    avr_cycle_count_t total = avr->cycle - stack[depth].start;
+    uint64_t cycles = total - stack[depth].nested;
+    if (id == BENCH_ACQUIRE) {
+        for (int i = 0; i < depth; i++) {
+            stack[i].nested += total;
+        }
+    }
+
+    struct Stat* s = &stats[id];
+    if (s->count == 0 || cycles < s->min) {
+        s->min = cycles;
+    }
+    if (cycles > s->max) {
+        s->max = cycles;
+    }
+    s->sum += cycles;
+    s->count++;
+}
+
+/**
+ * @brief  A write to GPIOR0: open or close a span.
+ */
+static void marker_write(avr_t* avr, avr_io_addr_t addr, uint8_t v, void* param) {
+    (void)param;
+    avr->data[addr] = v;
+    uint8_t id = v & ~BENCH_END_FLAG;
+    if (id == 0 || id >= BENCH_MARKER_COUNT) {
+        return;
+    }
+    if (v & BENCH_END_FLAG) {
+        close_span(avr, id);
+    } else if (depth < STACK_MAX) {
+        stack[depth].id = id;
+        stack[depth].start = avr->cycle;
+        stack[depth].nested = 0;
+        depth++;
+    } else {
+        unmatched++;
+    }
+}
+
+/**
+ * @brief  Latch a new conversion and pull DOUT low.
+ */
+static avr_cycle_count_t hx_convert(avr_t* avr, avr_cycle_count_t when, void* param) {
+    (void)param;
+    if (hx.ready) {
+        hx.missed++;
+    }
+    for (int i = 0; i < NUM_SCALES; i++) {
+        hx.noise = hx.noise * 1103515245u + 12345u;
+        int32_t noise = (int32_t)((hx.noise >> 16) % 201) - 100;
+        hx.data[i] = (OFFSETS[i] + hx.load + noise) & 0xFFFFFF;
+        avr_raise_irq(hx.dout[i], 0);
+    }
+    hx.ready = 1;
+    hx.pulses = 0;
+    return when + avr_usec_to_cycles(avr, 1000000 / RATE_SPS);
+}
+
+/**
+ * @brief  SCK changed; a rising edge shifts every module by one bit.
+ */
+static void sck_notify(avr_irq_t* irq, uint32_t value, void* param) {
+    (void)irq;
+    (void)param;
+    int rising = value && !hx.sck;
+    hx.sck = value;
+    if (!rising || !hx.ready) {
+        return;
+    }
+    if (hx.pulses < 24) {
+        int shift = 23 - hx.pulses;
+        for (int i = 0; i < NUM_SCALES; i++) {
+            avr_raise_irq(hx.dout[i], (hx.data[i] >> shift) & 1);
+        }
+        hx.pulses++;
+    } else {
+        // The gain pulse; DOUT stays high until the next conversion
+        for (int i = 0; i < NUM_SCALES; i++) {
+            avr_raise_irq(hx.dout[i], 1);
+        }
+        hx.ready = 0;
+    }
+}
+
+/**
+ * @brief  A byte the sketch sent over Serial.
+ */
+static void uart_notify(avr_irq_t* irq, uint32_t value, void* param) {
+    (void)irq;
+    (void)param;
+    if (verbose) {
+        fputc((int)value, stderr);
+    }
+}
+
+/**
+ * @brief  Run the core for @p seconds of emulated time.
+ * @return false if the sketch stopped or crashed.
+ */
+static int run_for(avr_t* avr, double seconds) {
+    avr_cycle_count_t end = avr->cycle + (avr_cycle_count_t)(seconds * avr->frequency);
+    while (avr->cycle < end) {
+        int state = avr_run(avr);
+        if (state == cpu_Done || state == cpu_Crashed) {
+            return 0;
+        }
+    }
+    return 1;
+}
+
+static void usage(void) {
+    fprintf(stderr, "usage: cop_avr_bench [-q] [-v] cop_controller.ino.elf\n");
+    exit(2);
+}
+
+int main(int argc, char** argv) {
+    int quick = 0;
+    int opt;
+    while ((opt = getopt(argc, argv, "qv")) != -1) {
+        if (opt == 'q') {
+            quick = 1;
+        } else if (opt == 'v') {
+            verbose = 1;
+        } else {
+            usage();
+        }
+    }
+    if (optind != argc - 1) {
+        usage();
+    }
+
+    elf_firmware_t firmware;
+    memset(&firmware, 0, sizeof firmware);
+    if (elf_read_firmware(argv[optind], &firmware) != 0) {
+        fprintf(stderr, "cop_avr_bench: cannot read %s\n", argv[optind]);
+        return 1;
+    }
+    avr_t* avr = avr_make_mcu_by_name("atmega328p");
+    if (!avr) {
+        fprintf(stderr, "cop_avr_bench: simavr has no atmega328p\n");
+        return 1;
+    }
+    avr_init(avr);
+    avr_load_firmware(avr, &firmware);
+    avr->frequency = F_CPU_HZ;
+
+    avr_register_io_write(avr, GPIOR0_ADDR, marker_write, NULL);
+
+    // SCK on D6 (PD6); DOUT on D7 (PD7) and D8-D10 (PB0-PB2), idle high
+    avr_irq_register_notify(avr_io_getirq(avr, AVR_IOCTL_IOPORT_GETIRQ('D'), 6), sck_notify, NULL);
+    hx.dout[0] = avr_io_getirq(avr, AVR_IOCTL_IOPORT_GETIRQ('D'), 7);
+    for (int i = 1; i < NUM_SCALES; i++) {
+        hx.dout[i] = avr_io_getirq(avr, AVR_IOCTL_IOPORT_GETIRQ('B'), i - 1);
+    }
+    for (int i = 0; i < NUM_SCALES; i++) {
+        avr_raise_irq(hx.dout[i], 1);
+    }
+    hx.noise = 1;
+    avr_cycle_timer_register_usec(avr, 1000000 / RATE_SPS, hx_convert, NULL);
+
+    // Serial: keep simavr from echoing it, and listen instead
+    uint32_t flags = 0;
+    avr_ioctl(avr, AVR_IOCTL_UART_GET_FLAGS('0'), &flags);
+    flags &= ~AVR_UART_FLAG_STDIO;
+    avr_ioctl(avr, AVR_IOCTL_UART_SET_FLAGS('0'), &flags);
+    avr_irq_register_notify(avr_io_getirq(avr, AVR_IOCTL_UART_GETIRQ('0'), UART_IRQ_OUTPUT),
+                            uart_notify, NULL);
+    avr_irq_t* uart_in = avr_io_getirq(avr, AVR_IOCTL_UART_GETIRQ('0'), UART_IRQ_INPUT);
+
+    for (size_t s = 0; s < sizeof SCENARIO / sizeof SCENARIO[0]; s++) {
+        const struct Step* step = &SCENARIO[s];
+        hx.load = step->load;
+        if (step->command) {
+            for (const char* c = step->command; *c; c++) {
+                avr_raise_irq(uart_in, (uint8_t)*c);
+            }
+            avr_raise_irq(uart_in, '\n');
+        }
+        if (!run_for(avr, quick ? step->seconds / 4 : step->seconds)) {
+            fprintf(stderr, "cop_avr_bench: the sketch stopped at step %zu\n", s);
+            return 1;
+        }
+        if (s == 0) {
+            hx.missed = 0;   // nothing reads the modules until setup() is done
+        }
+    }
+    if (unmatched) {
+        fprintf(stderr, "cop_avr_bench: %lu unmatched markers\n", unmatched);
+    }
+
+    printf("{\"f_cpu\": %lu, \"budget_cycles\": %lu, \"missed\": %lu, \"stages\": {",
+           F_CPU_HZ, BUDGET_CYCLES, hx.missed);
+    int first = 1;
+    for (int id = 0; id < BENCH_MARKER_COUNT; id++) {
+        const struct Stat* st = &stats[id];
+        if (!NAMES[id] || st->count == 0) {
+            continue;
+        }
+        printf("%s\"%s\": {\"count\": %llu, \"min\": %llu, \"mean\": %.1f, \"max\": %llu}",
+               first ? "" : ", ", NAMES[id], (unsigned long long)st->count,
+               (unsigned long long)st->min, (double)st->sum / st->count,
+               (unsigned long long)st->max);
+        first = 0;
+    }
+
+    // Slowest frame of each mode: its loop() plus the read that produced it
+    static const char* const MODES[] = {"idle", "readings", "cop", "binary", "all"};
+    printf("}, \"headroom\": {");
+    first = 1;
+    for (int m = 0; m < 5; m++) {
+        const struct Stat* st = &stats[BENCH_LOOP_IDLE + m];
+        if (st->count == 0) {
+            continue;
+        }
+        double used = (double)(st->max + stats[BENCH_ACQUIRE].max) / BUDGET_CYCLES;
+        printf("%s\"%s\": %.1f", first ? "" : ", ", MODES[m], 100.0 * (1.0 - used));
+        first = 0;
+    }
+    printf("}}\n");
+
+    avr_terminate(avr);
+    return 0;
+}
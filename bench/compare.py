@@ -0,0 +1,62 @@
+"""Compare two benchmark result files.
+
+    python -m bench.compare before.json after.json
+    python -m bench.compare before.json after.json --threshold 10
+
+Prints every result present in both files with its relative change, marked
+``slower`` or ``faster`` when it moved by more than the threshold (5% by
+default) in the bad or good direction. Exits with status 1 if anything got
+slower, so it can gate a change in a script.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+
+def compare(before: Dict, after: Dict, threshold: float) -> Tuple[List[str], int]:
+    """Table lines and the number of regressions between two reports."""
+    old, new = before["results"], after["results"]
+    names = [n for n in new if n in old]
+    width = max([len(n) for n in names] + [4])
+    lines = ["%-*s %14s %14s %8s" % (width, "name", "before", "after", "change")]
+    regressions = 0
+    for name in names:
+        a, b = old[name]["value"], new[name]["value"]
+        change = (b - a) / a * 100.0 if a else 0.0
+        worse = change < 0 if new[name]["better"] == "higher" else change > 0
+        mark = ""
+        if abs(change) > threshold:
+            mark = "slower" if worse else "faster"
+            regressions += worse
+        lines.append("%-*s %14.6g %14.6g %+7.1f%% %s %s" % (
+            width, name, a, b, change, new[name]["unit"], mark))
+    for name in sorted(set(old) ^ set(new)):
+        lines.append("%-*s only in %s" % (width, name, "before" if name in old else "after"))
+    return lines, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=5.0,
+                        help="percent change to report (default 5)")
+    args = parser.parse_args(argv)
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    for report in (before, after):
+        if report.get("quick"):
+            print("note: %s was a --quick run" % (report.get("commit") or "a report")[:10])
+    lines, regressions = compare(before, after, args.threshold)
+    print("\n".join(lines))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Host decode throughput of each stream format, in frames per second.
+
+The input is one minute of 80 SPS output in each format, written the way
+the firmware writes it, and fed to the decoders in 4 KiB reads as a serial
+port would deliver it. The batch decoders get the whole buffer at once.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import List
+
+from cop_client.batch import decode_binary, decode_text
+from cop_client.client import StreamDecoder
+from cop_client.protocol import SampleFrame, encode_sample
+
+from . import Results, best_time, result
+
+#: Samples per input buffer: one minute at 80 SPS.
+SAMPLES = 4800
+
+#: Bytes per simulated serial read.
+READ_SIZE = 4096
+
+
+def _samples(count: int) -> List[SampleFrame]:
+    frames = []
+    for n in range(count):
+        x = 0.3 * math.sin(n / 50.0)
+        y = 0.2 * math.cos(n / 70.0)
+        w = tuple(17.5 * (1 + sx * x) * (1 + sy * y)
+                  for sx, sy in ((-1, 1), (1, 1), (1, -1), (-1, -1)))
+        frames.append(SampleFrame(n & 0xFFFF, 12500 * n, 0, w, x, y))
+    return frames
+
+
+def _text(frames: List[SampleFrame], mode: str) -> bytes:
+    lines = []
+    for f in frames:
+        head = "%d,%d," % (f.seq, f.timestamp_us)
+        if mode == "r":
+            lines.append(head + ",".join("%.1f" % w for w in f.weights))
+        elif mode == "c":
+            lines.append(head + "(%.3f, %.3f)" % (f.cop_x, f.cop_y))
+        else:
+            lines.append(head + ",".join("%.1f" % w for w in f.weights)
+                         + ",%.1f,%.3f,%.3f" % (sum(f.weights), f.cop_x, f.cop_y))
+    return ("\r\n".join(lines) + "\r\n").encode("ascii")
+
+
+def _incremental(data: bytes, binary: bool) -> int:
+    decoder = StreamDecoder()
+    decoder.set_binary(binary)
+    count = 0
+    for i in range(0, len(data), READ_SIZE):
+        count += len(decoder.feed(data[i:i + READ_SIZE]))
+    return count
+
+
+def run(quick: bool = False) -> Results:
+    frames = _samples(SAMPLES // 4 if quick else SAMPLES)
+    n = len(frames)
+    repeats = 2 if quick else 5
+    streams = {mode: _text(frames, mode) for mode in "rca"}
+    streams["binary"] = b"".join(encode_sample(f) for f in frames)
+
+    out: Results = {}
+    for name, data in streams.items():
+        binary = name == "binary"
+        assert _incremental(data, binary) == n
+        seconds = best_time(lambda: _incremental(data, binary), repeats)
+        out["decode.%s" % ("binary" if binary else "text_" + name)] = result(
+            n / seconds, "frames/s", "higher")
+    text = streams["a"]
+    assert len(decode_text(text).samples) == n
+    out["decode.batch_text_a"] = result(n / best_time(lambda: decode_text(text), repeats),
+                                        "frames/s", "higher")
+    binary = streams["binary"]
+    assert len(decode_binary(binary)) == n
+    out["decode.batch_binary"] = result(n / best_time(lambda: decode_binary(binary), repeats),
+                                        "frames/s", "higher")
+    return out
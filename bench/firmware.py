@@ -0,0 +1,33 @@
+"""Host CPU cost of each firmware stage, for both numeric variants.
+
+Builds ``host/`` with ``make bench`` and runs ``cop_bench`` (see
+``host/bench.cpp``) for the float and the ``COP_FIXED_POINT`` build. The
+stages are the functions of the per-frame path: the outlier filter,
+tare and scale, decimation, the CoP, the CRC and the three output formats,
+plus one whole binary-streamed frame. Times are nanoseconds per call on the
+host CPU, so compare them between commits on the same machine; they are
+not Nano timings.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+
+from . import Results, result
+
+_HOST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "host")
+
+
+def run(quick: bool = False) -> Results:
+    out: Results = {}
+    for fixed in (0, 1):
+        subprocess.check_call(["make", "-s", "-C", _HOST_DIR, "bench", "FIXED=%d" % fixed],
+                              stdout=subprocess.DEVNULL)
+        variant = "fixed" if fixed else "float"
+        exe = os.path.join(_HOST_DIR, "build", variant, "cop_bench")
+        report = json.loads(subprocess.check_output([exe]))
+        for stage, ns in report["stages"].items():
+            out["firmware.%s.%s" % (variant, stage)] = result(ns, "ns", "lower")
+    return out
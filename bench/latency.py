@@ -0,0 +1,94 @@
+"""End-to-end sample latency through a pseudo-terminal.
+
+A writer thread plays the controller: it writes one sample every 12.5 ms
+into the master side of a pty, stamping ``timestamp_us`` with the host's
+monotonic clock at the moment of the write. An ``AsyncCopClient`` on the
+slave side decodes the samples, and the latency of each is the clock at
+decode minus its stamp. This covers the tty layer, the event loop wakeup,
+the read and the decoder, for the text ``r`` and ``a`` streams and the
+binary stream. Results are percentiles in microseconds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import tty
+from typing import List
+
+from cop_client.client import AsyncCopClient
+from cop_client.protocol import SampleFrame, encode_sample
+from cop_client.text import ReadingsFrame
+
+from . import Results, result
+
+#: Samples per stream format.
+SAMPLES = 800
+
+#: Sample period of the writer, seconds.
+PERIOD_S = 1.0 / 80
+
+
+def _now_us() -> int:
+    return time.monotonic_ns() // 1000
+
+
+def _encode(mode: str, seq: int, stamp: int) -> bytes:
+    if mode == "b":
+        return encode_sample(SampleFrame(seq, stamp, 0, (17.5, 17.5, 17.5, 17.5), 0.01, -0.02))
+    if mode == "r":
+        return b"%d,%d,17.5,17.5,17.5,17.5\r\n" % (seq, stamp)
+    return b"%d,%d,17.5,17.5,17.5,17.5,70.0,0.010,-0.020\r\n" % (seq, stamp)
+
+
+def _writer(fd: int, mode: str, count: int, started: threading.Event) -> None:
+    started.wait()
+    next_t = time.monotonic()
+    for seq in range(count):
+        next_t += PERIOD_S
+        time.sleep(max(0.0, next_t - time.monotonic()))
+        os.write(fd, _encode(mode, seq, _now_us() & 0xFFFFFFFF))
+
+
+async def _measure(mode: str, count: int) -> List[int]:
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    path = os.ttyname(slave)
+    started = threading.Event()
+    thread = threading.Thread(target=_writer, args=(master, mode, count, started), daemon=True)
+    latencies: List[int] = []
+    client = await AsyncCopClient.open(path)
+    try:
+        client.decoder.set_binary(mode == "b")
+        thread.start()
+        started.set()
+        while len(latencies) < count:
+            frames = await asyncio.wait_for(client.read_batch(), 5.0)
+            now = _now_us() & 0xFFFFFFFF
+            for frame in frames:
+                if isinstance(frame, (SampleFrame, ReadingsFrame)):
+                    latencies.append((now - frame.timestamp_us) & 0xFFFFFFFF)
+    finally:
+        client.close()
+        thread.join()
+        os.close(master)
+        os.close(slave)
+    return latencies
+
+
+def _percentile(values: List[int], p: float) -> float:
+    ordered = sorted(values)
+    return float(ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))])
+
+
+def run(quick: bool = False) -> Results:
+    count = SAMPLES // 4 if quick else SAMPLES
+    out: Results = {}
+    for mode, name in (("r", "text_r"), ("a", "text_a"), ("b", "binary")):
+        latencies = asyncio.run(_measure(mode, count))
+        for p in (50, 99):
+            out["latency.%s.p%d" % (name, p)] = result(_percentile(latencies, p), "us", "lower")
+        out["latency.%s.max" % name] = result(float(max(latencies)), "us", "lower")
+    return out
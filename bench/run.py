@@ -0,0 +1,96 @@
+"""Run the benchmark suites and write the results to a JSON file.
+
+    python -m bench.run                          # every suite
+    python -m bench.run decode latency --quick   # a subset, shorter runs
+    python -m bench.run --out before.json
+
+The file records the commit, whether the tree had local changes, the
+machine and the Python version next to the results, so that files from
+different commits can be told apart and compared with ``bench.compare``.
+A suite that cannot run here, e.g. ``firmware`` without a C++ compiler or
+``avr`` without simavr, is reported on stderr and left out.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, Optional
+
+from . import Results
+
+#: Suites in the order they run.
+SUITES = ("decode", "latency", "firmware", "avr")
+
+#: Version of the file layout.
+SCHEMA = 1
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.check_output(("git",) + args, cwd=_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(suites=SUITES, quick: bool = False) -> Dict[str, object]:
+    """Run ``suites`` and return the report."""
+    results: Results = {}
+    for name in suites:
+        module = importlib.import_module("bench." + name)
+        start = time.perf_counter()
+        try:
+            results.update(module.run(quick=quick))
+        except (OSError, subprocess.CalledProcessError) as e:
+            print("%s: skipped (%s)" % (name, e), file=sys.stderr)
+            continue
+        print("%s: %.1f s" % (name, time.perf_counter() - start), file=sys.stderr)
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "schema": SCHEMA,
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                    "cpus": os.cpu_count()},
+        "python": platform.python_version(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("suites", nargs="*", metavar="SUITE",
+                        help="suites to run: %s (default: all)" % ", ".join(SUITES))
+    parser.add_argument("--quick", action="store_true", help="shorter runs, noisier results")
+    parser.add_argument("--out", help="output file (default: bench/results/<commit>.json)")
+    args = parser.parse_args(argv)
+    for name in args.suites:
+        if name not in SUITES:
+            parser.error("unknown suite: %s" % name)
+
+    report = run(args.suites or SUITES, args.quick)
+    path = args.out
+    if path is None:
+        name = (report["commit"] or "unknown")[:10] + ("-dirty" if report["dirty"] else "")
+        path = os.path.join(_ROOT, "bench", "results", name + ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Host-side tools for the HX711 four-scale CoP controller."""
+
+from .client import AsyncCopClient, CopClient, StreamDecoder
+from .geometry import Geometry
+from .protocol import PacketDecoder, SampleFrame, StatusFrame, decode_packet
+from .text import (
+    CopFrame,
+    Message,
+    ReadingsFrame,
+    SettingsFrame,
+    SyncFrame,
+    TextDecoder,
+    parse_line,
+)
+
+__all__ = [
+    "AsyncCopClient",
+    "CopClient",
+    "CopFrame",
+    "Geometry",
+    "Message",
+    "PacketDecoder",
+    "ReadingsFrame",
+    "SampleFrame",
+    "SettingsFrame",
+    "StatusFrame",
+    "StreamDecoder",
+    "SyncFrame",
+    "TextDecoder",
+    "decode_packet",
+    "parse_line",
+]
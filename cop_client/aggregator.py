@@ -0,0 +1,386 @@
+"""Merge the streams of several controllers into multi-plate frames.
+
+:class:`Aggregator` runs one :class:`~cop_client.client.AsyncCopClient` per
+plate in a single event loop and emits a :class:`MergedFrame` for every tick
+of a common time grid (80 Hz by default). Each tick holds every plate's
+sample nearest that time, or None for a plate with nothing close.
+
+Samples are placed in host time through each plate's
+:class:`~cop_client.clock.DeviceClock`, fitted to its sync records, so
+plates are aligned by when the conversion happened rather than when the
+bytes arrived. Streams without device timestamps (firmware from before the
+``seq,t_us`` prefix) are placed by arrival time, spreading the samples of one
+read back over the sample period.
+
+A tick is emitted as soon as every plate has a sample at or after it, or
+``latency`` seconds after it at the latest, so a silent or unplugged plate
+delays the output by a bounded amount instead of stalling it.
+
+Given each plate's load-cell positions and the position of its centre in a
+common frame, the frame also carries the combined CoP of all plates, in mm.
+It needs the weights, so the plates must stream ``r``, ``a`` or ``b``.
+Plates are assumed to share the orientation of their axes. A plate's
+geometry defaults to the one stored on its controller (``g``).
+
+Usage::
+
+    plates = [Plate("/dev/ttyUSB0", origin=(-225.0, 0.0)),
+              Plate("/dev/ttyUSB1", origin=(225.0, 0.0))]
+    async with await Aggregator.open(plates) as agg:
+        async for merged in agg:
+            print(merged.time, merged.total, merged.cop_x, merged.cop_y)
+
+    python -m cop_client.aggregator /dev/ttyUSB0@-225,0 /dev/ttyUSB1@225,0 > merged.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Sequence, Tuple
+
+from .client import AsyncCopClient, Frame
+from .clock import DeviceClock
+from .geometry import Geometry
+from .protocol import SampleFrame
+from .text import CopFrame, ReadingsFrame, SyncFrame
+
+#: Samples per second of the merged stream.
+RATE = 80.0
+
+#: Longest a tick waits for a late plate, seconds.
+LATENCY_S = 0.1
+
+#: Wait for a reply to ``g`` when the geometry comes from the controller.
+GEOMETRY_TIMEOUT_S = 1.0
+
+# Frames that carry a sample
+_SAMPLES = (ReadingsFrame, CopFrame, SampleFrame)
+
+
+@dataclass
+class Plate:
+    """One controller of a multi-plate setup.
+
+    Attributes:
+        port: Serial port of the controller.
+        name: Label for output; the port by default.
+        geometry: Load-cell positions; None asks the controller.
+        origin: Position of the plate's centre in the common frame, mm.
+        stream: Stream command to start: ``r``, ``c``, ``a`` or ``b``.
+    """
+
+    port: str
+    name: str = ""
+    geometry: Optional[Geometry] = None
+    origin: Tuple[float, float] = (0.0, 0.0)
+    stream: str = "r"
+
+    def __post_init__(self) -> None:
+        if not self.name:
+            self.name = self.port
+
+
+@dataclass(frozen=True)
+class MergedFrame:
+    """One tick of the merged stream.
+
+    Attributes:
+        time: Host time of the tick, seconds (``time.time()`` clock).
+        frames: Each plate's sample nearest the tick, or None.
+        total: Sum of all plates' weights; None unless every plate has
+            weights in this tick.
+        cop_x: Combined CoP in the common frame, mm; None unless ``total``
+            is known and non-zero and every plate has a geometry.
+        cop_y: As ``cop_x``.
+    """
+
+    time: float
+    frames: Tuple[Optional[Frame], ...]
+    total: Optional[float]
+    cop_x: Optional[float]
+    cop_y: Optional[float]
+
+    @property
+    def complete(self) -> bool:
+        """True when every plate has a sample in this tick."""
+        return all(f is not None for f in self.frames)
+
+
+class _Track:
+    """Samples of one plate, placed in host time and kept in time order."""
+
+    def __init__(self, period: float) -> None:
+        self.clock = DeviceClock()
+        self.samples: Deque[Tuple[float, Frame]] = deque()
+        self.newest = -math.inf
+        self.interval = period
+
+    def _place(self, t: float) -> None:
+        if self.newest > -math.inf:
+            step = t - self.newest
+            if 0 < step < 1.0:
+                self.interval += 0.05 * (step - self.interval)
+
+    def add(self, frames: Sequence[Frame], arrival: float) -> None:
+        for frame in frames:
+            if isinstance(frame, SyncFrame):
+                self.clock.sync(frame.device_us, arrival)
+        samples = [f for f in frames if isinstance(f, _SAMPLES)]
+        timed = self.clock.synced
+        back = sum(1 for f in samples if not timed or f.timestamp_us < 0)
+        for frame in samples:
+            if timed and frame.timestamp_us >= 0:
+                t = self.clock.to_host(frame.timestamp_us)
+            else:
+                # By arrival: the read's samples were converted one period apart
+                back -= 1
+                t = max(arrival - back * self.interval, self.newest + self.interval / 4)
+            self._place(t)
+            self.newest = max(self.newest, t)
+            # Once the clock is fitted, timed samples can land before ones
+            # placed by arrival; they are rare and near the end.
+            i = len(self.samples)
+            while i and self.samples[i - 1][0] > t:
+                i -= 1
+            self.samples.insert(i, (t, frame))
+
+    def nearest(self, t: float) -> Optional[Frame]:
+        """Sample nearest ``t``, if one is within a sample interval."""
+        best = None
+        best_dt = self.interval
+        for st, frame in self.samples:
+            dt = abs(st - t)
+            if dt <= best_dt:
+                best, best_dt = frame, dt
+            elif st > t:
+                break
+        return best
+
+    def prune(self, t: float) -> None:
+        """Forget samples too old to be nearest to ``t`` or later ticks."""
+        while self.samples and self.samples[0][0] < t - self.interval:
+            self.samples.popleft()
+
+
+class Merger:
+    """Time alignment of several plates' frames, without any I/O.
+
+    Args:
+        plates: The plates, for their geometry and origin.
+        rate: Ticks per second of the merged stream.
+        latency: Longest a tick waits for a late plate, seconds.
+    """
+
+    def __init__(self, plates: Sequence[Plate], rate: float = RATE,
+                 latency: float = LATENCY_S) -> None:
+        self.plates = list(plates)
+        self.period = 1.0 / rate
+        self.latency = latency
+        self._tracks = [_Track(self.period) for _ in self.plates]
+        self._next: Optional[float] = None
+
+    def add(self, index: int, frames: Sequence[Frame], arrival: float) -> None:
+        """Add the frames of one read from plate ``index``, which arrived at ``arrival``."""
+        track = self._tracks[index]
+        track.add(frames, arrival)
+        if self._next is None and track.samples:
+            self._next = math.ceil(track.samples[0][0] / self.period) * self.period
+
+    def deadline(self) -> Optional[float]:
+        """Host time at which the next tick is due regardless of late plates."""
+        return None if self._next is None else self._next + self.latency
+
+    def pop(self, now: float) -> List[MergedFrame]:
+        """Return the ticks that are ready at host time ``now``."""
+        out: List[MergedFrame] = []
+        if self._next is None:
+            return out
+        # After a stall, resume near the present rather than replaying the gap
+        floor = now - self.latency - 1.0
+        if self._next < floor:
+            self._next = math.ceil(floor / self.period) * self.period
+        while True:
+            t = self._next
+            if now - t <= self.latency and any(tr.newest < t for tr in self._tracks):
+                return out
+            out.append(self._merge(t, tuple(tr.nearest(t) for tr in self._tracks)))
+            for track in self._tracks:
+                track.prune(t)
+            self._next = t + self.period
+
+    def _merge(self, t: float, frames: Tuple[Optional[Frame], ...]) -> MergedFrame:
+        weights = [getattr(f, "weights", None) for f in frames]
+        if any(w is None for w in weights):
+            return MergedFrame(t, frames, None, None, None)
+        total = sum(sum(w) for w in weights)
+        if total == 0 or any(p.geometry is None for p in self.plates):
+            return MergedFrame(t, frames, total, None, None)
+        # Weighted mean of every load cell's position in the common frame
+        x = y = 0.0
+        for plate, w in zip(self.plates, weights):
+            g = plate.geometry
+            x += sum(wi * (plate.origin[0] + cx) for wi, cx in zip(w, g.corner_x))
+            y += sum(wi * (plate.origin[1] + cy) for wi, cy in zip(w, g.corner_y))
+        return MergedFrame(t, frames, total, x / total, y / total)
+
+
+class Aggregator:
+    """Streams of several controllers merged in one event loop.
+
+    Use :meth:`open`, which waits for every controller to boot, reads any
+    missing geometry and starts the streams.
+    """
+
+    def __init__(self, plates: Sequence[Plate], clients: Sequence[AsyncCopClient],
+                 rate: float = RATE, latency: float = LATENCY_S) -> None:
+        self.plates = list(plates)
+        self.clients = list(clients)
+        self.merger = Merger(self.plates, rate, latency)
+        self._ready: Deque[MergedFrame] = deque()
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._pump(i, c)) for i, c in enumerate(self.clients)]
+
+    @classmethod
+    async def open(cls, plates: Sequence[Plate], rate: float = RATE, latency: float = LATENCY_S,
+                   baudrate: int = 115200, ready_timeout: float = 5.0) -> "Aggregator":
+        """Open every plate's port and start its stream."""
+        clients = [await AsyncCopClient.open(p.port, baudrate) for p in plates]
+        try:
+            await asyncio.gather(*(c.wait_ready(ready_timeout) for c in clients))
+            for plate, client in zip(plates, clients):
+                if plate.geometry is None:
+                    client.report_geometry()
+                    try:
+                        plate.geometry = await client.wait_for(
+                            lambda f: isinstance(f, Geometry), GEOMETRY_TIMEOUT_S)
+                    except asyncio.TimeoutError:
+                        pass
+                client.send(plate.stream)
+        except BaseException:
+            for client in clients:
+                client.close()
+            raise
+        return cls(plates, clients, rate, latency)
+
+    async def _pump(self, index: int, client: AsyncCopClient) -> None:
+        while True:
+            try:
+                frames = await client.read_batch()
+            except EOFError:
+                return
+            self.merger.add(index, frames, time.time())
+            self._wake.set()
+
+    async def read_batch(self) -> List[MergedFrame]:
+        """Return every ready tick, waiting for at least one."""
+        while True:
+            frames = self.merger.pop(time.time())
+            if frames:
+                return frames
+            self._wake.clear()
+            deadline = self.merger.deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def read(self) -> MergedFrame:
+        """Return the next tick."""
+        if not self._ready:
+            self._ready.extend(await self.read_batch())
+        return self._ready.popleft()
+
+    def __aiter__(self) -> "Aggregator":
+        return self
+
+    async def __anext__(self) -> MergedFrame:
+        return await self.read()
+
+    def close(self) -> None:
+        """Stop the streams and close the ports."""
+        for task in self._tasks:
+            task.cancel()
+        for client in self.clients:
+            try:
+                client.stop()
+            except OSError:
+                pass
+            client.close()
+
+    async def __aenter__(self) -> "Aggregator":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+
+def _plate(spec: str, geometry: Optional[Geometry], stream: str) -> Plate:
+    """Parse ``PORT[@X,Y]``."""
+    port, _, origin = spec.partition("@")
+    xy = tuple(float(v) for v in origin.split(",")) if origin else (0.0, 0.0)
+    if len(xy) != 2:
+        raise argparse.ArgumentTypeError("expected PORT@X,Y: %s" % spec)
+    return Plate(port, geometry=geometry, origin=xy, stream=stream)
+
+
+def _columns(frame: Optional[Frame], width: int) -> List[str]:
+    if frame is None:
+        return [""] * width
+    if isinstance(frame, CopFrame):
+        return ["%.4f" % frame.cop_x, "%.4f" % frame.cop_y]
+    return ["%.3f" % w for w in frame.weights]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    geometry = None
+    if args.size:
+        sx, _, sy = args.size.partition("x")
+        geometry = Geometry.rectangle(float(sx), float(sy or sx))
+    plates = [_plate(spec, geometry, args.stream) for spec in args.plates]
+    width = 2 if args.stream == "c" else 4
+    names = ("x", "y") if width == 2 else ("wa", "wb", "wc", "wd")
+    header = ["time", "total", "cop_x", "cop_y"]
+    for i in range(len(plates)):
+        header += ["p%d_%s" % (i, n) for n in names]
+    print(",".join(header))
+    async with await Aggregator.open(plates, rate=args.rate, latency=args.latency) as agg:
+        end = None if args.seconds is None else time.time() + args.seconds
+        while end is None or time.time() < end:
+            for merged in await agg.read_batch():
+                row = ["%.6f" % merged.time]
+                row += ["" if v is None else "%.3f" % v
+                        for v in (merged.total, merged.cop_x, merged.cop_y)]
+                for frame in merged.frames:
+                    row += _columns(frame, width)
+                print(",".join(row))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("plates", nargs="+", metavar="PORT[@X,Y]",
+                        help="controller port, and its centre in the common frame in mm")
+    parser.add_argument("--stream", choices=("r", "c", "a", "b"), default="r",
+                        help="stream command sent to every plate")
+    parser.add_argument("--size", metavar="WxD",
+                        help="load-cell spacing of every plate in mm; default: ask each one")
+    parser.add_argument("--rate", type=float, default=RATE, help="merged frames per second")
+    parser.add_argument("--latency", type=float, default=LATENCY_S,
+                        help="longest wait for a late plate, seconds")
+    parser.add_argument("--seconds", type=float, help="stop after this long")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
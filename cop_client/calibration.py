@@ -0,0 +1,238 @@
+"""Least-squares calibration from several placements of one known weight.
+
+The firmware's ``k`` command assumes the weight sits exactly in the centre
+and gives every load cell the same averaged factor. Here the operator instead
+places the weight at several positions and sends ``p`` at each one. The
+device replies ``PLACE,da,db,dc,dd`` with the averaged net counts, and this
+module solves for one factor per scale.
+
+The solve uses static equilibrium, not an assumed load split. With ``g_i``
+the units-per-count of scale ``i`` and corner positions in the normalized
+``calc_cop`` frame (A top-left, B top-right, C bottom-right, D bottom-left),
+every placement ``j`` with weight ``W`` at ``(x, y)`` must satisfy::
+
+    sum_i g_i c_ij       = W          (force)
+    sum_i g_i c_ij x_i   = W * x      (moment about the Y axis)
+    sum_i g_i c_ij y_i   = W * y      (moment about the X axis)
+
+The moment rows are used only when a placement's position is known. The
+factors the firmware expects are ``1 / g_i`` and are sent back with
+``e <ca> <cb> <cc> <cd>``.
+
+:func:`solve_crosstalk` also fits a full 3x4 matrix from counts to
+(total, total * x, total * y), which absorbs crosstalk between corners.
+
+Usage with a CSV of ``x,y,weight,da,db,dc,dd`` rows (x and y may be empty)::
+
+    python -m cop_client.calibration placements.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+#: Normalized corner positions, scale order A-D, matching ``calc_cop``.
+CORNER_X = (-1.0, 1.0, 1.0, -1.0)
+CORNER_Y = (1.0, 1.0, -1.0, -1.0)
+
+#: Smallest pivot of the normal equations, relative to their largest diagonal
+#: entry, that counts as determining a factor. Below it noise in the counts
+#: dominates the result; placements spread over the platform give about 0.05
+#: or more, repeated or collinear ones 1e-5 or less.
+PIVOT_RTOL = 1e-4
+
+#: Suggested positions: centre, the four corners and the four mid-edges.
+STANDARD_PLACEMENTS: Dict[str, Tuple[float, float]] = {
+    "centre": (0.0, 0.0),
+    "a": (-1.0, 1.0),
+    "b": (1.0, 1.0),
+    "c": (1.0, -1.0),
+    "d": (-1.0, -1.0),
+    "ab": (0.0, 1.0),
+    "bc": (1.0, 0.0),
+    "cd": (0.0, -1.0),
+    "da": (-1.0, 0.0),
+}
+
+
+@dataclass(frozen=True)
+class Placement:
+    """Averaged net counts A-D with ``weight`` at normalized ``(x, y)``."""
+
+    counts: Tuple[float, float, float, float]
+    weight: float
+    x: Optional[float] = None
+    y: Optional[float] = None
+
+    @property
+    def has_position(self) -> bool:
+        return self.x is not None and self.y is not None
+
+
+@dataclass
+class CalibrationResult:
+    """Per-scale factors plus the residuals of the fit.
+
+    ``residuals`` holds one (force, x-moment, y-moment) tuple per placement in
+    weight units; moment entries are ``nan`` where the position was unknown.
+    A load cell that is failing or mounted badly shows up as large residuals
+    on the placements nearest its corner.
+    """
+
+    factors: Tuple[float, float, float, float]
+    residuals: List[Tuple[float, float, float]] = field(default_factory=list)
+    rms: float = 0.0
+
+    def command(self) -> str:
+        """The ``e`` command that stores these factors on the device."""
+        return "e " + " ".join("%.4f" % f for f in self.factors)
+
+    def worst_placement(self) -> int:
+        """Index of the placement with the largest residual."""
+        def size(r: Tuple[float, float, float]) -> float:
+            return math.sqrt(sum(v * v for v in r if not math.isnan(v)))
+        return max(range(len(self.residuals)), key=lambda j: size(self.residuals[j]))
+
+
+def parse_place_line(line: str) -> Tuple[float, float, float, float]:
+    """Net counts from a ``PLACE,da,db,dc,dd`` line.
+
+    Raises:
+        ValueError: if the line is not a placement report.
+    """
+    parts = line.strip().split(",")
+    if len(parts) != 5 or parts[0] != "PLACE":
+        raise ValueError("not a PLACE line: %r" % line)
+    return tuple(float(p) for p in parts[1:])  # type: ignore[return-value]
+
+
+def _least_squares(rows: Sequence[Sequence[float]], rhs: Sequence[float]) -> List[float]:
+    """Solve min |A g - b| through the normal equations (n is 4 here)."""
+    n = len(rows[0])
+    ata = [[sum(r[i] * r[k] for r in rows) for k in range(n)] for i in range(n)]
+    atb = [sum(r[i] * b for r, b in zip(rows, rhs)) for i in range(n)]
+
+    # Gaussian elimination with partial pivoting.
+    tolerance = PIVOT_RTOL * max(abs(ata[i][i]) for i in range(n))
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(ata[r][col]))
+        if abs(ata[pivot][col]) <= tolerance:
+            raise ValueError("placements do not determine every factor; "
+                             "add placements nearer each corner")
+        ata[col], ata[pivot] = ata[pivot], ata[col]
+        atb[col], atb[pivot] = atb[pivot], atb[col]
+        for r in range(col + 1, n):
+            f = ata[r][col] / ata[col][col]
+            for k in range(col, n):
+                ata[r][k] -= f * ata[col][k]
+            atb[r] -= f * atb[col]
+    g = [0.0] * n
+    for i in reversed(range(n)):
+        g[i] = (atb[i] - sum(ata[i][k] * g[k] for k in range(i + 1, n))) / ata[i][i]
+    return g
+
+
+def _equations(p: Placement):
+    """(row, rhs, kind) tuples of one placement; kind 0/1/2 = force/x/y."""
+    yield list(p.counts), p.weight, 0
+    if p.has_position:
+        yield [c * cx for c, cx in zip(p.counts, CORNER_X)], p.weight * p.x, 1
+        yield [c * cy for c, cy in zip(p.counts, CORNER_Y)], p.weight * p.y, 2
+
+
+def solve_per_corner(placements: Sequence[Placement]) -> CalibrationResult:
+    """Fit one calibration factor per scale.
+
+    Needs at least four placements without positions, or two with positions
+    that are not all on one line.
+    """
+    rows, rhs = [], []
+    for p in placements:
+        for row, b, _ in _equations(p):
+            rows.append(row)
+            rhs.append(b)
+    g = _least_squares(rows, rhs)
+
+    residuals = []
+    squares = []
+    for p in placements:
+        r = [math.nan, math.nan, math.nan]
+        for row, b, kind in _equations(p):
+            r[kind] = sum(gi * ci for gi, ci in zip(g, row)) - b
+            squares.append(r[kind] ** 2)
+        residuals.append(tuple(r))
+
+    factors = tuple(1.0 / gi for gi in g)
+    rms = math.sqrt(sum(squares) / len(squares))
+    return CalibrationResult(factors=factors, residuals=residuals, rms=rms)  # type: ignore[arg-type]
+
+
+def solve_crosstalk(placements: Sequence[Placement]) -> List[List[float]]:
+    """Fit a 3x4 matrix M with M @ counts = (total, total * x, total * y).
+
+    Every placement needs a position, and at least four of them must be
+    spread over the platform. Apply the result with :func:`apply_crosstalk`.
+    """
+    located = [p for p in placements if p.has_position]
+    if len(located) < 4:
+        raise ValueError("crosstalk fit needs at least four placements with positions")
+    rows = [list(p.counts) for p in located]
+    targets = (
+        [p.weight for p in located],
+        [p.weight * p.x for p in located],
+        [p.weight * p.y for p in located],
+    )
+    return [_least_squares(rows, t) for t in targets]
+
+
+def apply_crosstalk(matrix: Sequence[Sequence[float]],
+                    counts: Sequence[float]) -> Tuple[float, float, float]:
+    """Total load and normalized CoP (x, y) from net counts through ``matrix``."""
+    total, mx, my = (sum(m * c for m, c in zip(row, counts)) for row in matrix)
+    if total <= 0:
+        return total, 0.0, 0.0
+    return total, mx / total, my / total
+
+
+def read_placements(path: str) -> List[Placement]:
+    """Read ``x,y,weight,da,db,dc,dd`` rows; a header row is skipped."""
+    placements = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                weight = float(row[2])
+                counts = tuple(float(v) for v in row[3:7])
+            except ValueError:
+                continue  # header
+            x = float(row[0]) if row[0].strip() else None
+            y = float(row[1]) if row[1].strip() else None
+            placements.append(Placement(counts, weight, x, y))  # type: ignore[arg-type]
+    return placements
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Solve per-scale calibration factors.")
+    parser.add_argument("csv", help="rows of x,y,weight,da,db,dc,dd")
+    args = parser.parse_args(argv)
+
+    placements = read_placements(args.csv)
+    result = solve_per_corner(placements)
+    for name, factor in zip("ABCD", result.factors):
+        print("Scale %s factor: %.4f" % (name, factor))
+    print("RMS residual: %.4g" % result.rms)
+    for j, r in enumerate(result.residuals):
+        print("  placement %d: force %+.4g  x-moment %+.4g  y-moment %+.4g" % ((j,) + r))
+    print("Worst placement: %d" % result.worst_placement())
+    print("Send to device: " + result.command())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""Clients that drive the controller and yield typed frames.
+
+:class:`CopClient` is a plain blocking client for simple scripts, and
+:class:`AsyncCopClient` is an asyncio client. Both read the port in large
+chunks and decode every complete line or packet in a chunk at once. Both
+switch between the text and binary decoders when a stream command is sent.
+
+Frames are the dataclasses of ``text.py`` and ``protocol.py``:
+:class:`~cop_client.text.ReadingsFrame` (``r``),
+:class:`~cop_client.text.CopFrame` (``c``),
+:class:`~cop_client.protocol.SampleFrame` (``a`` and ``b``),
+:class:`~cop_client.text.SyncFrame`, :class:`~cop_client.text.SettingsFrame`,
+:class:`~cop_client.geometry.Geometry`,
+:class:`~cop_client.protocol.StatusFrame` and :class:`~cop_client.text.Message`.
+
+Blocking::
+
+    with CopClient("/dev/ttyUSB0") as dev:
+        dev.wait_ready()
+        dev.stream_all()
+        for frame in dev:
+            print(frame.seq, frame.cop_x, frame.cop_y)
+
+asyncio::
+
+    async with await AsyncCopClient.open("/dev/ttyUSB0") as dev:
+        await dev.wait_ready()
+        dev.stream_binary()
+        async for frame in dev:
+            ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, Union
+
+from .geometry import Geometry
+from .port import SerialPort
+from .protocol import (
+    STATUS_GEOMETRY,
+    STATUS_SETTINGS,
+    STATUS_SYNC,
+    PacketDecoder,
+    SampleFrame,
+    StatusFrame,
+)
+from .text import CopFrame, Message, ReadingsFrame, SettingsFrame, SyncFrame, TextDecoder
+
+Frame = Union[ReadingsFrame, CopFrame, SampleFrame, SyncFrame, SettingsFrame, Geometry,
+              StatusFrame, Message]
+
+#: Line printed by ``setup()`` once the controller accepts commands.
+READY_LINE = "System ready."
+
+
+class StreamDecoder:
+    """Decodes text or binary output, following the current stream mode."""
+
+    def __init__(self) -> None:
+        self.binary = False
+        self._text = TextDecoder()
+        self._packets = PacketDecoder()
+
+    def set_binary(self, binary: bool) -> None:
+        """Select the decoder for the bytes that follow."""
+        if binary != self.binary:
+            self.binary = binary
+            self._text = TextDecoder()
+            self._packets = PacketDecoder()
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """Decode a chunk of serial bytes."""
+        if not self.binary:
+            return self._text.feed(data)
+        frames: List[Frame] = []
+        for frame in self._packets.feed(data):
+            if isinstance(frame, StatusFrame) and frame.code == STATUS_SYNC:
+                device_us, seq, decimation = frame.values
+                frame = SyncFrame(device_us, seq, decimation)
+            elif isinstance(frame, StatusFrame) and frame.code == STATUS_SETTINGS:
+                frame = SettingsFrame.from_values(frame.values)
+            elif isinstance(frame, StatusFrame) and frame.code == STATUS_GEOMETRY:
+                frame = Geometry.from_values(frame.values)
+            frames.append(frame)
+        return frames
+
+
+class _Commands:
+    """Serial command helpers shared by both clients."""
+
+    decoder: StreamDecoder
+
+    def _write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def send(self, command: str) -> None:
+        """Send one command line, e.g. ``"r"`` or ``"k 25.0"``."""
+        letter = command[:1]
+        if letter == "b":
+            self.decoder.set_binary(True)
+        elif letter in ("r", "c", "a", "s", "h"):
+            self.decoder.set_binary(False)
+        self._write(command.encode("ascii") + b"\n")
+
+    def stream_readings(self) -> None:
+        """``r``: stream the four weights."""
+        self.send("r")
+
+    def stream_cop(self) -> None:
+        """``c``: stream the CoP."""
+        self.send("c")
+
+    def stream_all(self) -> None:
+        """``a``: stream weights, total and CoP."""
+        self.send("a")
+
+    def stream_binary(self) -> None:
+        """``b``: stream weights and CoP as binary packets."""
+        self.send("b")
+
+    def stop(self) -> None:
+        """``s``: stop streaming."""
+        self.send("s")
+
+    def tare(self) -> None:
+        """``z``: tare all scales in the background."""
+        self.send("z")
+
+    def calibrate(self, weight: float) -> None:
+        """``k``: calibrate against a known weight in the centre."""
+        self.send("k %g" % weight)
+
+    def set_factors(self, factors: Sequence[float]) -> None:
+        """``e``: set and save the factor of each scale."""
+        self.send("e " + " ".join("%.4f" % f for f in factors))
+
+    def capture_placement(self) -> None:
+        """``p``: average net counts for one calibration placement."""
+        self.send("p")
+
+    def set_decimation(self, factor: int) -> None:
+        """``d``: average every ``factor`` samples into one."""
+        self.send("d %d" % factor)
+
+    def set_filter(self, window: int, sigma: Optional[float] = None) -> None:
+        """``f``: set the outlier filter window and threshold."""
+        self.send("f %d" % window if sigma is None else "f %d %g" % (window, sigma))
+
+    def set_geometry(self, geometry: Geometry) -> None:
+        """``g``: store the load-cell positions; the reply is a :class:`Geometry`."""
+        self.send(geometry.command())
+
+    def set_cop_units(self, mm: bool) -> None:
+        """``u``: stream the CoP in millimetres, or normalized."""
+        self.send("u m" if mm else "u n")
+
+    def report_geometry(self) -> None:
+        """``g``: request the load-cell positions and CoP units."""
+        self.send("g")
+
+    def report_settings(self) -> None:
+        """``i``: request the calibration, filter and decimation settings."""
+        self.send("i")
+
+    def report_stats(self) -> None:
+        """``t``: request loop timing and health counters."""
+        self.send("t")
+
+    def reset_stats(self) -> None:
+        """``x``: clear loop timing and health counters."""
+        self.send("x")
+
+    def help(self) -> None:
+        """``h``: stop streaming and print the menu."""
+        self.send("h")
+
+
+def _is_ready(frame: Frame) -> bool:
+    return isinstance(frame, Message) and frame.text == READY_LINE
+
+
+class CopClient(_Commands):
+    """Blocking client; needs neither asyncio nor any third-party package."""
+
+    def __init__(self, path: str, baudrate: int = 115200) -> None:
+        self.port = SerialPort(path, baudrate)
+        self.decoder = StreamDecoder()
+        self._backlog: Deque[Frame] = deque()
+
+    def _write(self, data: bytes) -> None:
+        self.port.write(data)
+
+    def read(self, timeout: Optional[float] = None) -> List[Frame]:
+        """Return every frame decoded from one read, or ``[]`` on timeout."""
+        if self._backlog:
+            frames = list(self._backlog)
+            self._backlog.clear()
+            return frames
+        return self.decoder.feed(self.port.read(timeout))
+
+    def wait_for(self, predicate: Callable[[Frame], bool], timeout: float = 5.0) -> Frame:
+        """Return the first frame matching ``predicate``.
+
+        Frames before it are discarded; frames after it in the same read are
+        kept for the next call.
+
+        Raises:
+            TimeoutError: if no frame matched within ``timeout`` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("no matching frame within %.1f s" % timeout)
+            frames = self.read(remaining)
+            for i, frame in enumerate(frames):
+                if predicate(frame):
+                    self._backlog.extend(frames[i + 1:])
+                    return frame
+
+    def wait_ready(self, timeout: float = 5.0) -> None:
+        """Wait for the controller to finish booting after the port opened."""
+        self.wait_for(_is_ready, timeout)
+
+    def __iter__(self) -> Iterator[Frame]:
+        """Yield frames until the device goes away."""
+        while True:
+            try:
+                frames = self.read()
+            except EOFError:
+                return
+            yield from frames
+
+    def close(self) -> None:
+        self.port.close()
+
+    def __enter__(self) -> "CopClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncCopClient(_Commands):
+    """asyncio client; the port is watched with ``loop.add_reader`` (POSIX).
+
+    Every readable event drains the port in one read and decodes it in one
+    pass. Frames wait in a bounded queue; when the consumer falls behind the
+    oldest frames are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, port: SerialPort, queue_size: int = 4096) -> None:
+        self.port = port
+        self.decoder = StreamDecoder()
+        self.dropped = 0
+        self._queue: Deque[Frame] = deque(maxlen=queue_size)
+        self._event = asyncio.Event()
+        self._eof = False
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(port.fileno(), self._on_readable)
+
+    @classmethod
+    async def open(cls, path: str, baudrate: int = 115200, queue_size: int = 4096) -> "AsyncCopClient":
+        """Open the port and start reading it on the running loop."""
+        return cls(SerialPort(path, baudrate), queue_size)
+
+    def _on_readable(self) -> None:
+        try:
+            data = self.port.read_nowait()
+        except EOFError:
+            self._eof = True
+            self._loop.remove_reader(self.port.fileno())
+            self._event.set()
+            return
+        frames = self.decoder.feed(data)
+        overflow = len(self._queue) + len(frames) - self._queue.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self._queue.extend(frames)
+        if self._queue:
+            self._event.set()
+
+    def _write(self, data: bytes) -> None:
+        self.port.write(data)
+
+    async def read(self) -> Frame:
+        """Return the next frame.
+
+        Raises:
+            EOFError: once the device has gone away and the queue is empty.
+        """
+        while not self._queue:
+            if self._eof:
+                raise EOFError(self.port.path)
+            self._event.clear()
+            await self._event.wait()
+        return self._queue.popleft()
+
+    async def read_batch(self) -> List[Frame]:
+        """Return every queued frame, waiting for at least one."""
+        frames = [await self.read()]
+        frames.extend(self._queue)
+        self._queue.clear()
+        return frames
+
+    async def wait_for(self, predicate: Callable[[Frame], bool], timeout: float = 5.0) -> Frame:
+        """Return the first frame matching ``predicate``, discarding the rest.
+
+        Raises:
+            asyncio.TimeoutError: if no frame matched within ``timeout`` seconds.
+        """
+        async def scan() -> Frame:
+            while True:
+                frame = await self.read()
+                if predicate(frame):
+                    return frame
+
+        return await asyncio.wait_for(scan(), timeout)
+
+    async def wait_ready(self, timeout: float = 5.0) -> None:
+        """Wait for the controller to finish booting after the port opened."""
+        await self.wait_for(_is_ready, timeout)
+
+    def __aiter__(self) -> "AsyncCopClient":
+        return self
+
+    async def __anext__(self) -> Frame:
+        try:
+            return await self.read()
+        except EOFError:
+            raise StopAsyncIteration from None
+
+    def close(self) -> None:
+        if not self._eof:
+            self._loop.remove_reader(self.port.fileno())
+            self._eof = True
+        self.port.close()
+
+    async def __aenter__(self) -> "AsyncCopClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,96 @@
+"""Map device timestamps to host wall-clock time.
+
+Every sample carries the ``micros()`` time of its conversion, and every
+stream sends a sync record about once a second (``SYNC,t_us,seq,decimation``
+as text, or a ``STATUS_SYNC`` packet). :class:`DeviceClock` pairs each sync
+record's device time with the host time at which it arrived, and fits::
+
+    host = offset + rate * device
+
+over a sliding window of recent syncs. The rate absorbs the drift between the
+two crystals. Serial and USB latency only ever delay a record, so the line
+is shifted down to the earliest-arriving sync rather than passing through
+the mean. ``micros()`` wraps every 71.6 minutes; timestamps are unwrapped
+before fitting.
+
+Usage::
+
+    clock = DeviceClock()
+    for frame in decoder.feed(port.read(4096)):
+        if isinstance(frame, StatusFrame) and frame.code == STATUS_SYNC:
+            clock.sync(frame.values[0], time.time())
+        elif isinstance(frame, SampleFrame):
+            t = clock.to_host(frame.timestamp_us)
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+#: ``micros()`` is a uint32 on the device.
+WRAP_US = 1 << 32
+
+
+class DeviceClock:
+    """Least-squares mapping from device microseconds to host seconds."""
+
+    def __init__(self, window: int = 60) -> None:
+        """Keep the last ``window`` sync records (about a minute of streaming)."""
+        self._syncs: Deque[Tuple[int, float]] = deque(maxlen=window)
+        self._last_raw: Optional[int] = None
+        self._epoch = 0
+        self._offset = 0.0
+        self._rate = 1e-6
+
+    def unwrap(self, device_us: int) -> int:
+        """Extend a 32-bit ``micros()`` value into a monotonic integer.
+
+        Values must arrive roughly in order. A step back of more than half
+        the wrap period counts as a wrap.
+        """
+        if self._last_raw is not None:
+            step = (device_us - self._last_raw) % WRAP_US
+            if step >= WRAP_US // 2:
+                # Slightly out of order (e.g. a decimated midpoint timestamp).
+                return self._epoch + device_us - (WRAP_US if device_us > self._last_raw else 0)
+            if device_us < self._last_raw:
+                self._epoch += WRAP_US
+        self._last_raw = device_us
+        return self._epoch + device_us
+
+    def sync(self, device_us: int, host_time: float) -> None:
+        """Add one sync record and refit the mapping.
+
+        Args:
+            device_us: ``t_us`` of the sync record.
+            host_time: Host clock, in seconds, when the record arrived.
+        """
+        self._syncs.append((self.unwrap(device_us), host_time))
+        n = len(self._syncs)
+        if n == 1:
+            self._rate = 1e-6
+        else:
+            t0 = self._syncs[0][0]
+            mean_d = sum(d - t0 for d, _ in self._syncs) / n
+            mean_h = sum(h for _, h in self._syncs) / n
+            sdd = sum((d - t0 - mean_d) ** 2 for d, _ in self._syncs)
+            sdh = sum((d - t0 - mean_d) * (h - mean_h) for d, h in self._syncs)
+            if sdd > 0:
+                self._rate = sdh / sdd
+        # Shift the line down to the least-delayed record.
+        self._offset = min(h - self._rate * d for d, h in self._syncs)
+
+    @property
+    def synced(self) -> bool:
+        """True once at least one sync record has been seen."""
+        return bool(self._syncs)
+
+    @property
+    def drift_ppm(self) -> float:
+        """Device clock rate error relative to the host, in parts per million."""
+        return (self._rate * 1e6 - 1.0) * 1e6
+
+    def to_host(self, device_us: int) -> float:
+        """Host time, in seconds, of a device timestamp."""
+        return self._offset + self._rate * self.unwrap(device_us)
@@ -0,0 +1,195 @@
+"""The controller firmware built for the host and run in virtual time.
+
+``host/`` compiles the sketch and its sources for Linux against stand-ins for
+the HX711 modules, Serial, EEPROM and the Arduino clock (see ``host/sim.h``).
+:class:`Firmware` loads that build through ctypes, so tests can queue raw
+counts, send commands and decode the output with no hardware attached::
+
+    with Firmware() as fw:
+        fw.push_counts([(100000, 110000, 90000, 120000)] * 200)
+        fw.run(1.0)                 # boot and tare
+        fw.set_factors([100, 100, 100, 100])
+        fw.stream_all()
+        frames = fw.run(0.5)        # 40 SampleFrames, plus SYNC and CAL
+
+Virtual time only advances inside :meth:`Firmware.run`, so results are the
+same on every run and a second of streaming takes a few milliseconds. Each
+instance loads its own copy of the library, so several can run side by
+side. The library is built with ``make`` on first use; set ``CXX`` to choose
+the compiler.
+"""
+
+from __future__ import annotations
+
+import _ctypes
+import ctypes
+import functools
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Iterable, List, Optional, Sequence
+
+from .client import Frame, StreamDecoder, _Commands
+
+#: Size of the simulated EEPROM (ATmega328P).
+EEPROM_SIZE = 1024
+
+_HOST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "host")
+
+# Longest single cop_sim_run() call; the argument is a uint32 of microseconds.
+_RUN_CHUNK_US = 1_000_000
+
+
+@functools.lru_cache(maxsize=None)
+def build(fixed_point: bool = False) -> str:
+    """Build the host library if it is out of date and return its path.
+
+    Checked once per process and variant.
+    """
+    subprocess.check_call(
+        ["make", "-s", "-C", _HOST_DIR, "FIXED=%d" % fixed_point],
+        stdout=subprocess.DEVNULL,
+    )
+    variant = "fixed" if fixed_point else "float"
+    return os.path.join(_HOST_DIR, "build", variant, "libcop_host.so")
+
+
+class Firmware(_Commands):
+    """One simulated controller, from power-up.
+
+    Args:
+        fixed_point: Run the ``COP_FIXED_POINT`` build.
+        rate: HX711 conversions per second.
+        loop_us: Virtual time per ``loop()`` call.
+        start_us: Clock at power-up; just below ``2**32`` tests the
+            ``micros()`` wrap.
+        eeprom: EEPROM image to boot with; blank (0xFF) by default.
+        counts: Rows to queue before power-up, as for :meth:`push_counts`;
+            ``setup()`` already converts while it prints the banner.
+    """
+
+    def __init__(self, fixed_point: bool = False, rate: float = 80.0, loop_us: int = 20,
+                 start_us: int = 0, eeprom: Optional[bytes] = None,
+                 counts: Iterable[Sequence[int]] = ()) -> None:
+        # dlopen() shares a library loaded twice from one path, and with it
+        # the sketch's globals, so every instance loads a private copy.
+        self._dir = tempfile.mkdtemp(prefix="cop_host_")
+        path = os.path.join(self._dir, "libcop_host.so")
+        shutil.copyfile(build(fixed_point), path)
+        self._lib = lib = ctypes.CDLL(path)
+        lib.cop_sim_configure.argtypes = [ctypes.c_float, ctypes.c_uint32, ctypes.c_uint64]
+        lib.cop_sim_run.argtypes = [ctypes.c_uint32]
+        lib.cop_sim_write.argtypes = [ctypes.c_char_p, ctypes.c_size_t]
+        lib.cop_sim_read.argtypes = [ctypes.c_char_p, ctypes.c_size_t]
+        lib.cop_sim_read.restype = ctypes.c_size_t
+        lib.cop_sim_push_counts.argtypes = [ctypes.POINTER(ctypes.c_int32)]
+        lib.cop_sim_queued_counts.restype = ctypes.c_size_t
+        lib.cop_sim_now_us.restype = ctypes.c_uint64
+        lib.cop_sim_conversions.restype = ctypes.c_uint32
+        lib.cop_sim_missed.restype = ctypes.c_uint32
+        lib.cop_sim_eeprom.restype = ctypes.POINTER(ctypes.c_uint8 * EEPROM_SIZE)
+        lib.cop_sim_eeprom_writes.restype = ctypes.c_uint32
+
+        self.decoder = StreamDecoder()
+        self._frames: List[Frame] = []
+        lib.cop_sim_configure(rate, loop_us, start_us)
+        if eeprom is not None:
+            self.eeprom = eeprom
+        self.push_counts(counts)
+        lib.cop_sim_begin()
+
+    def push_counts(self, rows: Iterable[Sequence[int]]) -> None:
+        """Queue raw counts for the next conversions, one ``(a, b, c, d)`` row each.
+
+        When the queue runs dry every conversion repeats the last row.
+        """
+        counts = (ctypes.c_int32 * 4)()
+        for row in rows:
+            counts[:] = [int(v) for v in row]
+            self._lib.cop_sim_push_counts(counts)
+
+    @property
+    def queued_counts(self) -> int:
+        """Rows queued by :meth:`push_counts` and not yet converted."""
+        return self._lib.cop_sim_queued_counts()
+
+    def send(self, command: str) -> None:
+        """Send a command line; output written before it keeps its decoder."""
+        self._frames.extend(self.decoder.feed(self._take_output()))
+        super().send(command)
+
+    def write(self, data: bytes) -> None:
+        """Queue raw bytes on the firmware's Serial input, bypassing the decoder."""
+        self._lib.cop_sim_write(data, len(data))
+
+    def _write(self, data: bytes) -> None:
+        self.write(data)
+
+    def _take_output(self) -> bytes:
+        chunks = []
+        buffer = ctypes.create_string_buffer(65536)
+        while True:
+            n = self._lib.cop_sim_read(buffer, len(buffer))
+            if not n:
+                return b"".join(chunks)
+            chunks.append(buffer.raw[:n])
+
+    def run_bytes(self, seconds: float) -> bytes:
+        """Run for ``seconds`` of virtual time and return the raw Serial output."""
+        remaining = int(round(seconds * 1e6))
+        while remaining > 0:
+            step = min(remaining, _RUN_CHUNK_US)
+            self._lib.cop_sim_run(step)
+            remaining -= step
+        return self._take_output()
+
+    def run(self, seconds: float) -> List[Frame]:
+        """Run for ``seconds`` of virtual time and return the decoded frames."""
+        frames = self._frames + self.decoder.feed(self.run_bytes(seconds))
+        self._frames = []
+        return frames
+
+    @property
+    def now_us(self) -> int:
+        """Virtual clock, microseconds; unlike ``micros()`` it does not wrap."""
+        return self._lib.cop_sim_now_us()
+
+    @property
+    def conversions(self) -> int:
+        """HX711 conversions made so far."""
+        return self._lib.cop_sim_conversions()
+
+    @property
+    def missed(self) -> int:
+        """Conversions overwritten before the firmware read them."""
+        return self._lib.cop_sim_missed()
+
+    @property
+    def eeprom(self) -> bytes:
+        """Copy of the EEPROM image; assign to replace it."""
+        return bytes(self._lib.cop_sim_eeprom().contents)
+
+    @eeprom.setter
+    def eeprom(self, image: bytes) -> None:
+        if len(image) != EEPROM_SIZE:
+            raise ValueError("EEPROM image must be %d bytes" % EEPROM_SIZE)
+        self._lib.cop_sim_eeprom().contents[:] = list(image)
+
+    @property
+    def eeprom_writes(self) -> int:
+        """EEPROM bytes changed since power-up."""
+        return self._lib.cop_sim_eeprom_writes()
+
+    def close(self) -> None:
+        """Unload the library and remove its private copy."""
+        if self._lib is not None:
+            _ctypes.dlclose(self._lib._handle)
+            self._lib = None
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self) -> "Firmware":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,276 @@
+"""Host model of the firmware's fixed-point pipeline (``COP_FIXED_POINT``).
+
+The functions here reproduce ``fixed_point.cpp`` bit for bit, so host tools
+can compute the same Q16.16 weights and Q1.15 CoP as a fixed-point build.
+
+Running the module compares the fixed-point CoP against the float
+``calc_cop`` over random loads, and the Q16.16 weights against the float
+``raw_to_weight`` over random calibration factors including the default of
+1, and fails if an error exceeds :data:`COP_TOLERANCE` or
+:data:`WEIGHT_TOLERANCE`::
+
+    python -m cop_client.fixed_point            # Python model only
+    python -m cop_client.fixed_point --firmware # also compile fixed_point.cpp
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import functools
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+from typing import Callable, Iterable, Tuple
+
+#: Largest allowed |fixed - float| for a normalized CoP component (8 Q1.15 LSB).
+COP_TOLERANCE = 2.0 ** -12
+
+#: Largest allowed |fixed - float| weight, relative to max(1, |weight|).
+WEIGHT_TOLERANCE = 2.0 ** -14
+
+_INT32_MAX = (1 << 31) - 1
+_INT32_MIN = -(1 << 31)
+
+_FIRMWARE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "cop_controller")
+
+
+def _sat32(value: int) -> int:
+    return max(_INT32_MIN, min(_INT32_MAX, value))
+
+
+def _sat15(value: int) -> int:
+    return max(-32768, min(32767, value))
+
+
+#: Range of the shift ``q16_gain`` returns.
+Q16_SHIFT_MIN = -7
+Q16_SHIFT_MAX = 39
+
+#: Largest tared count ``q16_scale`` takes; HX711 counts are 24-bit.
+Q16_COUNTS_MAX = (1 << 23) - 1
+
+
+def _f32(value: float) -> float:
+    """Round to the nearest float32, as the firmware's ``float`` would."""
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+def q16_gain(scale: float) -> Tuple[int, int]:
+    """``(round(2**(16 + shift) / scale), shift)``, as stored by ``Scale::set_scale``.
+
+    The multiplier's magnitude is normalized into ``[2**15, 2**16)``, in
+    float32 arithmetic like the firmware.
+    """
+    shift = 0
+    scale = _f32(scale)
+    if scale == 0:
+        return 0, shift
+    gain = abs(_f32(65536.0 / scale))
+    while gain < 32768.0 and shift < Q16_SHIFT_MAX:
+        gain *= 2.0
+        shift += 1
+    while gain >= 65536.0 and shift > Q16_SHIFT_MIN:
+        gain *= 0.5
+        shift -= 1
+    rounded = int(gain + 0.5) if gain < 65535.5 else 65535
+    if rounded == 65536:
+        rounded = 32768
+        shift -= 1
+    return (-rounded if scale < 0 else rounded), shift
+
+
+def q16_scale(counts: int, gain: int, shift: int) -> int:
+    """Tared counts to a Q16.16 weight: ``(counts * gain) >> shift``.
+
+    Mirrors the firmware's split into a high word and a low byte, including
+    where it saturates.
+    """
+    counts = max(-Q16_COUNTS_MAX, min(Q16_COUNTS_MAX, counts))
+    if gain < 0:
+        counts, gain = -counts, -gain
+    high_product = (counts >> 8) * gain
+    low_product = (counts & 0xFF) * gain
+    product = high_product + (low_product >> 8)
+    if shift >= 8:
+        return product >> (shift - 8)
+    up = 8 - shift
+    if product > _INT32_MAX >> up:
+        return _INT32_MAX
+    if product < _INT32_MIN >> up:
+        return _INT32_MIN
+    rest = low_product & 0xFF
+    return (product << up) + (rest >> shift if shift >= 0 else rest << -shift)
+
+
+def q15_ratio2(num_x: int, num_y: int, den: int) -> Tuple[int, int]:
+    """Both numerators over one positive denominator, in Q1.15."""
+    num_x = max(-den, min(den, num_x))
+    num_y = max(-den, min(den, num_y))
+    while den >= 1 << 15:
+        den >>= 1
+        num_x >>= 1
+        num_y >>= 1
+    while den < 1 << 14:
+        den *= 2
+        num_x *= 2
+        num_y *= 2
+    recip = (1 << 30) // den
+    return _sat15((num_x * recip) >> 15), _sat15((num_y * recip) >> 15)
+
+
+def cop_q15(wa: int, wb: int, wc: int, wd: int) -> Tuple[int, int]:
+    """Fixed-point ``calc_cop`` on Q16.16 weights; returns Q1.15 (x, y)."""
+    total = wa + wb + wc + wd
+    if total <= 0:
+        return 0, 0
+    return q15_ratio2((wb + wc) - (wa + wd), (wa + wb) - (wc + wd), total)
+
+
+def cop_float(wa: float, wb: float, wc: float, wd: float) -> Tuple[float, float]:
+    """Reference float ``calc_cop``."""
+    total = wa + wb + wc + wd
+    if total <= 0:
+        return 0.0, 0.0
+    return ((wb + wc) - (wa + wd)) / total, ((wa + wb) - (wc + wd)) / total
+
+
+def random_loads(count: int, seed: int = 0) -> Iterable[Tuple[float, float, float, float]]:
+    """Corner weights from a light touch to a heavy subject, plus some noise."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        total = 10 ** rng.uniform(-1, 3)
+        shares = [rng.random() for _ in range(4)]
+        norm = sum(shares)
+        yield tuple(total * s / norm + rng.gauss(0, 0.05) for s in shares)
+
+
+def max_cop_error(cop_fn: Callable[[int, int, int, int], Tuple[int, int]],
+                  count: int = 100000, seed: int = 0) -> float:
+    """Largest |fixed - float| CoP component over ``count`` random loads."""
+    worst = 0.0
+    for loads in random_loads(count, seed):
+        q = [_sat32(int(round(w * 65536))) for w in loads]
+        fx, fy = cop_float(*(w / 65536 for w in q))
+        if sum(q) <= 0:
+            continue
+        x, y = cop_fn(*q)
+        fx, fy = max(-1.0, min(32767 / 32768, fx)), max(-1.0, min(32767 / 32768, fy))
+        worst = max(worst, abs(x / 32768 - fx), abs(y / 32768 - fy))
+    return worst
+
+
+def random_weights(count: int, seed: int = 0) -> Iterable[Tuple[int, float]]:
+    """Tared counts and calibration factors over the range of a real plate."""
+    rng = random.Random(seed)
+    for n in range(count):
+        scale = 1.0 if n % 10 == 0 else 10 ** rng.uniform(-0.5, 4.5) * rng.choice((1, -1))
+        weight = rng.uniform(-min(30000.0, 8e6 / abs(scale)), min(30000.0, 8e6 / abs(scale)))
+        yield int(round(weight * scale)), scale
+
+
+def max_weight_error(weight_fn: Callable[[int, float], int],
+                     count: int = 100000, seed: int = 0) -> float:
+    """Largest relative |fixed - float| weight over ``count`` random factors."""
+    worst = 0.0
+    for counts, scale in random_weights(count, seed):
+        exact = counts / scale
+        worst = max(worst, abs(weight_fn(counts, scale) / 65536 - exact) / max(1.0, abs(exact)))
+    return worst
+
+
+def model_weight(counts: int, scale: float) -> int:
+    """Python model of ``Scale::raw_to_weight`` in a fixed-point build."""
+    return q16_scale(counts, *q16_gain(scale))
+
+
+@functools.lru_cache(maxsize=None)
+def _firmware_library() -> ctypes.CDLL:
+    """Compile the firmware's ``fixed_point.cpp`` with a small C shim."""
+    shim = (
+        '#include "fixed_point.h"\n'
+        'extern "C" void cop(int32_t a, int32_t b, int32_t c, int32_t d, int16_t* out) {\n'
+        "    int32_t t = a + b + c + d;\n"
+        "    if (t <= 0) { out[0] = out[1] = 0; return; }\n"
+        "    q15_ratio2((b + c) - (a + d), (a + b) - (c + d), t, out[0], out[1]);\n"
+        "}\n"
+        'extern "C" int32_t weight(int32_t counts, float scale) {\n'
+        "    int8_t shift;\n"
+        "    int32_t gain = q16_gain(scale, shift);\n"
+        "    return q16_scale(counts, gain, shift);\n"
+        "}\n"
+    )
+    build = tempfile.mkdtemp(prefix="cop_fixed_")
+    src = os.path.join(build, "shim.cpp")
+    lib = os.path.join(build, "libcopfixed.so")
+    with open(src, "w") as f:
+        f.write(shim)
+    subprocess.check_call([
+        os.environ.get("CXX", "c++"), "-O2", "-shared", "-fPIC", "-DCOP_FIXED_POINT=1",
+        "-I", _FIRMWARE_DIR, src, os.path.join(_FIRMWARE_DIR, "fixed_point.cpp"), "-o", lib,
+    ])
+    dll = ctypes.CDLL(lib)
+    dll.cop.argtypes = [ctypes.c_int32] * 4 + [ctypes.POINTER(ctypes.c_int16)]
+    dll.weight.argtypes = [ctypes.c_int32, ctypes.c_float]
+    dll.weight.restype = ctypes.c_int32
+    return dll
+
+
+def load_firmware_cop() -> Callable[[int, int, int, int], Tuple[int, int]]:
+    """Compile the firmware's ``fixed_point.cpp`` and return its CoP routine."""
+    dll = _firmware_library()
+
+    def cop(wa: int, wb: int, wc: int, wd: int) -> Tuple[int, int]:
+        out = (ctypes.c_int16 * 2)()
+        dll.cop(wa, wb, wc, wd, out)
+        return out[0], out[1]
+
+    return cop
+
+
+def load_firmware_weight() -> Callable[[int, float], int]:
+    """Compile the firmware's ``fixed_point.cpp`` and return its weight routine."""
+    dll = _firmware_library()
+
+    def weight(counts: int, scale: float) -> int:
+        return dll.weight(counts, scale)
+
+    return weight
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--firmware", action="store_true",
+                        help="also check the compiled firmware fixed_point.cpp")
+    args = parser.parse_args(argv)
+
+    candidates = [("python model", cop_q15, model_weight)]
+    if args.firmware:
+        candidates.append(("firmware", load_firmware_cop(), load_firmware_weight()))
+
+    ok = True
+    for name, cop_fn, weight_fn in candidates:
+        for what, err, tolerance in (
+            ("CoP", max_cop_error(cop_fn, args.samples), COP_TOLERANCE),
+            ("weight", max_weight_error(weight_fn, args.samples), WEIGHT_TOLERANCE),
+        ):
+            passed = err <= tolerance
+            ok &= passed
+            print(f"{name}: max {what} error {err:.2e} (tolerance {tolerance:.2e}) "
+                  f"{'ok' if passed else 'FAIL'}")
+    if args.firmware:
+        firmware_weight = candidates[1][2]
+        differ = sum(firmware_weight(counts, scale) != model_weight(counts, scale)
+                     for counts, scale in random_weights(args.samples))
+        ok &= differ == 0
+        print(f"firmware vs python model: {differ} weights differ {'ok' if not differ else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
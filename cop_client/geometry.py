@@ -0,0 +1,92 @@
+"""Platform geometry: where the load cells are, and CoP in millimetres.
+
+The controller stores the X and Y position of each load cell (``g``
+command) and can stream the CoP in millimetres itself (``u m``). When it
+streams normalized CoP instead, :class:`Geometry` does the conversion on the
+host.
+
+Coordinates are millimetres from the platform centre. X points from A
+towards B and Y from D towards A, so A is front-left, B front-right, C
+back-right and D back-left, the same signs as the normalized CoP::
+
+    geo = Geometry.rectangle(420, 380)
+    dev.set_geometry(geo)                  # store it on the controller
+    geo.cop_mm(frame.weights)              # from weights, any layout
+    geo.from_normalized(frame.cop_x, frame.cop_y)   # rectangles only
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+# Corner signs of a rectangle, in scale order A-D.
+_SIGN_X = (-1, 1, 1, -1)
+_SIGN_Y = (1, 1, -1, -1)
+
+
+@dataclass(frozen=True)
+class Geometry:
+    """Load-cell positions in mm, and whether the controller streams CoP in mm."""
+
+    corner_x: Tuple[float, float, float, float]
+    corner_y: Tuple[float, float, float, float]
+    cop_in_mm: bool = False
+
+    @classmethod
+    def rectangle(cls, spacing_x: float, spacing_y: float, cop_in_mm: bool = False) -> "Geometry":
+        """Load cells on a rectangle: ``spacing_x`` between A and B, ``spacing_y`` between A and D."""
+        return cls(
+            corner_x=tuple(s * spacing_x / 2.0 for s in _SIGN_X),
+            corner_y=tuple(s * spacing_y / 2.0 for s in _SIGN_Y),
+            cop_in_mm=cop_in_mm,
+        )
+
+    @classmethod
+    def from_values(cls, values) -> "Geometry":
+        """Build from the nine values of a ``GEO`` line or status packet."""
+        values = list(values)
+        if len(values) != 9:
+            raise ValueError("expected 9 geometry values, got %d" % len(values))
+        return cls(
+            corner_x=tuple(float(v) for v in values[1::2]),
+            corner_y=tuple(float(v) for v in values[2::2]),
+            cop_in_mm=bool(round(values[0])),
+        )
+
+    @property
+    def extent(self) -> float:
+        """Largest distance of any load cell from the centre along X or Y."""
+        return max(abs(v) for v in self.corner_x + self.corner_y)
+
+    @property
+    def is_rectangle(self) -> bool:
+        """True if the load cells sit on a rectangle centred on the origin."""
+        half_x = self.corner_x[1]
+        half_y = self.corner_y[0]
+        return all(
+            math.isclose(x, s * half_x, abs_tol=1e-6) and math.isclose(y, t * half_y, abs_tol=1e-6)
+            for x, y, s, t in zip(self.corner_x, self.corner_y, _SIGN_X, _SIGN_Y)
+        )
+
+    def cop_mm(self, weights: Sequence[float]) -> Tuple[float, float]:
+        """Position-weighted mean of the load cells, ``(0, 0)`` with no load."""
+        total = sum(weights)
+        if total <= 0:
+            return 0.0, 0.0
+        x = sum(w * p for w, p in zip(weights, self.corner_x))
+        y = sum(w * p for w, p in zip(weights, self.corner_y))
+        return x / total, y / total
+
+    def from_normalized(self, x: float, y: float) -> Tuple[float, float]:
+        """Scale a normalized CoP to mm; exact for rectangular layouts only."""
+        if not self.is_rectangle:
+            raise ValueError("normalized CoP only maps to mm on a rectangle; use cop_mm()")
+        return x * self.corner_x[1], y * self.corner_y[0]
+
+    def command(self) -> str:
+        """The ``g`` command that stores this geometry on the controller."""
+        if self.is_rectangle:
+            return "g %g %g" % (2 * self.corner_x[1], 2 * self.corner_y[0])
+        return "g " + " ".join("%g %g" % p for p in zip(self.corner_x, self.corner_y))
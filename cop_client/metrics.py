@@ -0,0 +1,217 @@
+"""Incremental posturography metrics over a sliding window of CoP samples.
+
+:class:`SwayMetrics` takes one CoP sample at a time and keeps these over
+the last ``window_s`` seconds of device time, or over the whole session:
+
+* path length (sum of distances between consecutive samples)
+* mean velocity (path length over the window duration)
+* mean position, RMS displacement about the mean (overall and per axis)
+* range on each axis
+* area of the 95% confidence ellipse, ``pi * 5.991 * sqrt(det(cov))``.
+  5.991 is the 95% point of the chi-square distribution with 2 degrees of
+  freedom.
+
+Each update costs O(1) amortized time. Sums of x, y, x^2, y^2, xy and the
+step lengths are updated as samples enter and leave the window. Ranges come
+from monotonic deques. To stop rounding error growing over long sessions,
+the sums are rebuilt from the window after every full window of evictions.
+
+Samples are normalized CoP in [-1, 1], as in ``calc_cop()``, or
+millimetres when the controller streams them that way (``u m``; the frame's
+``cop_in_mm``). Give the platform size to convert normalized samples to
+millimetres: x = 1 is the line through the B and C load cells, so
+``width_mm`` is the A-B spacing and ``depth_mm`` the A-D spacing. Samples
+already in millimetres are used as they are.
+
+Usage::
+
+    sway = SwayMetrics(window_s=30, width_mm=400, depth_mm=400)
+    for frame in client:
+        if isinstance(frame, (SampleFrame, CopFrame)):
+            sway.add_frame(frame)
+    print(sway.stats().ellipse_area)
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional, Tuple
+
+#: Chi-square 95% quantile with 2 degrees of freedom.
+CHI2_95_2DOF = 5.991464547107979
+
+_WRAP_US = 1 << 32
+
+
+@dataclass(frozen=True)
+class SwayStats:
+    """Metrics over the current window, in mm if the platform size is set."""
+
+    samples: int
+    duration_s: float
+    path_length: float
+    mean_velocity: float    #: path length per second
+    mean_x: float
+    mean_y: float
+    rms: float              #: RMS distance from the mean position
+    rms_x: float
+    rms_y: float
+    range_x: float
+    range_y: float
+    ellipse_area: float     #: 95% confidence ellipse, units squared
+
+
+class _Extreme:
+    """Sliding-window minimum (or maximum) with a monotonic deque."""
+
+    def __init__(self, sign: float) -> None:
+        self._sign = sign
+        self._items: Deque[Tuple[int, float]] = deque()
+
+    def push(self, index: int, value: float) -> None:
+        key = self._sign * value
+        items = self._items
+        while items and self._sign * items[-1][1] >= key:
+            items.pop()
+        items.append((index, value))
+
+    def expire(self, oldest: int) -> None:
+        items = self._items
+        while items and items[0][0] < oldest:
+            items.popleft()
+
+    @property
+    def value(self) -> float:
+        return self._items[0][1] if self._items else 0.0
+
+
+class SwayMetrics:
+    """Running sway metrics for one platform."""
+
+    def __init__(self, window_s: Optional[float] = 30.0,
+                 width_mm: Optional[float] = None, depth_mm: Optional[float] = None) -> None:
+        """
+        Args:
+            window_s: Window length in seconds of device time; ``None`` keeps
+                every sample since the last :meth:`reset`.
+            width_mm: Distance between the A and B load cells.
+            depth_mm: Distance between the A and D load cells.
+        """
+        self.window_us = None if window_s is None else int(window_s * 1e6)
+        self.scale_x = 1.0 if width_mm is None else width_mm / 2.0
+        self.scale_y = 1.0 if depth_mm is None else depth_mm / 2.0
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every sample."""
+        # Samples as (index, t_us, x, y, step from the previous sample).
+        self._window: Deque[Tuple[int, int, float, float, float]] = deque()
+        self._min_x, self._max_x = _Extreme(1.0), _Extreme(-1.0)
+        self._min_y, self._max_y = _Extreme(1.0), _Extreme(-1.0)
+        self._next_index = 0
+        self._last_raw: Optional[int] = None
+        self._t = 0
+        self._evicted = 0
+        self._sx = self._sy = self._sxx = self._syy = self._sxy = self._steps = 0.0
+
+    def add(self, timestamp_us: int, x: float, y: float, in_mm: bool = False) -> None:
+        """Add one sample.
+
+        Args:
+            timestamp_us: Device timestamp; the 32-bit ``micros()`` wrap is
+                handled, but samples must arrive in order.
+            x, y: Normalized CoP, or millimetres if ``in_mm``.
+            in_mm: The CoP is already in millimetres; skip the platform size.
+        """
+        if self._last_raw is not None:
+            self._t += (timestamp_us - self._last_raw) % _WRAP_US
+        self._last_raw = timestamp_us
+        if not in_mm:
+            x *= self.scale_x
+            y *= self.scale_y
+
+        window = self._window
+        step = math.hypot(x - window[-1][2], y - window[-1][3]) if window else 0.0
+        index = self._next_index
+        self._next_index += 1
+        window.append((index, self._t, x, y, step))
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._syy += y * y
+        self._sxy += x * y
+        self._steps += step
+        for extreme, value in ((self._min_x, x), (self._max_x, x), (self._min_y, y), (self._max_y, y)):
+            extreme.push(index, value)
+
+        if self.window_us is not None:
+            while self._t - window[0][1] > self.window_us:
+                self._evict()
+            oldest = window[0][0]
+            for extreme in (self._min_x, self._max_x, self._min_y, self._max_y):
+                extreme.expire(oldest)
+
+    def add_frame(self, frame) -> None:
+        """Add a frame with ``timestamp_us``, ``cop_x``, ``cop_y`` and ``cop_in_mm``."""
+        self.add(frame.timestamp_us, frame.cop_x, frame.cop_y, frame.cop_in_mm)
+
+    def _evict(self) -> None:
+        _, _, x, y, step = self._window.popleft()
+        self._sx -= x
+        self._sy -= y
+        self._sxx -= x * x
+        self._syy -= y * y
+        self._sxy -= x * y
+        self._steps -= step
+        self._evicted += 1
+        if self._evicted >= len(self._window):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Recompute the running sums from the window to shed rounding error."""
+        self._evicted = 0
+        self._sx = self._sy = self._sxx = self._syy = self._sxy = self._steps = 0.0
+        for _, _, x, y, step in self._window:
+            self._sx += x
+            self._sy += y
+            self._sxx += x * x
+            self._syy += y * y
+            self._sxy += x * y
+            self._steps += step
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def stats(self) -> SwayStats:
+        """Metrics over the current window; O(1)."""
+        window = self._window
+        n = len(window)
+        if n == 0:
+            return SwayStats(0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+        duration = (window[-1][1] - window[0][1]) / 1e6
+        # The first sample's step leads out of the window.
+        path = max(self._steps - window[0][4], 0.0)
+        mean_x = self._sx / n
+        mean_y = self._sy / n
+        var_x = max(self._sxx / n - mean_x * mean_x, 0.0)
+        var_y = max(self._syy / n - mean_y * mean_y, 0.0)
+        cov_xy = self._sxy / n - mean_x * mean_y
+        # Sample (n - 1) covariance for the ellipse.
+        bessel = n / (n - 1) if n > 1 else 0.0
+        det = max((var_x * var_y - cov_xy * cov_xy) * bessel * bessel, 0.0)
+        return SwayStats(
+            samples=n,
+            duration_s=duration,
+            path_length=path,
+            mean_velocity=path / duration if duration > 0 else 0.0,
+            mean_x=mean_x,
+            mean_y=mean_y,
+            rms=math.sqrt(var_x + var_y),
+            rms_x=math.sqrt(var_x),
+            rms_y=math.sqrt(var_y),
+            range_x=self._max_x.value - self._min_x.value,
+            range_y=self._max_y.value - self._min_y.value,
+            ellipse_area=math.pi * CHI2_95_2DOF * math.sqrt(det),
+        )
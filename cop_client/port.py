@@ -0,0 +1,130 @@
+"""Minimal serial port for the controller, with no required dependencies.
+
+On POSIX systems the device is opened directly and configured with
+``termios`` (raw, 8N1, 115200 baud), which also works on the pseudo-terminals
+the simulator creates. The file descriptor is non-blocking, so an asyncio
+loop can watch it with ``add_reader``. Elsewhere ``pyserial`` is used if it is
+installed.
+
+Opening the port toggles DTR, which resets most Arduino Nano boards; wait for
+the ``System ready.`` line before sending commands.
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import select
+from typing import Optional
+
+try:
+    import termios
+    import tty
+except ImportError:  # pragma: no cover - Windows
+    termios = None
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+#: Largest number of bytes taken from the OS per read call.
+READ_CHUNK = 65536
+
+
+class SerialPort:
+    """Raw byte access to the controller's serial port."""
+
+    def __init__(self, path: str, baudrate: int = 115200) -> None:
+        self.path = path
+        self._fd: Optional[int] = None
+        self._serial = None
+        if termios is not None:
+            self._fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+            try:
+                self._configure(baudrate)
+            except Exception:
+                os.close(self._fd)
+                raise
+        elif serial is not None:
+            self._serial = serial.Serial(path, baudrate, timeout=0)
+        else:
+            raise ImportError("pyserial is required on platforms without termios")
+
+    def _configure(self, baudrate: int) -> None:
+        speed = getattr(termios, "B%d" % baudrate, None)
+        if speed is None:
+            raise ValueError("unsupported baud rate: %d" % baudrate)
+        tty.setraw(self._fd)
+        attrs = termios.tcgetattr(self._fd)
+        attrs[2] |= termios.CLOCAL | termios.CREAD
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(self._fd, termios.TCSANOW, attrs)
+
+    def fileno(self) -> int:
+        """File descriptor for ``select`` or ``loop.add_reader`` (POSIX only)."""
+        if self._fd is None:
+            return self._serial.fileno()
+        return self._fd
+
+    def read(self, timeout: Optional[float] = None) -> bytes:
+        """Wait up to ``timeout`` seconds for data and return all that is waiting.
+
+        Returns ``b""`` on timeout.
+
+        Raises:
+            EOFError: if the device went away.
+        """
+        if self._serial is not None:
+            self._serial.timeout = timeout
+            data = self._serial.read(1)
+            return data + self._serial.read(self._serial.in_waiting) if data else b""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        return self.read_nowait() if ready else b""
+
+    def read_nowait(self) -> bytes:
+        """Return whatever is waiting, up to ``READ_CHUNK`` bytes, without blocking.
+
+        Raises:
+            EOFError: if the device went away.
+        """
+        if self._serial is not None:
+            return self._serial.read(self._serial.in_waiting)
+        try:
+            data = os.read(self._fd, READ_CHUNK)
+        except BlockingIOError:
+            return b""
+        except OSError as exc:
+            # A closed pseudo-terminal reports EIO rather than end of file.
+            if exc.errno == errno.EIO:
+                raise EOFError(self.path) from exc
+            raise
+        if not data:
+            raise EOFError(self.path)
+        return data
+
+    def write(self, data: bytes) -> None:
+        """Write all of ``data``, waiting for the driver if its buffer is full."""
+        if self._serial is not None:
+            self._serial.write(data)
+            return
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self._fd, view):]
+            except BlockingIOError:
+                select.select([], [self._fd], [])
+
+    def close(self) -> None:
+        """Close the port; safe to call twice."""
+        if self._serial is not None:
+            self._serial.close()
+        elif self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "SerialPort":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
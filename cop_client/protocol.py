@@ -0,0 +1,248 @@
+"""Decoder for the controller's COBS-framed binary stream (the ``b`` mode).
+
+The packet layout is documented in ``cop_controller/protocol.h``. Each packet
+is a payload plus a little-endian CRC-16/CCITT-FALSE, COBS encoded and
+terminated by a zero byte.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+PACKET_SAMPLE = 0x01
+PACKET_STATUS = 0x02
+
+#: Sample flag: a tare is in progress; weights still use the old offsets.
+FLAG_TARING = 0x01
+#: Sample flag: the CoP is in tenths of a millimetre rather than Q1.15.
+FLAG_MM = 0x02
+
+#: Status code: tare finished; ``values`` are the new offsets A-D (counts).
+STATUS_TARED = 0x01
+#: Status code: calibration finished; ``values`` are factors A-D, spread, average.
+STATUS_CALIBRATED = 0x02
+#: Status code: placement captured; ``values`` are net counts A-D.
+STATUS_PLACEMENT = 0x03
+#: Status code: loop statistics; ``values`` are named by ``STATS_FIELDS``.
+STATUS_STATS = 0x04
+#: Status code: clock sync; ``values`` are device ``micros()``, last seq, decimation.
+STATUS_SYNC = 0x05
+#: Status code: settings in use; ``values`` are factor/offset pairs A-D,
+#: filter window, filter sigma and decimation.
+STATUS_SETTINGS = 0x06
+#: Status code: platform geometry; ``values`` are the CoP units (0
+#: normalized, 1 mm), then X/Y positions of scales A-D in mm.
+STATUS_GEOMETRY = 0x07
+#: Status code: 'z', 'k' or 'p' was refused; ``values`` is the job still
+#: running (1 tare, 2 calibration, 3 placement).
+STATUS_BUSY = 0x08
+
+#: Names of the ``STATUS_STATS`` values, also the columns of a ``STATS,...`` line.
+STATS_FIELDS = (
+    "frames", "overruns", "late", "rejections",
+    "acquire_min", "acquire_mean", "acquire_max",
+    "filter_min", "filter_mean", "filter_max",
+    "cop_min", "cop_mean", "cop_max",
+    "output_min", "output_mean", "output_max",
+)
+
+# struct format of each status code's values; float32 if not listed.
+_STATUS_FORMAT = {
+    STATUS_TARED: "i",
+    STATUS_PLACEMENT: "i",
+    STATUS_STATS: "I",
+    STATUS_SYNC: "I",
+    STATUS_BUSY: "I",
+}
+
+_SAMPLE = struct.Struct("<BBHI4i2h")
+
+#: Length of an encoded sample packet without its delimiter (payload + CRC + 1).
+SAMPLE_BLOCK_SIZE = _SAMPLE.size + 3
+
+Q16 = 1 << 16
+Q15 = 1 << 15
+#: Divisor of the CoP fields of a ``FLAG_MM`` sample (tenths of a mm).
+MM_DIVISOR = 10
+
+
+def crc16(data: bytes, crc: int = 0xFFFF) -> int:
+    """Return the CRC-16/CCITT-FALSE of ``data``, as computed by ``crc16.cpp``."""
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        crc &= 0xFFFF
+    return crc
+
+
+def cobs_decode(data: bytes) -> bytes:
+    """Decode one COBS block (without its zero delimiter).
+
+    Raises:
+        ValueError: if a code byte points past the end of the block.
+    """
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        code = data[i]
+        end = i + code
+        if code == 0 or end > n:
+            raise ValueError("malformed COBS block")
+        out += data[i + 1:end]
+        i = end
+        if code < 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+def cobs_encode(data: bytes) -> bytes:
+    """COBS encode ``data``; the zero delimiter is not appended."""
+    out = bytearray([0])
+    code_pos = 0
+    code = 1
+    for byte in data:
+        if byte == 0:
+            out[code_pos] = code
+            code_pos = len(out)
+            out.append(0)
+            code = 1
+        else:
+            out.append(byte)
+            code += 1
+            if code == 0xFF:
+                out[code_pos] = code
+                code_pos = len(out)
+                out.append(0)
+                code = 1
+    out[code_pos] = code
+    return bytes(out)
+
+
+@dataclass(frozen=True)
+class SampleFrame:
+    """One streamed sample: weights in calibrated units and CoP.
+
+    The CoP is normalized unless :attr:`cop_in_mm` is set, when it is in
+    millimetres from the platform centre.
+    """
+
+    seq: int
+    timestamp_us: int
+    flags: int
+    weights: Tuple[float, float, float, float]
+    cop_x: float
+    cop_y: float
+
+    @property
+    def total(self) -> float:
+        """Sum of the four corner weights."""
+        return sum(self.weights)
+
+    @property
+    def taring(self) -> bool:
+        """True while the device is averaging frames for a tare."""
+        return bool(self.flags & FLAG_TARING)
+
+    @property
+    def cop_in_mm(self) -> bool:
+        """True if the CoP is in millimetres (``u m``) rather than normalized."""
+        return bool(self.flags & FLAG_MM)
+
+
+@dataclass(frozen=True)
+class StatusFrame:
+    """Completion report of a background job (``STATUS_*`` code)."""
+
+    code: int
+    values: Tuple[Union[int, float], ...]
+
+
+Frame = Union[SampleFrame, StatusFrame]
+
+
+def decode_packet(block: bytes) -> Optional[Frame]:
+    """Decode one COBS block into a frame.
+
+    Returns ``None`` for blocks that fail COBS decoding, the CRC check, or are
+    not a known packet type (for example menu text sent between packets).
+    """
+    try:
+        payload = cobs_decode(block)
+    except ValueError:
+        return None
+    if len(payload) < 3:
+        return None
+    body, crc = payload[:-2], int.from_bytes(payload[-2:], "little")
+    if crc16(body) != crc:
+        return None
+    if body[0] == PACKET_SAMPLE and len(body) == _SAMPLE.size:
+        _, flags, seq, ts, wa, wb, wc, wd, x, y = _SAMPLE.unpack(body)
+        cop_scale = MM_DIVISOR if flags & FLAG_MM else Q15
+        return SampleFrame(
+            seq=seq,
+            timestamp_us=ts,
+            flags=flags,
+            weights=(wa / Q16, wb / Q16, wc / Q16, wd / Q16),
+            cop_x=x / cop_scale,
+            cop_y=y / cop_scale,
+        )
+    if body[0] == PACKET_STATUS and len(body) >= 2 and (len(body) - 2) % 4 == 0:
+        fmt = "<%d%s" % ((len(body) - 2) // 4, _STATUS_FORMAT.get(body[1], "f"))
+        return StatusFrame(code=body[1], values=struct.unpack(fmt, body[2:]))
+    return None
+
+
+def encode_sample(frame: SampleFrame) -> bytes:
+    """Encode a frame exactly as the firmware does, including the delimiter."""
+    cop_scale = MM_DIVISOR if frame.flags & FLAG_MM else Q15
+    body = _SAMPLE.pack(
+        PACKET_SAMPLE,
+        frame.flags,
+        frame.seq & 0xFFFF,
+        frame.timestamp_us & 0xFFFFFFFF,
+        *(_saturate(round(w * Q16), 32) for w in frame.weights),
+        _saturate(round(frame.cop_x * cop_scale), 16),
+        _saturate(round(frame.cop_y * cop_scale), 16),
+    )
+    return cobs_encode(body + crc16(body).to_bytes(2, "little")) + b"\x00"
+
+
+def _saturate(value: int, bits: int) -> int:
+    hi = (1 << (bits - 1)) - 1
+    return max(-hi - 1, min(hi, value))
+
+
+class PacketDecoder:
+    """Incremental decoder: feed raw serial bytes, get frames back.
+
+    Bytes are split on the zero delimiter in one pass per ``feed`` call; an
+    incomplete trailing packet is kept until the next call.
+    """
+
+    def __init__(self) -> None:
+        self._pending = b""
+        self.packets = 0
+        self.errors = 0
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """Decode every complete packet in ``data`` plus any carried-over bytes."""
+        blocks = (self._pending + data).split(b"\x00")
+        self._pending = blocks.pop()
+        frames = []
+        for block in blocks:
+            if not block:
+                continue
+            frame = decode_packet(block)
+            if frame is None and len(block) > SAMPLE_BLOCK_SIZE:
+                # Text written before the stream started shares the block.
+                frame = decode_packet(block[-SAMPLE_BLOCK_SIZE:])
+            if frame is None:
+                self.errors += 1
+            else:
+                self.packets += 1
+                frames.append(frame)
+        return frames
@@ -0,0 +1,411 @@
+"""Append-only, chunked columnar recordings that can be memory-mapped.
+
+File layout (all integers little-endian)::
+
+    file header    16 bytes   magic "COPREC1\\n", u32 JSON length, u32 chunk rows
+    JSON header    padded with spaces to a multiple of 64 bytes
+    chunk 0        CHUNK_HEADER then one block per column of ``chunk_rows``
+    chunk 1        ...
+
+The JSON header holds the column list, the chunk size and the device
+settings at record time (the ``i`` command's calibration factor and offset
+of each scale, filter and decimation). Every chunk has the same size, so
+chunk ``k`` is at a fixed offset. Its header holds the number of rows
+used, the first and last timestamp and a CRC-32 of the column data.
+
+The writer fills a chunk in memory and appends it in one write once it is
+full, and a partly filled chunk when it is closed. A crash therefore loses
+at most the chunk being filled. A torn final chunk fails its length or
+CRC check and is ignored by the reader.
+
+Timestamps are device microseconds and sequence numbers are frame
+counters. Both are unwrapped to 64 bits, so they increase through the
+whole file. :meth:`Recording.time_slice` finds the chunks that overlap a
+time range from the chunk headers alone. It returns NumPy views into the
+mapped file, so reading an hour of data into memory is never needed.
+
+Usage::
+
+    python -m cop_client.recording record /dev/ttyUSB0 session.cop --seconds 600
+    python -m cop_client.recording info session.cop
+
+    with Recording("session.cop") as rec:
+        part = rec.time_slice(60e6, 90e6)      # 30 s starting one minute in
+        part["cop_x"], part["timestamp_us"]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from dataclasses import asdict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from .protocol import SampleFrame
+from .text import CopFrame, ReadingsFrame, SettingsFrame
+
+MAGIC = b"COPREC1\n"
+_FILE_HEADER = struct.Struct("<8sII")
+_HEADER_ALIGN = 64
+
+#: Rows per chunk; 1024 rows is about 13 s at 80 SPS.
+CHUNK_ROWS = 1024
+
+#: Columns in file order.
+COLUMNS = (
+    ("timestamp_us", "<i8"),
+    ("seq", "<i8"),
+    ("wa", "<f8"),
+    ("wb", "<f8"),
+    ("wc", "<f8"),
+    ("wd", "<f8"),
+    ("cop_x", "<f8"),
+    ("cop_y", "<f8"),
+)
+
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER = np.dtype([
+    ("magic", "S4"), ("rows", "<u4"), ("first_us", "<i8"), ("last_us", "<i8"),
+    ("crc", "<u4"), ("reserved", "<u4"),
+])
+
+Frame = Union[SampleFrame, ReadingsFrame, CopFrame]
+
+
+def _chunk_bytes(chunk_rows: int) -> int:
+    return CHUNK_HEADER.itemsize + chunk_rows * sum(np.dtype(t).itemsize for _, t in COLUMNS)
+
+
+class _Unwrap:
+    """Extends a wrapping counter to 64 bits; values must arrive in order."""
+
+    def __init__(self, bits: int) -> None:
+        self._period = 1 << bits
+        self._last: Optional[int] = None
+        self._epoch = 0
+
+    def __call__(self, value: int) -> int:
+        if self._last is not None and value < self._last - self._period // 2:
+            self._epoch += self._period
+        self._last = value
+        return self._epoch + value
+
+    def many(self, values: np.ndarray) -> np.ndarray:
+        """Unwrap an array of consecutive values in one pass."""
+        values = np.asarray(values, dtype=np.int64)
+        if values.size == 0:
+            return values
+        prev = np.concatenate(([values[0] if self._last is None else self._last], values[:-1]))
+        wraps = np.cumsum(values < prev - self._period // 2, dtype=np.int64)
+        out = self._epoch + values + wraps * self._period
+        self._epoch += int(wraps[-1]) * self._period
+        self._last = int(values[-1])
+        return out
+
+
+class RecordingWriter:
+    """Appends frames to a new recording file."""
+
+    def __init__(self, path: str, settings: Optional[SettingsFrame] = None,
+                 chunk_rows: int = CHUNK_ROWS, metadata: Optional[dict] = None,
+                 fsync: bool = False) -> None:
+        """Create ``path`` and write its header.
+
+        Args:
+            path: File to create; an existing file is overwritten.
+            settings: Device settings at record time, from the ``i`` command.
+            chunk_rows: Rows per chunk; also the most a crash can lose.
+            metadata: Any JSON-serializable notes, e.g. subject or trial.
+            fsync: Force every chunk to disk as it is written.
+        """
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self._fsync = fsync
+        self._fill = 0
+        self._columns = {name: np.zeros(chunk_rows, dtype=dtype) for name, dtype in COLUMNS}
+        self._seq = _Unwrap(16)
+        self._time = _Unwrap(32)
+
+        header = {
+            "format": "cop-recording",
+            "version": 1,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "chunk_rows": chunk_rows,
+            "columns": [list(c) for c in COLUMNS],
+            "settings": asdict(settings) if settings is not None else None,
+            "metadata": metadata or {},
+        }
+        body = json.dumps(header, indent=1).encode("utf-8")
+        used = _FILE_HEADER.size + len(body)
+        body += b" " * (-used % _HEADER_ALIGN)
+
+        self._file = open(path, "wb")
+        self._file.write(_FILE_HEADER.pack(MAGIC, len(body), chunk_rows) + body)
+        self._file.flush()
+
+    def append(self, frame: Frame) -> None:
+        """Add one frame. Columns a frame type does not carry are NaN."""
+        i = self._fill
+        cols = self._columns
+        cols["timestamp_us"][i] = self._time(frame.timestamp_us)
+        cols["seq"][i] = self._seq(frame.seq)
+        weights = getattr(frame, "weights", None)
+        if weights is None:
+            weights = (np.nan,) * 4
+        cols["wa"][i], cols["wb"][i], cols["wc"][i], cols["wd"][i] = weights
+        cols["cop_x"][i] = getattr(frame, "cop_x", np.nan)
+        cols["cop_y"][i] = getattr(frame, "cop_y", np.nan)
+        self._fill += 1
+        self.rows += 1
+        if self._fill == self.chunk_rows:
+            self._write_chunk()
+
+    def append_array(self, samples: np.ndarray) -> None:
+        """Add many frames at once, e.g. ``cop_client.batch`` output.
+
+        ``samples`` needs ``timestamp_us`` and ``seq`` fields, plus
+        ``weights`` and/or ``cop_x``/``cop_y``. Its timestamps and sequence
+        numbers must not be unwrapped yet.
+        """
+        names = samples.dtype.names
+        seq = self._seq.many(samples["seq"])
+        stamp = self._time.many(samples["timestamp_us"])
+        nan = np.full(len(samples), np.nan)
+        weights = samples["weights"] if "weights" in names else np.tile(nan[:, None], 4)
+        source = {
+            "timestamp_us": stamp,
+            "seq": seq,
+            "wa": weights[:, 0], "wb": weights[:, 1], "wc": weights[:, 2], "wd": weights[:, 3],
+            "cop_x": samples["cop_x"] if "cop_x" in names else nan,
+            "cop_y": samples["cop_y"] if "cop_y" in names else nan,
+        }
+        done = 0
+        while done < len(samples):
+            take = min(self.chunk_rows - self._fill, len(samples) - done)
+            for name, _ in COLUMNS:
+                self._columns[name][self._fill:self._fill + take] = source[name][done:done + take]
+            self._fill += take
+            self.rows += take
+            done += take
+            if self._fill == self.chunk_rows:
+                self._write_chunk()
+
+    def _write_chunk(self) -> None:
+        if self._fill == 0:
+            return
+        stamps = self._columns["timestamp_us"]
+        data = b"".join(self._columns[name].tobytes() for name, _ in COLUMNS)
+        header = np.zeros(1, dtype=CHUNK_HEADER)
+        header["magic"] = CHUNK_MAGIC
+        header["rows"] = self._fill
+        header["first_us"] = stamps[0]
+        header["last_us"] = stamps[self._fill - 1]
+        header["crc"] = zlib.crc32(data)
+        self._file.write(header.tobytes() + data)
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+        for column in self._columns.values():
+            column.fill(0)
+        self._fill = 0
+
+    def close(self) -> None:
+        """Write the partly filled chunk and close the file."""
+        if not self._file.closed:
+            self._write_chunk()
+            self._file.close()
+
+    def __enter__(self) -> "RecordingWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Recording:
+    """Memory-mapped reader for a recording file."""
+
+    def __init__(self, path: str, verify: bool = False) -> None:
+        """Map ``path`` and index its chunks.
+
+        Args:
+            path: Recording file.
+            verify: Check the CRC of every chunk, which reads the whole file.
+                The last chunk is always checked, since a crash can tear it.
+        """
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _FILE_HEADER.size:
+            raise ValueError("%s: not a recording" % path)
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len, chunk_rows = _FILE_HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError("%s: not a recording" % path)
+        self.header = json.loads(bytes(self._mm[_FILE_HEADER.size:_FILE_HEADER.size + header_len]))
+        self.chunk_rows = chunk_rows
+        self._start = _FILE_HEADER.size + header_len
+        self._chunk_bytes = _chunk_bytes(chunk_rows)
+
+        count = max(0, (size - self._start) // self._chunk_bytes)
+        headers = np.ndarray((count,), dtype=CHUNK_HEADER, buffer=self._mm,
+                             offset=self._start, strides=(self._chunk_bytes,))
+        good = (headers["magic"] == CHUNK_MAGIC) & (headers["rows"] <= chunk_rows)
+        # Chunks are written in order, so the first bad one ends the file.
+        count = int(np.argmin(good)) if not good.all() else count
+        check = range(count) if verify else range(max(0, count - 1), count)
+        for k in check:
+            if zlib.crc32(self._chunk_data(k)) != int(headers["crc"][k]):
+                count = k
+                break
+        self._headers = headers[:count]
+        self._offsets = np.concatenate(([0], np.cumsum(self._headers["rows"], dtype=np.int64)))
+
+    @property
+    def settings(self) -> Optional[SettingsFrame]:
+        """Device settings at record time, if they were captured."""
+        s = self.header.get("settings")
+        if s is None:
+            return None
+        return SettingsFrame(tuple(s["factors"]), tuple(s["offsets"]), s["filter_window"],
+                             s["filter_sigma"], s["decimation"])
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._headers)
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def start_us(self) -> int:
+        """Timestamp of the first row."""
+        return int(self._headers["first_us"][0]) if len(self) else 0
+
+    @property
+    def end_us(self) -> int:
+        """Timestamp of the last row."""
+        return int(self._headers["last_us"][-1]) if len(self) else 0
+
+    def _chunk_data(self, k: int) -> memoryview:
+        begin = self._start + k * self._chunk_bytes + CHUNK_HEADER.itemsize
+        return memoryview(self._mm)[begin:begin + self._chunk_bytes - CHUNK_HEADER.itemsize]
+
+    def chunk(self, k: int) -> Dict[str, np.ndarray]:
+        """Columns of chunk ``k`` as read-only views into the file."""
+        rows = int(self._headers["rows"][k])
+        offset = self._start + k * self._chunk_bytes + CHUNK_HEADER.itemsize
+        out = {}
+        for name, dtype in COLUMNS:
+            out[name] = np.frombuffer(self._mm, dtype=dtype, count=rows, offset=offset)
+            offset += self.chunk_rows * np.dtype(dtype).itemsize
+        return out
+
+    def _join(self, parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([p[name] for p in parts]) if parts
+                else np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+
+    def rows(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """Columns of rows ``start`` to ``stop``; views when within one chunk."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        parts = []
+        k = int(np.searchsorted(self._offsets, start, side="right")) - 1
+        while start < stop:
+            base = int(self._offsets[k])
+            end = min(stop, int(self._offsets[k + 1]))
+            parts.append({n: c[start - base:end - base] for n, c in self.chunk(k).items()})
+            start = end
+            k += 1
+        return self._join(parts)
+
+    def time_slice(self, start_us: float, stop_us: float) -> Dict[str, np.ndarray]:
+        """Columns of the rows with ``start_us <= timestamp_us < stop_us``.
+
+        Only the chunks that overlap the range are touched.
+        """
+        first = int(np.searchsorted(self._headers["last_us"], start_us, side="left"))
+        last = int(np.searchsorted(self._headers["first_us"], stop_us, side="left"))
+        parts = []
+        for k in range(first, last):
+            cols = self.chunk(k)
+            lo, hi = np.searchsorted(cols["timestamp_us"], (start_us, stop_us), side="left")
+            parts.append({n: c[lo:hi] for n, c in cols.items()})
+        return self._join(parts)
+
+    def close(self) -> None:
+        """Unmap the file; arrays still referencing it keep the mapping alive."""
+        self._headers = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __enter__(self) -> "Recording":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def record(port: str, path: str, seconds: Optional[float] = None,
+           metadata: Optional[dict] = None) -> int:
+    """Capture the binary stream from ``port`` into ``path``; returns the row count."""
+    from .client import CopClient
+
+    with CopClient(port) as dev:
+        try:
+            dev.wait_ready(timeout=3.0)
+        except TimeoutError:
+            dev.stop()  # the board did not reset on open; make sure it is idle
+        dev.report_settings()
+        settings = dev.wait_for(lambda f: isinstance(f, SettingsFrame))
+        deadline = None if seconds is None else time.monotonic() + seconds
+        with RecordingWriter(path, settings, metadata=metadata) as writer:
+            dev.stream_binary()
+            try:
+                while deadline is None or time.monotonic() < deadline:
+                    for frame in dev.read(timeout=0.5):
+                        if isinstance(frame, SampleFrame):
+                            writer.append(frame)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                dev.stop()
+            return writer.rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record the binary stream until Ctrl-C")
+    rec.add_argument("port")
+    rec.add_argument("path")
+    rec.add_argument("--seconds", type=float, help="stop after this long")
+    info = sub.add_parser("info", help="describe a recording")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        rows = record(args.port, args.path, args.seconds)
+        print("%d rows written to %s" % (rows, args.path))
+        return 0
+
+    with Recording(args.path, verify=True) as rec:
+        print("%d rows in %d chunks, %.1f s" % (len(rec), rec.chunk_count,
+                                                (rec.end_us - rec.start_us) / 1e6))
+        print("settings:", rec.settings)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+"""Share one controller's live stream with many local clients.
+
+Only one process can open the serial port. :class:`FanoutServer` holds it,
+decodes the stream (``r``, ``c``, ``a`` or ``b``) and sends every sample as
+one JSON object to any number of WebSocket and HTTP clients::
+
+    python -m cop_client.server /dev/ttyUSB0 --port 8765
+
+    ws://localhost:8765/ws?rate=20&fields=cop_x,cop_y    WebSocket, one text message per sample
+    http://localhost:8765/stream?rate=10                 newline-delimited JSON until closed
+    http://localhost:8765/latest                         the newest sample
+    http://localhost:8765/                               server status
+
+Each client picks a ``rate`` in samples per second and the ``fields`` it
+wants from :data:`FIELDS`; both default to everything the stream carries.
+Rates are rounded to a whole divisor of the stream rate, and clients with the
+same divisor share a tier that averages the samples once, as the firmware's
+``d`` command does, and encodes each field selection once.
+
+Acquisition never waits for a client. Every client has a queue of
+``queue_size`` encoded samples; when a client reads too slowly the oldest
+samples are dropped and counted, and the status page shows the count.
+
+Only the standard library is used: the WebSocket side is a minimal RFC 6455
+server that sends text messages, answers pings and honours close.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .client import AsyncCopClient, Frame
+from .protocol import SampleFrame
+from .text import CopFrame, ReadingsFrame, SyncFrame
+
+#: Conversions per second of the HX711 modules, before decimation.
+RATE = 80.0
+
+#: Every field a sample can carry, in output order.
+FIELDS = ("seq", "timestamp_us", "flags", "wa", "wb", "wc", "wd", "total", "cop_x", "cop_y")
+
+#: Encoded samples held per client before the oldest are dropped.
+QUEUE_SIZE = 256
+
+#: Longest request head accepted, bytes.
+HEAD_MAX = 8192
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_TEXT = 0x1
+_WS_CLOSE = 0x8
+_WS_PING = 0x9
+_WS_PONG = 0xA
+
+# Fields averaged by a tier; the rest come from the middle sample.
+_AVERAGED = ("wa", "wb", "wc", "wd", "total", "cop_x", "cop_y")
+
+Sample = Dict[str, float]
+
+
+def to_sample(frame: Frame) -> Optional[Sample]:
+    """Fields of a stream frame, or None for frames that are not samples."""
+    if isinstance(frame, SampleFrame):
+        wa, wb, wc, wd = frame.weights
+        return {"seq": frame.seq, "timestamp_us": frame.timestamp_us, "flags": frame.flags,
+                "wa": wa, "wb": wb, "wc": wc, "wd": wd, "total": wa + wb + wc + wd,
+                "cop_x": frame.cop_x, "cop_y": frame.cop_y}
+    if isinstance(frame, ReadingsFrame):
+        wa, wb, wc, wd = frame.weights
+        return {"seq": frame.seq, "timestamp_us": frame.timestamp_us, "flags": frame.flags,
+                "wa": wa, "wb": wb, "wc": wc, "wd": wd, "total": wa + wb + wc + wd}
+    if isinstance(frame, CopFrame):
+        return {"seq": frame.seq, "timestamp_us": frame.timestamp_us, "flags": frame.flags,
+                "cop_x": frame.cop_x, "cop_y": frame.cop_y}
+    return None
+
+
+def _average(samples: List[Sample]) -> Sample:
+    out = dict(samples[len(samples) // 2])
+    for name in _AVERAGED:
+        if name in out:
+            out[name] = sum(s[name] for s in samples) / len(samples)
+    if "flags" in out:
+        flags = 0
+        for s in samples:
+            flags |= int(s["flags"])
+        out["flags"] = flags
+    return out
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+
+class Subscriber:
+    """One connected client: its field selection and its send queue."""
+
+    def __init__(self, writer: asyncio.StreamWriter, fields: Tuple[str, ...],
+                 websocket: bool, queue_size: int = QUEUE_SIZE) -> None:
+        self.writer = writer
+        self.fields = fields
+        self.websocket = websocket
+        self.sent = 0
+        self.dropped = 0
+        self._queue: Deque[bytes] = deque(maxlen=queue_size)
+        self._event = asyncio.Event()
+        self.closed = False
+
+    @property
+    def key(self) -> Tuple[Tuple[str, ...], bool]:
+        """Subscribers with the same key receive identical bytes."""
+        return self.fields, self.websocket
+
+    def encode(self, sample: Sample) -> bytes:
+        """The sample as this client receives it."""
+        payload = json.dumps({k: sample[k] for k in self.fields if k in sample},
+                             separators=(",", ":")).encode()
+        return _ws_frame(_WS_TEXT, payload) if self.websocket else payload + b"\n"
+
+    def push(self, data: bytes) -> None:
+        """Queue data, dropping the oldest if the client is behind."""
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(data)
+        self._event.set()
+
+    async def run(self) -> None:
+        """Send queued data until the client goes away."""
+        try:
+            while True:
+                await self._event.wait()
+                self._event.clear()
+                if self._queue:
+                    chunk = b"".join(self._queue)
+                    count = len(self._queue)
+                    self._queue.clear()
+                    self.writer.write(chunk)
+                    await self.writer.drain()
+                    self.sent += count
+                if self.closed:
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+
+    def close(self) -> None:
+        """Stop once the queue has been sent."""
+        self.closed = True
+        self._event.set()
+
+
+class Tier:
+    """Clients sharing one output rate; averages every ``divisor`` samples once."""
+
+    def __init__(self, divisor: int) -> None:
+        self.divisor = divisor
+        self.subscribers: Set[Subscriber] = set()
+        self._pending: List[Sample] = []
+
+    def add(self, sample: Sample) -> None:
+        """Take one stream sample and publish every ``divisor``-th average."""
+        if self.divisor == 1:
+            self._publish(sample)
+            return
+        self._pending.append(sample)
+        if len(self._pending) == self.divisor:
+            self._publish(_average(self._pending))
+            self._pending = []
+
+    def _publish(self, sample: Sample) -> None:
+        encoded: Dict[Tuple[Tuple[str, ...], bool], bytes] = {}
+        for sub in self.subscribers:
+            data = encoded.get(sub.key)
+            if data is None:
+                data = encoded[sub.key] = sub.encode(sample)
+            sub.push(data)
+
+
+class FanoutServer:
+    """Serves the frames of one controller to WebSocket and HTTP clients.
+
+    Args:
+        client: Open client whose stream has been started.
+        queue_size: Encoded samples held per slow client.
+    """
+
+    def __init__(self, client: AsyncCopClient, queue_size: int = QUEUE_SIZE) -> None:
+        self.client = client
+        self.queue_size = queue_size
+        self.stream_rate = RATE
+        self.samples = 0
+        self.latest: Optional[Sample] = None
+        self.tiers: Dict[int, Tier] = {}
+        self.started = time.time()
+        self._pump_task = asyncio.ensure_future(self._pump())
+
+    async def _pump(self) -> None:
+        while True:
+            try:
+                frames = await self.client.read_batch()
+            except EOFError:
+                return
+            for frame in frames:
+                if isinstance(frame, SyncFrame):
+                    self.stream_rate = RATE / max(1, frame.decimation)
+                    continue
+                sample = to_sample(frame)
+                if sample is None:
+                    continue
+                self.samples += 1
+                self.latest = sample
+                for tier in list(self.tiers.values()):
+                    tier.add(sample)
+
+    def status(self) -> Dict[str, object]:
+        """Counters for the status page."""
+        subs = [s for t in self.tiers.values() for s in t.subscribers]
+        return {
+            "port": self.client.port.path,
+            "stream_rate": self.stream_rate,
+            "samples": self.samples,
+            "uptime_s": round(time.time() - self.started, 3),
+            "tiers": {str(d): len(t.subscribers) for d, t in sorted(self.tiers.items())},
+            "clients": len(subs),
+            "dropped": sum(s.dropped for s in subs),
+            "serial_dropped": self.client.dropped,
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """Start listening; returns the asyncio server."""
+        return await asyncio.start_server(self._handle, host, port)
+
+    def _subscribe(self, query: Dict[str, List[str]], writer: asyncio.StreamWriter,
+                   websocket: bool) -> Tuple[Subscriber, Tier]:
+        rate = float(query.get("rate", ["0"])[0] or 0)
+        divisor = max(1, round(self.stream_rate / rate)) if rate > 0 else 1
+        names = query.get("fields", [""])[0]
+        fields = tuple(f for f in FIELDS if f in names.split(",")) if names else FIELDS
+        if not fields:
+            raise ValueError("no known fields in %r; choose from %s" % (names, ",".join(FIELDS)))
+        tier = self.tiers.get(divisor)
+        if tier is None:
+            tier = self.tiers[divisor] = Tier(divisor)
+        sub = Subscriber(writer, fields, websocket, self.queue_size)
+        tier.subscribers.add(sub)
+        return sub, tier
+
+    def _unsubscribe(self, sub: Subscriber, tier: Tier) -> None:
+        sub.close()
+        tier.subscribers.discard(sub)
+        if not tier.subscribers and self.tiers.get(tier.divisor) is tier:
+            del self.tiers[tier.divisor]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if len(head) > HEAD_MAX:
+                raise ValueError("request head too long")
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(":")
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+            if method != "GET":
+                await self._respond(writer, 405, {"error": "only GET is supported"})
+            elif url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers, query)
+            elif url.path == "/stream":
+                await self._http_stream(reader, writer, query)
+            elif url.path == "/latest":
+                await self._respond(writer, 200, self.latest)
+            elif url.path == "/":
+                await self._respond(writer, 200, self.status())
+            else:
+                await self._respond(writer, 404, {"error": "not found"})
+        except ValueError as e:
+            await self._respond(writer, 400, {"error": str(e)})
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, body: object) -> None:
+        data = json.dumps(body).encode() + b"\n"
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\nConnection: close\r\n\r\n" % (
+                         status, {200: b"OK", 400: b"Bad Request", 404: b"Not Found",
+                                  405: b"Method Not Allowed"}[status], len(data)) + data)
+        await writer.drain()
+
+    async def _http_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           query: Dict[str, List[str]]) -> None:
+        sub, tier = self._subscribe(query, writer, websocket=False)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        sender = asyncio.ensure_future(sub.run())
+        try:
+            # The client sends nothing more; EOF means it has gone
+            closed = asyncio.ensure_future(reader.read())
+            await asyncio.wait({sender, closed}, return_when=asyncio.FIRST_COMPLETED)
+            closed.cancel()
+        finally:
+            self._unsubscribe(sub, tier)
+            sender.cancel()
+
+    async def _websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         headers: Dict[str, str], query: Dict[str, List[str]]) -> None:
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise ValueError("missing Sec-WebSocket-Key")
+        sub, tier = self._subscribe(query, writer, websocket=True)
+        accept = base64.b64encode(hashlib.sha1(key.encode() + _WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        sender = asyncio.ensure_future(sub.run())
+        try:
+            while not sub.closed:
+                opcode, payload = await self._ws_read(reader)
+                if opcode == _WS_CLOSE:
+                    sub.push(_ws_frame(_WS_CLOSE, payload[:2]))
+                    break
+                if opcode == _WS_PING:
+                    sub.push(_ws_frame(_WS_PONG, payload))
+            # Let the close frame go out
+            sub.close()
+            await asyncio.wait_for(sender, 1.0)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._unsubscribe(sub, tier)
+            sender.cancel()
+
+    @staticmethod
+    async def _ws_read(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+        """Read one client frame; messages from the client are otherwise ignored."""
+        b0, b1 = await reader.readexactly(2)
+        n = b1 & 0x7F
+        if n == 126:
+            (n,) = struct.unpack("!H", await reader.readexactly(2))
+        elif n == 127:
+            (n,) = struct.unpack("!Q", await reader.readexactly(8))
+        if n > HEAD_MAX:
+            raise ConnectionError("client message too long")
+        mask = await reader.readexactly(4) if b1 & 0x80 else b"\0\0\0\0"
+        data = await reader.readexactly(n)
+        payload = bytes(c ^ mask[i & 3] for i, c in enumerate(data))
+        return b0 & 0x0F, payload
+
+    def close(self) -> None:
+        """Close every client and stop reading the controller."""
+        self._pump_task.cancel()
+        for tier in self.tiers.values():
+            for sub in tier.subscribers:
+                sub.close()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    client = await AsyncCopClient.open(args.port, args.baudrate)
+    try:
+        await client.wait_ready()
+        client.send(args.stream)
+        server = FanoutServer(client, args.queue)
+        listener = await server.start(args.host, args.listen)
+        print("serving %s on http://%s:%d/" % (args.port, args.host, args.listen), file=sys.stderr)
+        try:
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            server.close()
+            client.stop()
+    finally:
+        client.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("port", help="controller serial port")
+    parser.add_argument("--stream", choices=("r", "c", "a", "b"), default="b",
+                        help="stream command sent to the controller")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", dest="listen", type=int, default=8765, help="TCP port")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE,
+                        help="samples held per slow client before dropping the oldest")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+"""Virtual controllers on pseudo-terminals, for load-testing acquisition hosts.
+
+Each :class:`VirtualDevice` opens a pty and runs the host build of the
+firmware behind it (:mod:`cop_client.firmware`), so every command, reply and
+binary packet is byte for byte what a real controller sends, including modes
+added to the firmware later. The device is fed four channels of weights,
+replayed from a recording or generated, converted to raw counts at the
+HX711 rate.
+
+:class:`Simulator` paces any number of devices from one thread against the
+wall clock, at real time or faster (``speed``). Opening a device's pty
+reboots it, as DTR does on a Nano, so clients that wait for
+``System ready.`` work unchanged, and EEPROM settings survive the reboot.
+Output is written to the pty as the virtual serial port sends it; when the
+host falls behind, up to :data:`PENDING_MAX` bytes are held per device and
+the rest is dropped and counted, which is how to tell how many platforms a
+host can sustain::
+
+    python -m cop_client.simulator -n 40 --links /tmp/cop
+    python -m cop_client.simulator -n 8 --recording session.cop --loop --speed 4
+
+    sim = Simulator([VirtualDevice(synthetic_weights(seed=i)) for i in range(24)])
+    print([d.path for d in sim.devices])
+    sim.run(duration=60)
+
+With ``speed`` above 1 the devices' clocks run faster too, so timestamps stay
+consistent with the sample rate. Check :attr:`Simulator.load`: above 1.0 the
+simulator itself cannot keep up and the results say nothing about the host.
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import math
+import os
+import random
+import sys
+import time
+import tty
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .firmware import Firmware
+from .port import READ_CHUNK
+from .text import SettingsFrame
+
+#: HX711 conversion rate, samples per second.
+RATE = 80.0
+
+#: Counts per unit weight of each scale when nothing else is given.
+DEFAULT_FACTORS = (1000.0, 1000.0, 1000.0, 1000.0)
+
+#: Raw counts of the empty platform; HX711 offsets are rarely near zero.
+DEFAULT_OFFSETS = (84000, -41500, 131000, 17200)
+
+#: Unloaded conversions at power-up, long enough for the boot tare.
+SETTLE_S = 1.0
+
+#: Output held per device while the host is not reading; the rest is dropped.
+PENDING_MAX = 65536
+
+#: Wall-clock period of the pacing loop.
+TICK_S = 0.005
+
+#: Longest virtual step taken after a stall, so one slow tick is not replayed
+#: as a burst.
+STEP_MAX_S = 0.1
+
+# Conversions kept queued ahead of the firmware.
+_QUEUE_S = 0.25
+_COUNT_MIN = -(1 << 23)
+_COUNT_MAX = (1 << 23) - 1
+
+Row = Tuple[float, float, float, float]
+
+
+def synthetic_weights(rate: float = RATE, total: float = 70.0, amplitude: float = 0.3,
+                      period_s: float = 7.0, noise: float = 0.05,
+                      seed: Optional[int] = None) -> Iterator[Row]:
+    """Endless weights of a person swaying, one row per conversion.
+
+    The CoP follows a slow Lissajous curve of normalized ``amplitude``
+    with Gaussian ``noise`` (weight units) on every corner.
+    """
+    rng = random.Random(seed)
+    phase = rng.uniform(0.0, 2.0 * math.pi)
+    step = 2.0 * math.pi / (period_s * rate)
+    n = 0
+    while True:
+        t = phase + n * step
+        x = amplitude * math.sin(t)
+        y = amplitude * math.sin(1.6 * t + 0.5)
+        # Corners A(-,+), B(+,+), C(+,-), D(-,-), bilinear in the CoP.
+        yield (total * (1 - x) * (1 + y) / 4 + rng.gauss(0.0, noise),
+               total * (1 + x) * (1 + y) / 4 + rng.gauss(0.0, noise),
+               total * (1 + x) * (1 - y) / 4 + rng.gauss(0.0, noise),
+               total * (1 - x) * (1 - y) / 4 + rng.gauss(0.0, noise))
+        n += 1
+
+
+def recording_weights(path: str, loop: bool = False) -> Tuple[Optional[SettingsFrame], Iterator[Row]]:
+    """Settings and weight rows of a recording made with :mod:`cop_client.recording`.
+
+    Rows of a decimated recording are repeated ``decimation`` times, so the
+    replay keeps the recorded time base at the full conversion rate.
+
+    Returns:
+        ``(settings, rows)``; settings is the recording's
+        :class:`~cop_client.text.SettingsFrame` or None.
+    """
+    from .recording import Recording
+
+    rec = Recording(path)
+    settings = rec.settings
+    repeat = max(1, settings.decimation) if settings else 1
+    if not len(rec):
+        raise ValueError("%s: recording is empty" % path)
+
+    def rows() -> Iterator[Row]:
+        while True:
+            for k in range(rec.chunk_count):
+                cols = rec.chunk(k)
+                block = zip(cols["wa"].tolist(), cols["wb"].tolist(),
+                            cols["wc"].tolist(), cols["wd"].tolist())
+                for row in block:
+                    for _ in range(repeat):
+                        yield row
+            if not loop:
+                return
+
+    return settings, rows()
+
+
+_provisioned: Dict[tuple, bytes] = {}
+
+
+def provision(factors: Sequence[float], filter_window: Optional[int] = None,
+              filter_sigma: Optional[float] = None, decimation: Optional[int] = None,
+              fixed_point: bool = False) -> bytes:
+    """EEPROM image of a controller configured through its own commands.
+
+    Cached, so devices with the same settings share one image.
+    """
+    key = (tuple(factors), filter_window, filter_sigma, decimation, fixed_point)
+    if key not in _provisioned:
+        with Firmware(fixed_point=fixed_point) as fw:
+            fw.run(SETTLE_S)
+            fw.set_factors(factors)
+            if filter_window is not None:
+                fw.set_filter(filter_window, filter_sigma)
+            if decimation is not None:
+                fw.set_decimation(decimation)
+            # Saves are coalesced for SETTINGS_HOLDOFF_MS (2 s) before the write
+            fw.run(3.0)
+            _provisioned[key] = fw.eeprom
+    return _provisioned[key]
+
+
+class VirtualDevice:
+    """One simulated controller behind a pseudo-terminal.
+
+    Args:
+        weights: Weight rows ``(a, b, c, d)``, one per conversion, e.g. from
+            :func:`synthetic_weights` or :func:`recording_weights`. When they
+            run out the platform is left empty.
+        factors: Counts per unit weight of each scale, used both to make the
+            counts and to provision the EEPROM.
+        offsets: Raw counts of the empty platform.
+        eeprom: EEPROM image at power-up; by default one provisioned with
+            ``factors``.
+        fixed_point: Run the ``COP_FIXED_POINT`` build.
+        rate: HX711 conversions per second.
+        loop_us: Virtual time per ``loop()`` call. Output is identical for
+            any value well below the sample period; larger is cheaper.
+        reset_on_open: Reboot when a host opens the pty.
+    """
+
+    def __init__(self, weights: Iterator[Row], factors: Sequence[float] = DEFAULT_FACTORS,
+                 offsets: Sequence[int] = DEFAULT_OFFSETS, eeprom: Optional[bytes] = None,
+                 fixed_point: bool = False, rate: float = RATE, loop_us: int = 100,
+                 reset_on_open: bool = True) -> None:
+        self._weights = weights
+        self.factors = tuple(factors)
+        self.offsets = tuple(offsets)
+        self.fixed_point = fixed_point
+        self.rate = rate
+        self.loop_us = loop_us
+        self.reset_on_open = reset_on_open
+        self._eeprom = eeprom if eeprom is not None else provision(factors, fixed_point=fixed_point)
+
+        self._master, slave = os.openpty()
+        self.path = os.ttyname(slave)
+        # Byte-exact until the host configures the port itself
+        tty.setraw(slave)
+        os.close(slave)
+        os.set_blocking(self._master, False)
+
+        self.connected = False
+        self.finished = False
+        self.resets = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self._pending = bytearray()
+        self.firmware: Optional[Firmware] = None
+        self.boot()
+
+    def boot(self) -> None:
+        """Power-cycle the controller, keeping its EEPROM."""
+        if self.firmware is not None:
+            self._eeprom = self.firmware.eeprom
+            self.firmware.close()
+            self.resets += 1
+        self.firmware = Firmware(fixed_point=self.fixed_point, rate=self.rate,
+                                 loop_us=self.loop_us, eeprom=self._eeprom,
+                                 counts=[self.offsets] * int(SETTLE_S * self.rate))
+        self._pending.clear()
+
+    def _counts(self, row: Row) -> Tuple[int, ...]:
+        return tuple(min(_COUNT_MAX, max(_COUNT_MIN, int(round(w * f)) + o))
+                     for w, f, o in zip(row, self.factors, self.offsets))
+
+    def _refill(self) -> None:
+        need = int(self.rate * _QUEUE_S) - self.firmware.queued_counts
+        rows = []
+        for _ in range(need):
+            row = next(self._weights, None)
+            if row is None:
+                self.finished = True
+                rows.append(self.offsets)
+            else:
+                rows.append(self._counts(row))
+        self.firmware.push_counts(rows)
+
+    def _poll_host(self) -> bytes:
+        try:
+            data = os.read(self._master, READ_CHUNK)
+        except BlockingIOError:
+            data = b""
+        except OSError as e:
+            # EIO: no process has the pty open
+            if e.errno != errno.EIO:
+                raise
+            self.connected = False
+            return b""
+        if not self.connected and self.reset_on_open:
+            self.boot()
+        self.connected = True
+        return data
+
+    def service(self, seconds: float) -> None:
+        """Pass host input to the firmware and run it for ``seconds``."""
+        data = self._poll_host()
+        if data:
+            self.firmware.write(data)
+        self._refill()
+        out = self.firmware.run_bytes(seconds)
+        if not self.connected:
+            # Nobody is listening; the bytes are gone, as on a closed port
+            return
+        self._pending += out
+        if self._pending:
+            try:
+                n = os.write(self._master, self._pending)
+            except BlockingIOError:
+                n = 0
+            self.bytes_sent += n
+            del self._pending[:n]
+        if len(self._pending) > PENDING_MAX:
+            self.bytes_dropped += len(self._pending) - PENDING_MAX
+            del self._pending[PENDING_MAX:]
+
+    @property
+    def pending(self) -> int:
+        """Bytes waiting for the host to read."""
+        return len(self._pending)
+
+    def close(self) -> None:
+        """Stop the firmware and close the pty."""
+        if self.firmware is not None:
+            self.firmware.close()
+            self.firmware = None
+            os.close(self._master)
+
+    def __enter__(self) -> "VirtualDevice":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Simulator:
+    """Paces a set of virtual devices against the wall clock.
+
+    Args:
+        devices: The devices to run.
+        speed: Virtual seconds per wall-clock second.
+    """
+
+    def __init__(self, devices: Sequence[VirtualDevice], speed: float = 1.0) -> None:
+        self.devices = list(devices)
+        self.speed = speed
+        self.virtual_us = 0
+        self.elapsed_s = 0.0
+        self.busy_s = 0.0
+        self.lost_s = 0.0
+
+    @property
+    def load(self) -> float:
+        """Fraction of wall time spent running the devices."""
+        return self.busy_s / self.elapsed_s if self.elapsed_s else 0.0
+
+    def run(self, duration: Optional[float] = None, report_s: Optional[float] = None) -> None:
+        """Run for ``duration`` wall-clock seconds, or until interrupted.
+
+        Args:
+            duration: Wall-clock seconds to run; None runs until Ctrl-C.
+            report_s: Print a summary line to stderr this often.
+        """
+        start = time.monotonic() - self.elapsed_s
+        next_report = report_s
+        try:
+            while duration is None or self.elapsed_s < duration:
+                tick = time.monotonic()
+                self.elapsed_s = tick - start
+                target_us = int((self.elapsed_s - self.lost_s) * self.speed * 1e6)
+                step_us = target_us - self.virtual_us
+                if step_us > STEP_MAX_S * 1e6:
+                    # Stalled (suspended, or overloaded): skip ahead instead
+                    self.lost_s += (step_us - STEP_MAX_S * 1e6) / (self.speed * 1e6)
+                    step_us = int(STEP_MAX_S * 1e6)
+                if step_us > 0:
+                    for device in self.devices:
+                        device.service(step_us / 1e6)
+                    self.virtual_us += step_us
+                self.busy_s += time.monotonic() - tick
+                if next_report is not None and self.elapsed_s >= next_report:
+                    print(self.summary(), file=sys.stderr)
+                    next_report += report_s
+                time.sleep(max(0.0, tick + TICK_S - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+
+    def summary(self) -> str:
+        """One line of totals: load, throughput, drops and open ports."""
+        sent = sum(d.bytes_sent for d in self.devices)
+        dropped = sum(d.bytes_dropped for d in self.devices)
+        pending = sum(d.pending for d in self.devices)
+        connected = sum(d.connected for d in self.devices)
+        return ("t=%.1f s virtual=%.1f s load=%.0f%% open=%d/%d sent=%.1f kB/s "
+                "pending=%d B dropped=%d B lost=%.2f s" % (
+                    self.elapsed_s, self.virtual_us / 1e6, 100 * self.load, connected,
+                    len(self.devices), sent / 1e3 / max(self.elapsed_s, 1e-9), pending,
+                    dropped, self.lost_s))
+
+    def close(self) -> None:
+        for device in self.devices:
+            device.close()
+
+    def __enter__(self) -> "Simulator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--devices", type=int, default=1, help="number of devices")
+    parser.add_argument("--recording", help="replay this recording instead of synthetic sway")
+    parser.add_argument("--loop", action="store_true", help="restart the recording when it ends")
+    parser.add_argument("--speed", type=float, default=1.0, help="virtual seconds per second")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--links", help="directory for cop0, cop1, ... symlinks to the ptys")
+    parser.add_argument("--fixed", action="store_true", help="run the fixed-point build")
+    parser.add_argument("--loop-us", type=int, default=100, help="virtual time per loop() call")
+    parser.add_argument("--no-reset", action="store_true", help="do not reboot when a pty is opened")
+    parser.add_argument("--report", type=float, default=5.0, help="summary interval, seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic sway")
+    args = parser.parse_args(argv)
+
+    devices: List[VirtualDevice] = []
+    for i in range(args.devices):
+        if args.recording:
+            settings, weights = recording_weights(args.recording, loop=args.loop)
+            factors = settings.factors if settings else DEFAULT_FACTORS
+            eeprom = provision(factors, settings.filter_window, settings.filter_sigma,
+                               settings.decimation, args.fixed) if settings else None
+        else:
+            weights = synthetic_weights(seed=args.seed + i)
+            factors, eeprom = DEFAULT_FACTORS, None
+        devices.append(VirtualDevice(weights, factors, eeprom=eeprom, fixed_point=args.fixed,
+                                     loop_us=args.loop_us, reset_on_open=not args.no_reset))
+
+    for i, device in enumerate(devices):
+        if args.links:
+            os.makedirs(args.links, exist_ok=True)
+            link = os.path.join(args.links, "cop%d" % i)
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(device.path, link)
+            print("%s -> %s" % (link, device.path))
+        else:
+            print(device.path)
+    sys.stdout.flush()
+
+    with Simulator(devices, speed=args.speed) as sim:
+        sim.run(args.duration, report_s=args.report)
+        print(sim.summary(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
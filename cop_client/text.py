@@ -0,0 +1,210 @@
+"""Parser for the controller's text streams (the ``r``, ``c`` and ``a`` modes).
+
+Sample lines start with the frame sequence number, device timestamp and
+the flags of the binary sample packet (``FLAG_TARING``, ``FLAG_MM``):
+
+* ``r``: ``seq,t_us,flags,wa,wb,wc,wd``, parsed to :class:`ReadingsFrame`
+* ``c``: ``seq,t_us,flags,(X, Y)``, parsed to :class:`CopFrame`
+* ``a``: ``seq,t_us,flags,wa,wb,wc,wd,total,x,y``, parsed to
+  :class:`~cop_client.protocol.SampleFrame`, the same type the binary stream
+  produces
+
+Lines in the older formats give frames with flags of 0: ``seq,t_us,...``
+without flags, and the oldest, without ``seq,t_us``, also with ``seq`` and
+``timestamp_us`` of -1, as in ``batch.py``. An oldest-format ``a`` line and
+an ``r`` line both have seven fields; the ``a`` line starts with a weight,
+which always has a decimal point.
+
+``SYNC,t_us,seq,decimation`` lines become :class:`SyncFrame`, the ``i``
+command's ``SET,...`` line becomes :class:`SettingsFrame`, and the ``g`` and
+``u`` commands' ``GEO,...`` line becomes a :class:`~cop_client.geometry.Geometry`. Every other
+line, whether a tagged report such as ``CAL,...``, ``PLACE,...`` and
+``STATS,...`` or a plain message such as ``Scales tared.``, becomes a
+:class:`Message`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+from .geometry import Geometry
+from .protocol import FLAG_MM, FLAG_TARING, SampleFrame
+
+
+@dataclass(frozen=True)
+class ReadingsFrame:
+    """One ``r`` line: the four weights of a frame."""
+
+    seq: int
+    timestamp_us: int
+    weights: Tuple[float, float, float, float]
+    flags: int = 0
+
+    @property
+    def total(self) -> float:
+        """Sum of the four corner weights."""
+        return sum(self.weights)
+
+    @property
+    def taring(self) -> bool:
+        """True while the device is averaging frames for a tare."""
+        return bool(self.flags & FLAG_TARING)
+
+
+@dataclass(frozen=True)
+class CopFrame:
+    """One ``c`` line: the CoP of a frame, normalized or in mm (``u``)."""
+
+    seq: int
+    timestamp_us: int
+    cop_x: float
+    cop_y: float
+    flags: int = 0
+
+    @property
+    def taring(self) -> bool:
+        """True while the device is averaging frames for a tare."""
+        return bool(self.flags & FLAG_TARING)
+
+    @property
+    def cop_in_mm(self) -> bool:
+        """True if the CoP is in millimetres (``u m``) rather than normalized."""
+        return bool(self.flags & FLAG_MM)
+
+
+@dataclass(frozen=True)
+class SyncFrame:
+    """A sync record pairing device time with the stream (see ``clock.py``)."""
+
+    device_us: int
+    seq: int
+    decimation: int
+
+
+@dataclass(frozen=True)
+class SettingsFrame:
+    """The ``i`` report: calibration of each scale, filter and decimation."""
+
+    factors: Tuple[float, float, float, float]
+    offsets: Tuple[int, int, int, int]
+    filter_window: int
+    filter_sigma: float
+    decimation: int
+
+    @classmethod
+    def from_values(cls, values) -> "SettingsFrame":
+        """Build from the eleven values of a ``SET`` line or status packet."""
+        values = list(values)
+        if len(values) != 11:
+            raise ValueError("expected 11 settings values, got %d" % len(values))
+        return cls(
+            factors=tuple(float(v) for v in values[0:8:2]),
+            offsets=tuple(int(round(v)) for v in values[1:8:2]),
+            filter_window=int(round(values[8])),
+            filter_sigma=float(values[9]),
+            decimation=int(round(values[10])),
+        )
+
+
+@dataclass(frozen=True)
+class Message:
+    """Any other line: a tagged report (``CAL``, ``PLACE``, ``STATS``) or text."""
+
+    text: str
+
+    @property
+    def tag(self) -> str:
+        """Upper-case prefix before the first comma, or ``""`` for plain text."""
+        head, sep, _ = self.text.partition(",")
+        return head if sep and head.isalpha() and head.isupper() else ""
+
+    @property
+    def values(self) -> Tuple[float, ...]:
+        """Numeric fields after the tag; empty for plain text."""
+        if not self.tag:
+            return ()
+        return tuple(float(v) for v in self.text.split(",")[1:])
+
+
+TextFrame = Union[ReadingsFrame, CopFrame, SampleFrame, SyncFrame, SettingsFrame, Geometry, Message]
+
+
+def parse_line(line: str) -> Optional[TextFrame]:
+    """Parse one line without its newline; ``None`` for a blank line."""
+    line = line.strip()
+    if not line:
+        return None
+    fields = line.split(",")
+    try:
+        if fields[0] == "SYNC" and len(fields) == 4:
+            return SyncFrame(int(fields[1]), int(fields[2]), int(fields[3]))
+        if fields[0] == "SET":
+            return SettingsFrame.from_values(float(v) for v in fields[1:])
+        if fields[0] == "GEO":
+            return Geometry.from_values(float(v) for v in fields[1:])
+        if len(fields) == 5 and fields[3].startswith("("):
+            return CopFrame(int(fields[0]), int(fields[1]), float(fields[3][1:]),
+                            float(fields[4].rstrip(")")), int(fields[2]))
+        if len(fields) == 7 and "." not in fields[0]:
+            return ReadingsFrame(int(fields[0]), int(fields[1]),
+                                 tuple(float(v) for v in fields[3:]), int(fields[2]))
+        if len(fields) == 10:
+            return SampleFrame(
+                seq=int(fields[0]),
+                timestamp_us=int(fields[1]),
+                flags=int(fields[2]),
+                weights=tuple(float(v) for v in fields[3:7]),
+                cop_x=float(fields[8]),
+                cop_y=float(fields[9]),
+            )
+        # Older formats, without flags
+        if len(fields) == 4 and fields[2].startswith("("):
+            return CopFrame(int(fields[0]), int(fields[1]),
+                            float(fields[2][1:]), float(fields[3].rstrip(")")))
+        if len(fields) == 6:
+            return ReadingsFrame(int(fields[0]), int(fields[1]),
+                                 tuple(float(v) for v in fields[2:]))
+        if len(fields) == 9:
+            return SampleFrame(
+                seq=int(fields[0]),
+                timestamp_us=int(fields[1]),
+                flags=0,
+                weights=tuple(float(v) for v in fields[2:6]),
+                cop_x=float(fields[7]),
+                cop_y=float(fields[8]),
+            )
+        # Oldest formats, without seq and t_us
+        if len(fields) == 2 and fields[0].startswith("("):
+            return CopFrame(-1, -1, float(fields[0][1:]), float(fields[1].rstrip(")")))
+        if len(fields) == 4:
+            return ReadingsFrame(-1, -1, tuple(float(v) for v in fields))
+        if len(fields) == 7:
+            return SampleFrame(-1, -1, 0, tuple(float(v) for v in fields[0:4]),
+                               float(fields[5]), float(fields[6]))
+    except ValueError:
+        pass
+    return Message(line)
+
+
+class TextDecoder:
+    """Incremental line decoder: feed raw serial bytes, get frames back.
+
+    Each ``feed`` call splits everything received so far on newlines in one
+    pass, so a large read yields many frames per call. An incomplete trailing
+    line is kept until the next call.
+    """
+
+    def __init__(self) -> None:
+        self._pending = b""
+
+    def feed(self, data: bytes) -> List[TextFrame]:
+        """Decode every complete line in ``data`` plus any carried-over bytes."""
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        frames = []
+        for raw in lines:
+            frame = parse_line(raw.decode("ascii", "replace"))
+            if frame is not None:
+                frames.append(frame)
+        return frames
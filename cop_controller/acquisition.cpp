@@ -0,0 +1,122 @@
+/**
+ * @file   acquisition.cpp
+ * @brief  Implementation of interrupt-driven four-channel HX711 acquisition.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-18
+ */
+
+#include "acquisition.h"
+#include "avr_bench.h"
+
+Acquisition ACQUISITION;
+
+/**
+ * @brief  Configure the reader and enable a pin-change interrupt on each DOUT pin.
+ * @param  clk_pin    Shared SCK pin.
+ * @param  dout_pins  DOUT pin of each module, in scale order.
+ */
+void Acquisition::begin(uint8_t clk_pin, const uint8_t dout_pins[NUM_SCALES]) {
+    reader.begin(clk_pin, dout_pins);
+
+#if defined(__AVR__) && defined(PCICR)
+    pcint_mask = 0;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        *digitalPinToPCMSK(dout_pins[i]) |= bit(digitalPinToPCMSKbit(dout_pins[i]));
+        pcint_mask |= bit(digitalPinToPCICRbit(dout_pins[i]));
+    }
+    PCIFR = pcint_mask;
+    PCICR |= pcint_mask;
+#endif
+}
+
+/**
+ * @brief  Timestamp, read and queue a frame once every module is ready.
+ * @details Runs with interrupts disabled. Dropped frames still consume a
+ *          sequence number so the gap is visible downstream.
+ */
+void Acquisition::service() {
+    if (!reader.is_ready()) {
+        return;
+    }
+
+    BENCH_BEGIN(BENCH_ACQUIRE);
+    Frame frame;
+    frame.timestamp = micros();
+    frame.seq = next_seq++;
+    reader.read(frame.raw);
+    read_timer.add(micros() - frame.timestamp);
+
+#if defined(__AVR__) && defined(PCICR)
+    // Clocking the data out toggled DOUT; clear the edges we caused ourselves.
+    PCIFR = pcint_mask;
+#endif
+
+    if (!frames.push(frame)) {
+        dropped++;
+    }
+    BENCH_END(BENCH_ACQUIRE);
+}
+
+/**
+ * @brief  Service the reader from loop() with interrupts disabled.
+ */
+void Acquisition::poll() {
+    noInterrupts();
+    service();
+    interrupts();
+}
+
+/**
+ * @brief  Copy out the oldest frame.
+ * @param  frame  Receives the frame.
+ * @return false if the buffer is empty.
+ */
+bool Acquisition::pop(Frame& frame) {
+    noInterrupts();
+    bool ok = frames.pop(frame);
+    interrupts();
+    return ok;
+}
+
+/**
+ * @brief  Number of frames dropped because loop() fell behind.
+ */
+uint16_t Acquisition::overruns() const {
+    noInterrupts();
+    uint16_t count = dropped;
+    interrupts();
+    return count;
+}
+
+/**
+ * @brief  Snapshot of the time spent in reader.read(), which runs in the ISR.
+ */
+StageTimer Acquisition::read_time() const {
+    noInterrupts();
+    StageTimer timer = read_timer;
+    interrupts();
+    return timer;
+}
+
+/**
+ * @brief  Clear the overrun count and the read timer.
+ */
+void Acquisition::clear_stats() {
+    noInterrupts();
+    dropped = 0;
+    read_timer.reset();
+    interrupts();
+}
+
+#if defined(__AVR__) && defined(PCICR)
+// One handler serves every pin-change port; the DOUT pins of a Nano span two.
+ISR(PCINT0_vect) {
+    ACQUISITION.service();
+}
+#if defined(PCINT1_vect)
+ISR(PCINT1_vect, ISR_ALIASOF(PCINT0_vect));
+#endif
+#if defined(PCINT2_vect)
+ISR(PCINT2_vect, ISR_ALIASOF(PCINT0_vect));
+#endif
+#endif
@@ -0,0 +1,94 @@
+/**
+ * @file   acquisition.h
+ * @brief  Declaration of interrupt-driven four-channel HX711 acquisition.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-18
+ */
+
+#ifndef ACQUISITION_H
+#define ACQUISITION_H
+
+#include <Arduino.h>
+#include "scale_reader.h"
+#include "ring_buffer.h"
+#include "stats.h"
+
+/// Number of frames buffered between the ISR and loop() (200 ms at 80 SPS).
+#define FRAME_BUFFER_SIZE 16
+
+/**
+ * @struct Frame
+ * @brief  One simultaneous conversion from all four modules.
+ */
+struct Frame {
+    uint32_t timestamp;     ///< micros() when the last DOUT line went low
+    uint16_t seq;           ///< Acquisition counter; gaps mean dropped frames
+    long raw[NUM_SCALES];   ///< Raw signed counts, scale order A-D
+};
+
+/**
+ * @class Acquisition
+ * @brief Captures frames on the DOUT data-ready edge and queues them for loop().
+ *
+ * On AVR a pin-change interrupt fires when a DOUT line changes. Once all four
+ * are low the handler timestamps the conversion, reads it with ScaleReader and
+ * pushes it into a ring buffer, so conversions keep arriving while loop() is
+ * busy writing to Serial. On boards without pin-change interrupts poll() does
+ * the same work from loop().
+ */
+class Acquisition {
+public:
+    /**
+     * @brief Configure the reader pins and enable the data-ready interrupts.
+     * @param clk_pin    Shared SCK pin.
+     * @param dout_pins  DOUT pin of each module, in scale order.
+     */
+    void begin(uint8_t clk_pin, const uint8_t dout_pins[NUM_SCALES]);
+
+    /**
+     * @brief Read a frame if one is ready. Called from the ISR and from poll().
+     */
+    void service();
+
+    /**
+     * @brief Service from loop(); covers boards without pin-change interrupts.
+     */
+    void poll();
+
+    /**
+     * @brief Take the oldest buffered frame.
+     * @param frame Receives the frame.
+     * @return false if no frame is waiting.
+     */
+    bool pop(Frame& frame);
+
+    /**
+     * @brief Number of frames dropped because the buffer was full.
+     */
+    uint16_t overruns() const;
+
+    /**
+     * @brief Time spent clocking each frame out of the modules.
+     */
+    StageTimer read_time() const;
+
+    /**
+     * @brief Clear the overrun count and the read timer.
+     */
+    void clear_stats();
+
+private:
+    ScaleReader reader;                         ///< Parallel HX711 reader
+    RingBuffer<Frame, FRAME_BUFFER_SIZE> frames; ///< Frames awaiting loop()
+    volatile uint16_t next_seq = 0;             ///< Sequence number for the next frame
+    volatile uint16_t dropped = 0;              ///< Frames lost to a full buffer
+    StageTimer read_timer;                      ///< Duration of reader.read()
+#if defined(__AVR__) && defined(PCICR)
+    uint8_t pcint_mask = 0;                     ///< PCICR/PCIFR bits for the DOUT pins
+#endif
+};
+
+/// Shared acquisition instance; the pin-change ISR services it.
+extern Acquisition ACQUISITION;
+
+#endif // ACQUISITION_H
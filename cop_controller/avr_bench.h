@@ -0,0 +1,59 @@
+/**
+ * @file   avr_bench.h
+ * @brief  Markers that let an AVR emulator time the firmware's hot path.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-15
+ *
+ * With COP_AVR_BENCH set, BENCH_BEGIN(id) writes id to GPIOR0 and
+ * BENCH_END(id) writes id | BENCH_END_FLAG. GPIOR0 is a spare I/O register
+ * that nothing else on the board uses, and each write is a single OUT
+ * instruction, so the markers cost one cycle. bench/avr/cop_avr_bench.c
+ * runs the sketch under simavr, watches the register and reports the cycles
+ * between matching markers. In every other build the markers compile away.
+ */
+
+#ifndef AVR_BENCH_H
+#define AVR_BENCH_H
+
+#include "config.h"
+
+/// Set in the id written by BENCH_END.
+#define BENCH_END_FLAG 0x80
+
+/**
+ * Timed spans. The end id of BENCH_LOOP says what the iteration did, so one
+ * loop() is reported per Mode; the BENCH_LOOP_* and BENCH_OUTPUT_* ids are in
+ * Mode order.
+ */
+enum BenchMarker {
+    BENCH_LOOP = 1,             ///< loop(); begin marker only
+    BENCH_LOOP_SPIN,            ///< End of a loop() that found no frame
+    BENCH_LOOP_IDLE,            ///< End of a loop() that handled a frame in IDLE
+    BENCH_LOOP_READINGS,        ///< ... in STREAM_READINGS
+    BENCH_LOOP_COP,             ///< ... in STREAM_COP
+    BENCH_LOOP_BINARY,          ///< ... in STREAM_BINARY
+    BENCH_LOOP_ALL,             ///< ... in STREAM_ALL
+    BENCH_ACQUIRE,              ///< Clocking a frame out of the modules (in the ISR)
+    BENCH_FILTER,               ///< filter_frame()
+    BENCH_COP,                  ///< raw_to_weight() and compute_cop()
+    BENCH_OUTPUT_IDLE,          ///< Unused; keeps the outputs in Mode order
+    BENCH_OUTPUT_READINGS,      ///< print_readings()
+    BENCH_OUTPUT_COP,           ///< print_cop()
+    BENCH_OUTPUT_BINARY,        ///< print_binary()
+    BENCH_OUTPUT_ALL,           ///< print_all()
+    BENCH_CALIBRATE,            ///< calibrate_all()
+    BENCH_FINISH_CALIBRATION,   ///< finish_calibration()
+    BENCH_MARKER_COUNT
+};
+
+#if COP_AVR_BENCH && defined(__AVR__)
+#include <avr/io.h>
+#define BENCH_BEGIN(id) (GPIOR0 = (uint8_t)(id))
+#define BENCH_END(id) (GPIOR0 = (uint8_t)((id) | BENCH_END_FLAG))
+#else
+// sizeof keeps the argument "used" without evaluating it
+#define BENCH_BEGIN(id) ((void)sizeof(id))
+#define BENCH_END(id) ((void)sizeof(id))
+#endif
+
+#endif // AVR_BENCH_H
@@ -0,0 +1,31 @@
+/**
+ * @file   config.h
+ * @brief  Build-time options for the controller.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-02
+ *
+ * Edit the defaults here, or pass -D flags through the build system, e.g.
+ * `arduino-cli compile --build-property "build.extra_flags=-DCOP_FIXED_POINT=1"`.
+ */
+
+#ifndef CONFIG_H
+#define CONFIG_H
+
+/**
+ * Select the integer acquisition and CoP pipeline. Weights become Q16.16 and
+ * the CoP Q1.15; floats are then only used to format the ASCII streams and
+ * to compute calibration factors.
+ */
+#ifndef COP_FIXED_POINT
+#define COP_FIXED_POINT 0
+#endif
+
+/**
+ * Write cycle-timing markers to GPIOR0 for bench/avr (see avr_bench.h).
+ * Leave at 0 for hardware builds.
+ */
+#ifndef COP_AVR_BENCH
+#define COP_AVR_BENCH 0
+#endif
+
+#endif // CONFIG_H
@@ -12,14 +12,14 @@
  * @param  x  Initial x-coordinate.
  * @param  y  Initial y-coordinate.
  */
-Coordinate::Coordinate(float x, float y)
+Coordinate::Coordinate(cop_t x, cop_t y)
   : x(x), y(y) { }
 
 /**
  * @brief  Update the x-coordinate.
  * @param  new_x  New x value.
  */
-void Coordinate::set_x(float new_x) {
+void Coordinate::set_x(cop_t new_x) {
     x = new_x;
 }
 
@@ -27,7 +27,7 @@ void Coordinate::set_x(float new_x) {
  * @brief  Update the y-coordinate.
  * @param  new_y  New y value.
  */
-void Coordinate::set_y(float new_y) {
+void Coordinate::set_y(cop_t new_y) {
     y = new_y;
 }
 
@@ -35,7 +35,7 @@ void Coordinate::set_y(float new_y) {
  * @brief  Get the current x-coordinate.
  * @return Current x value.
  */
-float Coordinate::get_x() const {
+cop_t Coordinate::get_x() const {
     return x;
 }
 
@@ -43,6 +43,6 @@ float Coordinate::get_x() const {
  * @brief  Get the current y-coordinate.
  * @return Current y value.
  */
-float Coordinate::get_y() const {
+cop_t Coordinate::get_y() const {
     return y;
 }
@@ -8,46 +8,50 @@
 #ifndef COORDINATE_H
 #define COORDINATE_H
 
+#include "fixed_point.h"
+
 /**
  * @class Coordinate
  * @brief Represents a point in 2D space with X and Y components.
+ *
+ * Components are cop_t: float by default, Q1.15 when COP_FIXED_POINT is set.
  */
 class Coordinate {
 public:
     /**
      * @brief Construct a new Coordinate.
-     * @param x Initial X value (defaults to 0.0).
-     * @param y Initial Y value (defaults to 0.0).
+     * @param x Initial X value (defaults to 0).
+     * @param y Initial Y value (defaults to 0).
      */
-    Coordinate(float x = 0.0f, float y = 0.0f);
+    Coordinate(cop_t x = 0, cop_t y = 0);
 
     /**
      * @brief Set the X component.
      * @param x New X value.
      */
-    void set_x(float x);
+    void set_x(cop_t x);
 
     /**
      * @brief Set the Y component.
      * @param y New Y value.
      */
-    void set_y(float y);
+    void set_y(cop_t y);
 
     /**
      * @brief Get the X component.
      * @return Current X value.
      */
-    float get_x() const;
+    cop_t get_x() const;
 
     /**
      * @brief Get the Y component.
      * @return Current Y value.
      */
-    float get_y() const;
+    cop_t get_y() const;
 
 private:
-    float x;  ///< X-coordinate value
-    float y;  ///< Y-coordinate value
+    cop_t x;  ///< X-coordinate value
+    cop_t y;  ///< Y-coordinate value
 };
 
 #endif // COORDINATE_H
@@ -1,35 +1,62 @@
 /**
  * @file    cop_controller.ino
- * @brief   Four-scale controller for HX711-based weight sensors with spike rejection.
+ * @brief   Four-scale controller for HX711-based weight sensors with outlier rejection.
  * @author  rickwgarcia@unm.edu
  * @date    2025-09-04
  *
  * This sketch manages four HX711 scales, supports streaming readings,
  * calculating center of pressure (CoP), taring, and quick calibration.
- * It includes a simple spike rejection filter to remove outlier readings.
+ * A running-median (Hampel) filter on each channel removes outlier readings.
+ * Set COP_FIXED_POINT in config.h to run the per-frame math in integers.
  */
 
+#include "config.h"
+#include "fixed_point.h"
 #include "HX711.h"
 #include "scale.h"
+#include "acquisition.h"
+#include "avr_bench.h"
+#include "decimator.h"
+#include "hampel_filter.h"
 #include "coordinate.h"
-#include <EEPROM.h>
+#include "geometry.h"
+#include "protocol.h"
+#include "settings.h"
+#include "stats.h"
 
 /// Available operating modes for the controller.
 enum Mode {
   IDLE,             ///< No streaming; awaiting user input
   STREAM_READINGS,  ///< Continuously output raw weights
-  STREAM_COP        ///< Continuously output center of pressure
+  STREAM_COP,       ///< Continuously output center of pressure
+  STREAM_BINARY,    ///< Continuously output weights and CoP as binary packets
+  STREAM_ALL        ///< Continuously output weights, total load and CoP
 };
 
 /// Current mode; defaults to IDLE.
 static Mode mode = IDLE;
 
-// EEPROM layout: three copies of Settings for redundancy
-static constexpr int SETTINGS_SIZE   = sizeof(Settings);
-static constexpr int EEPROM_ADDR_A   = 0;
-static constexpr int EEPROM_ADDR_B   = EEPROM_ADDR_A + SETTINGS_SIZE;
-static constexpr int EEPROM_ADDR_C   = EEPROM_ADDR_B + SETTINGS_SIZE;
-static constexpr int EEPROM_ADDR_D   = EEPROM_ADDR_C + SETTINGS_SIZE;
+/// Background jobs that average frames while the current Mode keeps running.
+enum Job {
+  JOB_NONE,         ///< No job running
+  JOB_TARE,         ///< Averaging frames for new tare offsets
+  JOB_CALIBRATE,    ///< Averaging frames under a known weight
+  JOB_PLACEMENT     ///< Averaging net counts for one multi-placement calibration point
+};
+
+/// Current job and the frames it has averaged so far.
+static Job job = JOB_NONE;
+static uint8_t job_frames = 0;
+static long job_sum[NUM_SCALES];
+
+/// Frames averaged for a tare, calibration or placement (1/8 s at 80 SPS).
+#define JOB_FRAMES 10
+
+/// Known weight for the running calibration job.
+static float calibration_weight = 0.0f;
+
+/// True until the tare started by setup() finishes and "System ready." is printed.
+static bool booting = true;
 
 // HX711 pins
 #define CLK_PIN     6
@@ -38,31 +65,56 @@ static constexpr int EEPROM_ADDR_D   = EEPROM_ADDR_C + SETTINGS_SIZE;
 #define DOUT_PIN_C  9
 #define DOUT_PIN_D  10
 
-// Four independent scale instances, each using its own EEPROM slot
-Scale SCALE_A(EEPROM_ADDR_A);
-Scale SCALE_B(EEPROM_ADDR_B);
-Scale SCALE_C(EEPROM_ADDR_C);
-Scale SCALE_D(EEPROM_ADDR_D);
+// Four independent scale instances
+Scale SCALE_A;
+Scale SCALE_B;
+Scale SCALE_C;
+Scale SCALE_D;
+Scale* const SCALES[NUM_SCALES] = {&SCALE_A, &SCALE_B, &SCALE_C, &SCALE_D};
+
+// DOUT pins in scale order; ACQUISITION reads all four in one clock burst
+static const uint8_t DOUT_PINS[NUM_SCALES] = {DOUT_PIN_A, DOUT_PIN_B, DOUT_PIN_C, DOUT_PIN_D};
+
+// Outlier filter for each channel, in scale order; set with the 'f' command
+HampelFilter FILTERS[NUM_SCALES];
+static uint8_t filter_window = FILTER_WINDOW_DEFAULT;
+static float filter_sigma = FILTER_SIGMA_DEFAULT;
+
+// Load-cell positions and CoP units; set with the 'g' and 'u' commands
+static PlatformGeometry geometry;
+static uint8_t cop_units = COP_UNITS_NORMALIZED;
+CopSolver COP_SOLVER;
 
-// Threshold for spike rejection. If a new reading changes by more than this amount
-// from the last one, it's considered an outlier. Tune this value for your setup.
-const float SPIKE_THRESHOLD = 10.0f; // In lbs
+// Averages N frames into one before filtering; set with the 'd' command
+Decimator DECIMATOR;
 
-// Variables to store the last known good reading for each scale
-static float last_reading_A = 0.0f;
-static float last_reading_B = 0.0f;
-static float last_reading_C = 0.0f;
-static float last_reading_D = 0.0f;
+// Stage timers and health counters; reported by 't', cleared by 'x'
+StageTimer TIMERS[STAGE_COUNT];
+LateFrameCounter LATE_FRAMES;
+static uint32_t frame_count = 0;
+
+// Streams send a SYNC record this often so the host can map device time
+// to wall-clock time
+#define SYNC_INTERVAL_US 1000000UL
+static uint32_t last_sync = 0;
+
+// Persistent settings; the copy last loaded from or saved to EEPROM
+Settings SETTINGS;
+
+// Command line buffer for commands that take arguments, e.g. "d 4"
+#define COMMAND_BUFFER_SIZE 64
+static char command_line[COMMAND_BUFFER_SIZE];
+static uint8_t command_length = 0;
 
 /**
  * @brief   Compute calibration factor for one scale.
  * @param   scale   Pointer to the Scale object to calibrate.
- * @param   weight  Known weight placed on the scale (in the same units used by get_units()).
+ * @param   raw     Averaged raw count with the known weight in place.
+ * @param   weight  Known weight on this scale (in the same units used by get_units()).
  * @return The computed calibration factor.
  */
-float calc_calibration_val(Scale* scale, float weight) {
-    float readings = scale->get_value(10);
-    return readings / weight;
+float calc_calibration_val(Scale* scale, long raw, float weight) {
+    return (raw - scale->get_offset()) / weight;
 }
 
 /**
@@ -71,50 +123,191 @@ float calc_calibration_val(Scale* scale, float weight) {
  * @param   wb  Weight from sensor B.
  * @param   wc  Weight from sensor C.
  * @param   wd  Weight from sensor D.
+ * @param   total  Sum of the four weights.
  * @return A Coordinate object with normalized X and Y CoP values in [-1,1].
  */
-Coordinate calc_cop(float wa, float wb, float wc, float wd) {
-    float total = wa + wb + wc + wd;
-    if (total <= 0.0f) {
-        return Coordinate(0.0f, 0.0f);
+Coordinate calc_cop(weight_t wa, weight_t wb, weight_t wc, weight_t wd, weight_t total) {
+    if (total <= 0) {
+        return Coordinate(0, 0);
     }
-    float x = ((wb + wc) - (wa + wd)) / total;
-    float y = ((wa + wb) - (wc + wd)) / total;
+    weight_t nx = (wb + wc) - (wa + wd);
+    weight_t ny = (wa + wb) - (wc + wd);
+
+    // One divide per frame; both axes share the reciprocal.
+#if COP_FIXED_POINT
+    cop_t x, y;
+    q15_ratio2(nx, ny, total, x, y);
+#else
+    float inv_total = 1.0f / total;
+    float x = nx * inv_total;
+    float y = ny * inv_total;
+#endif
     return Coordinate(x, y);
 }
 
 /**
- * @brief  Gets a reading from a scale, rejecting outliers (spikes).
- * @param  scale         Pointer to the Scale object to read from.
- * @param  last_reading  Reference to the last known good reading for this scale.
- * @return The filtered weight reading.
+ * @brief   Sum the four weights and compute the CoP in the selected units.
+ * @details In millimetres the solver accumulates the total and the
+ *          position-weighted sums in one pass; normalized output keeps the
+ *          cheaper fixed-sign calc_cop().
+ * @param   weights  Weights of scales A-D.
+ * @param   total    Receives the sum of the weights.
+ * @return  Normalized CoP, or a fraction of COP_SOLVER's extent in mm mode.
  */
-float get_filtered_reading(Scale* scale, float &last_reading) {
-    float new_reading = scale->get_units();
+Coordinate compute_cop(const weight_t weights[NUM_SCALES], weight_t& total) {
+    if (cop_units == COP_UNITS_MM) {
+        return COP_SOLVER.solve(weights, total);
+    }
+    total = weights[0] + weights[1] + weights[2] + weights[3];
+    return calc_cop(weights[0], weights[1], weights[2], weights[3], total);
+}
 
-    // Check if the change from the last reading is greater than our threshold
-    if (abs(new_reading - last_reading) > SPIKE_THRESHOLD) {
-        // It's a spike! Discard the new reading and return the last good one.
-        return last_reading;
+/**
+ * @brief  Replaces outliers (spikes) in a frame with the running median.
+ * @details Runs on raw counts at the full acquisition rate, before
+ *          decimation, so a spike never leaks into an averaged frame.
+ * @param  frame  Frame to filter in place.
+ */
+void filter_frame(Frame& frame) {
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        frame.raw[i] = FILTERS[i].update(frame.raw[i]);
+    }
+}
+
+/**
+ * @brief  Apply filter settings to every channel and report them.
+ * @param  window  Window length in samples (odd, 1-9).
+ * @param  sigma   Outlier threshold in robust standard deviations.
+ */
+void configure_filters(uint8_t window, float sigma) {
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        FILTERS[i].configure(window, sigma);
+    }
+    filter_window = FILTERS[0].get_window();
+    filter_sigma = sigma;
+}
+
+/**
+ * @brief  Capture the scale, filter and stream settings and queue them for EEPROM.
+ * @details The write itself is deferred to settings_service() in loop(), which
+ *          waits until nothing is streaming.
+ */
+void save_settings() {
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        SCALES[i]->save(SETTINGS.scales[i]);
+    }
+    SETTINGS.filter_window = filter_window;
+    SETTINGS.filter_sigma = filter_sigma;
+    SETTINGS.decimation = DECIMATOR.get_factor();
+    SETTINGS.geometry = geometry;
+    SETTINGS.cop_units = cop_units;
+    settings_save(SETTINGS);
+}
+
+/**
+ * @brief  Load the settings record from EEPROM and apply it.
+ * @details Falls back to defaults, and says so, if neither copy is valid.
+ */
+void load_settings() {
+    Serial.println(F("Loading settings from EEPROM..."));
+    if (!settings_load(SETTINGS)) {
+        Serial.println(F("No valid settings found; using defaults."));
+    }
+
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        SCALES[i]->load(SETTINGS.scales[i]);
+    }
+    configure_filters(constrain((long)SETTINGS.filter_window, 1L, (long)FILTER_WINDOW_MAX),
+                      constrain(SETTINGS.filter_sigma, 0.0f, 40.0f));
+    DECIMATOR.set_factor(constrain((long)SETTINGS.decimation, 1L, (long)DECIMATION_MAX));
+    geometry = SETTINGS.geometry;
+    COP_SOLVER.configure(geometry);
+    cop_units = SETTINGS.cop_units;
+}
+
+/**
+ * @brief   Flags for a sample of the current stream: PACKET_FLAG_TARING while
+ *          a tare is averaging, PACKET_FLAG_MM while the CoP is in mm.
+ */
+uint8_t sample_flags() {
+    uint8_t flags = (job == JOB_TARE) ? PACKET_FLAG_TARING : 0;
+    if (cop_units == COP_UNITS_MM) {
+        flags |= PACKET_FLAG_MM;
+    }
+    return flags;
+}
+
+/**
+ * @brief   Print the “seq,t_us,flags,” prefix that starts every text sample
+ *          line; flags are those of the binary sample packet, in decimal.
+ * @param   frame  The output frame, for its sequence number and timestamp.
+ */
+void print_frame_header(const Frame& frame) {
+    Serial.print(frame.seq); Serial.print(',');
+    Serial.print(frame.timestamp); Serial.print(',');
+    Serial.print(sample_flags()); Serial.print(',');
+}
+
+/**
+ * @brief   Print one CoP component in the selected units: three decimals
+ *          normalized, or millimetres to one decimal.
+ */
+void print_cop_value(cop_t c) {
+    if (cop_units == COP_UNITS_MM) {
+        Serial.print(COP_SOLVER.to_mm(c), 1);
     } else {
-        // The reading is valid. Update the last reading and return the new one.
-        last_reading = new_reading;
-        return new_reading;
+        Serial.print(cop_to_float(c), 3);
     }
 }
 
 /**
- * @brief   Print the current CoP to Serial as “(X, Y)”.
+ * @brief   Print the current CoP to Serial as “seq,t_us,flags,(X, Y)”.
  */
-void print_cop(float wa, float wb, float wc, float wd) {
-    Coordinate cop = calc_cop(wa, wb, wc, wd);
+void print_cop(const Frame& frame, const Coordinate& cop) {
+    print_frame_header(frame);
     Serial.print('(');
-    Serial.print(cop.get_x(), 3);
+    print_cop_value(cop.get_x());
     Serial.print(", ");
-    Serial.print(cop.get_y(), 3);
+    print_cop_value(cop.get_y());
     Serial.println(')');
 }
 
+/**
+ * @brief   Print weights, total load and CoP of one frame as
+ *          “seq,t_us,flags,wa,wb,wc,wd,total,x,y”.
+ */
+void print_all(const Frame& frame, const weight_t weights[NUM_SCALES], weight_t total,
+               const Coordinate& cop) {
+    print_frame_header(frame);
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        Serial.print(weight_to_float(weights[i]), 1); Serial.print(',');
+    }
+    Serial.print(weight_to_float(total), 1); Serial.print(',');
+    print_cop_value(cop.get_x()); Serial.print(',');
+    print_cop_value(cop.get_y());
+    Serial.println();
+}
+
+/**
+ * @brief   Send the weights and CoP of one frame as a binary sample packet.
+ * @param   frame  The acquired frame, for its sequence number and timestamp.
+ */
+void print_binary(const Frame& frame, const weight_t weights[NUM_SCALES], const Coordinate& cop) {
+    q16_t q16_weights[NUM_SCALES];
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        q16_weights[i] = weight_to_q16(weights[i]);
+    }
+    uint8_t flags = sample_flags();
+    if (flags & PACKET_FLAG_MM) {
+        send_sample_packet(frame.seq, frame.timestamp, flags, q16_weights,
+                           COP_SOLVER.to_tenths_mm(cop.get_x()),
+                           COP_SOLVER.to_tenths_mm(cop.get_y()));
+    } else {
+        send_sample_packet(frame.seq, frame.timestamp, flags, q16_weights,
+                           cop_to_q15(cop.get_x()), cop_to_q15(cop.get_y()));
+    }
+}
+
 /**
  * @brief   Display the available serial commands.
  */
@@ -123,136 +316,346 @@ void print_menu() {
     Serial.println(F("************************************"));
     Serial.println(F(" r - Stream weight readings"));
     Serial.println(F(" c - Stream Center of Pressure (CoP)"));
+    Serial.println(F(" a - Stream weights, total and CoP"));
+    Serial.println(F(" b - Stream weights and CoP as binary packets"));
     Serial.println(F(" s - Stop the current stream"));
+    Serial.println(F(" d <n> - Average every n samples (1-64)"));
+    Serial.println(F(" f <window> [sigma] - Set the outlier filter"));
     Serial.println(F(" z - Tare all scales"));
-    Serial.println(F(" k - Run quick calibration"));
+    Serial.println(F(" k <weight> - Calibrate with a known weight"));
+    Serial.println(F(" p - Capture counts for one calibration placement"));
+    Serial.println(F(" e <ca> <cb> <cc> <cd> - Set each scale's factor"));
+    Serial.println(F(" g <sx> <sy> | g <xa> <ya> ... <xd> <yd> - Set load-cell positions (mm)"));
+    Serial.println(F(" u <n|m> - Stream CoP normalized or in mm"));
+    Serial.println(F(" i - Report calibration, filter and decimation settings"));
+    Serial.println(F(" t - Report loop timing and health counters"));
+    Serial.println(F(" x - Reset loop timing and health counters"));
     Serial.println(F(" h - Display this help menu"));
     Serial.println(F("************************************"));
 }
 
 /**
- * @brief   Print raw weight readings from all four scales, comma-separated.
+ * @brief   Print raw weight readings from all four scales as
+ *          “seq,t_us,flags,wa,wb,wc,wd”.
  */
-void print_readings(float wa, float wb, float wc, float wd) {
-    Serial.print(wa, 1); Serial.print(',');
-    Serial.print(wb, 1); Serial.print(',');
-    Serial.print(wc, 1); Serial.print(',');
-    Serial.println(wd, 1);
+void print_readings(const Frame& frame, const weight_t weights[NUM_SCALES]) {
+    print_frame_header(frame);
+    for (uint8_t i = 0; i + 1 < NUM_SCALES; i++) {
+        Serial.print(weight_to_float(weights[i]), 1); Serial.print(',');
+    }
+    Serial.println(weight_to_float(weights[NUM_SCALES - 1]), 1);
+}
+
+/**
+ * @brief   Check whether human-readable messages may be written to Serial.
+ * @return false while streaming binary packets.
+ */
+bool text_output() {
+    return mode != STREAM_BINARY;
+}
+
+/**
+ * @brief   Send a sync record pairing the device clock with the stream:
+ *          “SYNC,t_us,seq,decimation”, or a STATUS_SYNC packet while
+ *          streaming binary.
+ * @details t_us is micros() just before the record is written, so the host
+ *          can pair it with its own clock on arrival and map every frame
+ *          timestamp to wall-clock time. seq is the last frame sent.
+ * @param   frame  The frame just sent.
+ */
+void print_sync(const Frame& frame) {
+    uint32_t now = micros();
+    last_sync = now;
+    if (text_output()) {
+        Serial.print(F("SYNC,"));
+        Serial.print(now); Serial.print(',');
+        Serial.print(frame.seq); Serial.print(',');
+        Serial.println(DECIMATOR.get_factor());
+    } else {
+        uint32_t values[3] = {now, frame.seq, DECIMATOR.get_factor()};
+        send_status_packet(STATUS_SYNC, values, 3);
+    }
+}
+
+/**
+ * @brief   Start averaging frames for a background job.
+ * @details Only one job runs at a time. While one is running the new one is
+ *          refused with a "Busy" line, or a STATUS_BUSY packet naming the
+ *          running job while streaming binary, so the host still gets the
+ *          reply of the first.
+ * @param   new_job  Job to run.
+ * @return  false if another job is running.
+ */
+bool start_job(Job new_job) {
+    if (job != JOB_NONE) {
+        if (text_output()) {
+            Serial.println(F("Busy: wait for the running tare, calibration or placement."));
+        } else {
+            uint32_t running = job;
+            send_status_packet(STATUS_BUSY, &running, 1);
+        }
+        return false;
+    }
+
+    job = new_job;
+    job_frames = 0;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        job_sum[i] = 0;
+    }
+    return true;
+}
+
+/**
+ * @brief   Rounded average count of one channel over the finished job.
+ * @param   channel  Scale index, 0-3.
+ */
+long job_average(uint8_t channel) {
+    long sum = job_sum[channel];
+    return (sum + (sum >= 0 ? JOB_FRAMES / 2 : -JOB_FRAMES / 2)) / JOB_FRAMES;
 }
 
 /**
  * @brief   Tare (zero) all four scales.
+ * @details Non-blocking: the offsets are averaged from the next JOB_FRAMES
+ *          acquired frames while streaming continues. Binary samples carry
+ *          PACKET_FLAG_TARING until finish_tare() applies them.
  */
 void tare_all() {
-    Serial.println(F("Taring scales..."));
-    SCALE_A.tare();
-    SCALE_B.tare();
-    SCALE_C.tare();
-    SCALE_D.tare(); 
-    
-    Serial.println(F("Scales tared."));
+    if (start_job(JOB_TARE) && text_output()) {
+        Serial.println(F("Taring scales..."));
+    }
 }
 
 /**
- * @brief   Handles the user interface for the quick calibration routine.
- * @details Prompts the user to enter a known weight via the Serial Monitor,
- * parses the input, and then calls the core calibration logic.
+ * @brief   Apply the averaged counts as the new offsets and report them.
  */
-void quick_calibrate() {
-    delay(100); 
-
-    // Clear buffer (remove 'k' and any trailing newlines/carriage returns)
-    while (Serial.available() > 0) {
-        Serial.read();
+void finish_tare() {
+    uint32_t offsets[NUM_SCALES];
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        long offset = job_average(i);
+        SCALES[i]->set_offset(offset);
+        offsets[i] = offset;
     }
-    
-    Serial.println();
-    Serial.println(F("Quick Calibration..."));
-    Serial.println(F("Ensure scale has already been tared."));
-    Serial.println(F("Place known weight in the center of the platform."));
-    Serial.println(F("Enter the weight in lbs: "));
-    
-    // Block until user sends data
-    while (Serial.available() == 0) {
-        delay(50); 
-    }
-    
-    // Read the floating-point number from the serial buffer
-    float weight = Serial.parseFloat();
-    
-    // Clear any remaining characters from the buffer (like the newline after the number)
-    while(Serial.available() > 0) {
-        Serial.read();
-    }
-    
-    if (weight > 0.0) {
-        calibrate_all(weight);
+
+    if (text_output()) {
+        Serial.println(F("Scales tared."));
     } else {
-        Serial.println(F("\nInvalid weight entered. Calibration cancelled."));
+        send_status_packet(STATUS_TARED, offsets, NUM_SCALES);
+    }
+    if (booting) {
+        booting = false;
+        if (text_output()) {
+            Serial.println(F("System ready."));
+        }
     }
 }
 
-
 /**
- * @brief   Calculates and applies a single, averaged calibration factor for all load cells.
- * @details This is the core calibration routine. It computes an individual calibration factor
- * for each of the four sensors based on an assumed equal weight distribution. It then
- * averages these four values to get a single factor, which is applied to all sensors
- * and saved to persistent memory (EEPROM). This method helps normalize the response
- * across all sensors.
+ * @brief   Start calibrating all four load cells against a known weight.
+ * @details Non-blocking: the counts are averaged from the next JOB_FRAMES
+ *          acquired frames while commands and streaming continue, then
+ *          finish_calibration() computes and applies the factors.
  *
- * @param   weight The total known weight placed on the scale platform for calibration.
+ * @param   args  Known total weight on the platform, e.g. "25.0".
  *
- * @note    This function operates on two key assumptions:
+ * @note    This routine operates on two key assumptions:
  * 1. The scale has already been tared (zeroed). This function does not perform a tare.
  * 2. The `weight` is distributed perfectly evenly across all four sensors. For best
  * results, the calibration weight should be placed in the exact center of the scale.
  */
-void calibrate_all(float weight) {
-    Serial.println(F("Calibrating all..."));
+void calibrate_all(const char* args) {
+    BENCH_BEGIN(BENCH_CALIBRATE);
+    char* end;
+    double weight = strtod(args, &end);
+    if (end == args || weight <= 0.0) {
+        if (text_output()) {
+            Serial.println(F("Invalid weight. Usage: k <weight>"));
+        }
+        BENCH_END(BENCH_CALIBRATE);
+        return;
+    }
+
+    if (!start_job(JOB_CALIBRATE)) {
+        BENCH_END(BENCH_CALIBRATE);
+        return;
+    }
+    if (text_output()) {
+        Serial.println(F("Calibrating all..."));
+    }
+    calibration_weight = weight;
+    BENCH_END(BENCH_CALIBRATE);
+}
 
-    // Reset scale factor to 1.0 on all sensors to get raw readings for calibration.
-    SCALE_A.set_scale(); 
-    SCALE_B.set_scale(); 
-    SCALE_C.set_scale(); 
-    SCALE_D.set_scale(); 
-    
+/**
+ * @brief   Report calibration factors as “CAL,ca,cb,cc,cd,spread,avg”, or as a
+ *          STATUS_CALIBRATED packet while streaming binary.
+ * @param   factors  Factor of each scale.
+ * @param   spread   Largest minus smallest factor.
+ * @param   avg      Mean factor.
+ */
+void report_calibration(const float factors[NUM_SCALES], float spread, float avg) {
+    if (text_output()) {
+        Serial.print(F("CAL"));
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            Serial.print(',');
+            Serial.print(factors[i], 4);
+        }
+        Serial.print(',');
+        Serial.print(spread, 4);
+        Serial.print(',');
+        Serial.println(avg, 4);
+    } else {
+        uint32_t values[NUM_SCALES + 2];
+        memcpy(values, factors, NUM_SCALES * sizeof(float));
+        memcpy(&values[NUM_SCALES], &spread, sizeof(spread));
+        memcpy(&values[NUM_SCALES + 1], &avg, sizeof(avg));
+        send_status_packet(STATUS_CALIBRATED, values, NUM_SCALES + 2);
+    }
+}
+
+/**
+ * @brief   Calculates and applies a single, averaged calibration factor for all load cells.
+ * @details Computes an individual calibration factor for each of the four sensors based
+ * on an assumed equal weight distribution. It then averages these four values to get a
+ * single factor, which is applied to all sensors and saved to persistent memory (EEPROM).
+ * The result is reported as one line, “CAL,ca,cb,cc,cd,spread,avg”, where spread is the
+ * largest minus the smallest individual factor, or as a STATUS_CALIBRATED packet while
+ * streaming binary.
+ */
+void finish_calibration() {
     // Assume the total weight is distributed equally among the four scales.
-    float perScale = weight / 4.0f;
+    float per_scale = calibration_weight / 4.0f;
 
     // Calculate the individual calibration factor for each scale.
-    float ca = calc_calibration_val(&SCALE_A, perScale);
-    float cb = calc_calibration_val(&SCALE_B, perScale);
-    float cc = calc_calibration_val(&SCALE_C, perScale);
-    float cd = calc_calibration_val(&SCALE_D, perScale);
-    Serial.print("Scale A calibration factor: "); Serial.println(ca); 
-    Serial.print("Scale B calibration factor: "); Serial.println(cb); 
-    Serial.print("Scale C calibration factor: "); Serial.println(cc); 
-    Serial.print("Scale D calibration factor: "); Serial.println(cd); 
-
+    float factors[NUM_SCALES];
+    float lowest = 0.0f;
+    float highest = 0.0f;
+    float sum = 0.0f;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        factors[i] = calc_calibration_val(SCALES[i], job_average(i), per_scale);
+        lowest = (i == 0 || factors[i] < lowest) ? factors[i] : lowest;
+        highest = (i == 0 || factors[i] > highest) ? factors[i] : highest;
+        sum += factors[i];
+    }
 
     // Average the four factors to get a single, unified value.
-    float avg = (ca + cb + cc + cd) / 4.0f;
+    float avg = sum / NUM_SCALES;
+    float spread = highest - lowest;
 
-    // Apply the averaged calibration factor to all scales.
-    SCALE_A.set_scale(avg);
-    SCALE_B.set_scale(avg);
-    SCALE_C.set_scale(avg);
-    SCALE_D.set_scale(avg);
+    // A zero factor would divide by zero on every later frame.
+    if (avg == 0.0f) {
+        if (text_output()) {
+            Serial.println(F("Calibration failed: no load detected."));
+        }
+        return;
+    }
 
-    // Save the new calibration factor to EEPROM for each scale.
-    SCALE_A.save();
-    SCALE_B.save();
-    SCALE_C.save();
-    SCALE_D.save();
+    // Apply the averaged calibration factor to all scales and save it to EEPROM.
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        SCALES[i]->set_scale(avg);
+    }
+    save_settings();
 
-    Serial.print(F("New average calibration factor is: ")); 
-    Serial.println(avg, 4); // Print with 4 decimal places for precision.
+    report_calibration(factors, spread, avg);
 }
 
+/**
+ * @brief   Start averaging net counts for one placement of a multi-placement
+ *          calibration.
+ * @details The operator puts the known weight at one position, sends 'p', and
+ *          repeats for the other positions. The host then solves for a factor
+ *          per scale (see cop_client/calibration.py) and sends them back with
+ *          the 'e' command.
+ */
+void capture_placement() {
+    start_job(JOB_PLACEMENT);
+}
+
+/**
+ * @brief   Report the averaged net counts as “PLACE,da,db,dc,dd”, or as a
+ *          STATUS_PLACEMENT packet while streaming binary.
+ */
+void finish_placement() {
+    uint32_t counts[NUM_SCALES];
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        counts[i] = job_average(i) - SCALES[i]->get_offset();
+    }
+
+    if (text_output()) {
+        Serial.print(F("PLACE"));
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            Serial.print(',');
+            Serial.print(static_cast<int32_t>(counts[i]));
+        }
+        Serial.println();
+    } else {
+        send_status_packet(STATUS_PLACEMENT, counts, NUM_SCALES);
+    }
+}
+
+/**
+ * @brief   Apply an individual calibration factor to each scale and save them.
+ * @param   args  Four factors in scale order, e.g. "2280.1 2301.5 2264.0 2290.7".
+ */
+void set_scale_factors(const char* args) {
+    float factors[NUM_SCALES];
+    const char* p = args;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        char* end;
+        factors[i] = strtod(p, &end);
+        if (end == p || factors[i] == 0.0f) {
+            if (text_output()) {
+                Serial.println(F("Usage: e <ca> <cb> <cc> <cd>"));
+            }
+            return;
+        }
+        p = end;
+    }
+
+    float lowest = factors[0];
+    float highest = factors[0];
+    float sum = 0.0f;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        SCALES[i]->set_scale(factors[i]);
+        lowest = min(lowest, factors[i]);
+        highest = max(highest, factors[i]);
+        sum += factors[i];
+    }
+    save_settings();
+    report_calibration(factors, highest - lowest, sum / NUM_SCALES);
+}
+
+/**
+ * @brief   Feed one full-rate frame to the running job and finish it when done.
+ * @param   frame  Filtered frame, before decimation.
+ */
+void run_job(const Frame& frame) {
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        job_sum[i] += frame.raw[i];
+    }
+    if (++job_frames < JOB_FRAMES) {
+        return;
+    }
+
+    Job finished = job;
+    job = JOB_NONE;
+    if (finished == JOB_TARE) {
+        finish_tare();
+    } else if (finished == JOB_CALIBRATE) {
+        BENCH_BEGIN(BENCH_FINISH_CALIBRATION);
+        finish_calibration();
+        BENCH_END(BENCH_FINISH_CALIBRATION);
+    } else if (finished == JOB_PLACEMENT) {
+        finish_placement();
+    }
+}
 
 /**
  * @brief   Arduino setup: initialize serial, scales, load settings, then tare.
+ * @details The tare runs in the background like a 'z' command, so
+ *          "System ready." is printed by finish_tare() once the offsets are
+ *          set, after the menu. A host that switches to binary before then
+ *          waits for STATUS_TARED instead.
  */
 void setup() {
     Serial.begin(115200);
@@ -262,55 +665,385 @@ void setup() {
     SCALE_B.begin(DOUT_PIN_B, CLK_PIN);
     SCALE_C.begin(DOUT_PIN_C, CLK_PIN);
     SCALE_D.begin(DOUT_PIN_D, CLK_PIN);
+    ACQUISITION.begin(CLK_PIN, DOUT_PINS);
 
-    Serial.println(F("Loading settings from EEPROM..."));
-    SCALE_A.load();
-    SCALE_B.load();
-    SCALE_C.load();
-    SCALE_D.load();
-
+    load_settings();
+    print_menu();
     tare_all();
+}
 
-    // Get an initial reading to seed the spike filter.
-    last_reading_A = SCALE_A.get_units();
-    last_reading_B = SCALE_B.get_units();
-    last_reading_C = SCALE_C.get_units();
-    last_reading_D = SCALE_D.get_units();
+/**
+ * @brief   Switch operating mode and restart the decimation window.
+ * @param   new_mode  Mode to enter.
+ */
+void set_mode(Mode new_mode) {
+    mode = new_mode;
+    DECIMATOR.reset();
+    // Make the first frame of the new stream send a SYNC record
+    last_sync = micros() - SYNC_INTERVAL_US;
+}
 
-    Serial.println(F("System ready."));
-    print_menu();
+/**
+ * @brief   Set or report the decimation factor.
+ * @details Applied silently while streaming binary; 'i' reports it there.
+ * @param   args  Text after the command letter; empty to report only.
+ */
+void set_decimation(const char* args) {
+    long factor = atol(args);
+    if (factor > 0) {
+        DECIMATOR.set_factor(factor > DECIMATION_MAX ? DECIMATION_MAX : factor);
+        save_settings();
+    }
+    if (text_output()) {
+        Serial.print(F("Decimation factor: "));
+        Serial.println(DECIMATOR.get_factor());
+    }
+}
+
+/**
+ * @brief   Set or report the outlier filter settings.
+ * @details Applied silently while streaming binary; 'i' reports them there.
+ * @param   args  "<window> [sigma]"; empty to report only.
+ */
+void set_filter(const char* args) {
+    char* end;
+    long window = strtol(args, &end, 10);
+    if (end != args) {
+        float sigma = filter_sigma;
+        char* sigma_end;
+        double parsed = strtod(end, &sigma_end);
+        if (sigma_end != end) {
+            sigma = constrain(parsed, 0.0, 40.0);
+        }
+        configure_filters(constrain(window, 1L, (long)FILTER_WINDOW_MAX), sigma);
+        save_settings();
+    }
+    if (text_output()) {
+        Serial.print(F("Filter window: "));
+        Serial.print(filter_window);
+        Serial.print(F(", sigma: "));
+        Serial.println(filter_sigma, 1);
+    }
+}
+
+/**
+ * @brief   Report the settings in use as one line,
+ *          “SET,ca,oa,cb,ob,cc,oc,cd,od,window,sigma,decimation”, giving the
+ *          calibration factor and offset of each scale, or as a
+ *          STATUS_SETTINGS packet while streaming binary.
+ * @details Recordings store these so raw counts can be recovered later.
+ */
+void report_settings() {
+    float values[2 * NUM_SCALES + 3];
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        values[2 * i] = SCALES[i]->get_scale();
+        values[2 * i + 1] = SCALES[i]->get_offset();
+    }
+    values[2 * NUM_SCALES] = filter_window;
+    values[2 * NUM_SCALES + 1] = filter_sigma;
+    values[2 * NUM_SCALES + 2] = DECIMATOR.get_factor();
+
+    uint8_t count = sizeof(values) / sizeof(values[0]);
+    if (text_output()) {
+        Serial.print(F("SET"));
+        for (uint8_t i = 0; i < count; i++) {
+            Serial.print(',');
+            // Offsets are whole counts; factors need their decimals.
+            if (i < 2 * NUM_SCALES && i % 2 == 1) {
+                Serial.print(static_cast<long>(values[i]));
+            } else {
+                Serial.print(values[i], 4);
+            }
+        }
+        Serial.println();
+    } else {
+        uint32_t words[2 * NUM_SCALES + 3];
+        memcpy(words, values, sizeof(values));
+        send_status_packet(STATUS_SETTINGS, words, count);
+    }
+}
+
+/**
+ * @brief   Report the CoP units and load-cell positions as one line,
+ *          “GEO,units,xa,ya,xb,yb,xc,yc,xd,yd” (units 0 normalized, 1 mm;
+ *          positions in mm), or as a STATUS_GEOMETRY packet while
+ *          streaming binary.
+ */
+void report_geometry() {
+    float values[1 + 2 * NUM_SCALES];
+    values[0] = cop_units;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        values[1 + 2 * i] = geometry.corner_x[i];
+        values[2 + 2 * i] = geometry.corner_y[i];
+    }
+
+    uint8_t count = sizeof(values) / sizeof(values[0]);
+    if (text_output()) {
+        Serial.print(F("GEO,"));
+        Serial.print(cop_units);
+        for (uint8_t i = 1; i < count; i++) {
+            Serial.print(',');
+            Serial.print(values[i], 1);
+        }
+        Serial.println();
+    } else {
+        uint32_t words[1 + 2 * NUM_SCALES];
+        memcpy(words, values, sizeof(values));
+        send_status_packet(STATUS_GEOMETRY, words, count);
+    }
+}
+
+/**
+ * @brief   Set or report the load-cell positions.
+ * @param   args  "<sx> <sy>" for a rectangle with those A-B and A-D spacings,
+ *                or "<xa> <ya> <xb> <yb> <xc> <yc> <xd> <yd>" for each corner,
+ *                in mm; empty to report only.
+ */
+void set_geometry(const char* args) {
+    float values[2 * NUM_SCALES];
+    uint8_t count = 0;
+    const char* p = args;
+    while (count < 2 * NUM_SCALES) {
+        char* end;
+        double value = strtod(p, &end);
+        if (end == p) {
+            break;
+        }
+        values[count++] = value;
+        p = end;
+    }
+
+    if (count > 0) {
+        PlatformGeometry updated;
+        if (count == 2) {
+            geometry_rectangle(updated, values[0], values[1]);
+        } else if (count == 2 * NUM_SCALES) {
+            for (uint8_t i = 0; i < NUM_SCALES; i++) {
+                updated.corner_x[i] = values[2 * i];
+                updated.corner_y[i] = values[2 * i + 1];
+            }
+        }
+        if ((count != 2 && count != 2 * NUM_SCALES) || geometry_extent(updated) <= 0.0f) {
+            if (text_output()) {
+                Serial.println(F("Usage: g <sx> <sy> | g <xa> <ya> <xb> <yb> <xc> <yc> <xd> <yd>"));
+            }
+            return;
+        }
+        geometry = updated;
+        COP_SOLVER.configure(geometry);
+        save_settings();
+    }
+    report_geometry();
+}
+
+/**
+ * @brief   Set or report the CoP units.
+ * @param   args  "n" for normalized, "m" for millimetres; empty to report only.
+ */
+void set_units(const char* args) {
+    while (*args == ' ') {
+        args++;
+    }
+    if (*args == 'n' || *args == 'm') {
+        uint8_t units = (*args == 'm') ? COP_UNITS_MM : COP_UNITS_NORMALIZED;
+        if (units != cop_units) {
+            cop_units = units;
+            save_settings();
+        }
+    } else if (*args != '\0') {
+        if (text_output()) {
+            Serial.println(F("Usage: u <n|m>"));
+        }
+        return;
+    }
+    report_geometry();
+}
+
+/**
+ * @brief   Report loop timing and health counters as one line,
+ *          “STATS,frames,overruns,late,rejections,” followed by the minimum,
+ *          mean and maximum microseconds of the acquire, filter, CoP and
+ *          output stages, or as a STATUS_STATS packet while streaming binary.
+ * @details At 80 SPS every frame must clear all four stages within 12.5 ms.
+ */
+void report_stats() {
+    uint32_t rejections = 0;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        rejections += FILTERS[i].get_rejections();
+    }
+
+    uint32_t values[4 + 3 * STAGE_COUNT] = {
+        frame_count, ACQUISITION.overruns(), LATE_FRAMES.get_late(), rejections
+    };
+    for (uint8_t stage = 0; stage < STAGE_COUNT; stage++) {
+        StageTimer timer = (stage == STAGE_ACQUIRE) ? ACQUISITION.read_time() : TIMERS[stage];
+        values[4 + 3 * stage] = timer.get_min();
+        values[5 + 3 * stage] = timer.get_mean();
+        values[6 + 3 * stage] = timer.get_max();
+    }
+
+    uint8_t count = sizeof(values) / sizeof(values[0]);
+    if (text_output()) {
+        Serial.print(F("STATS"));
+        for (uint8_t i = 0; i < count; i++) {
+            Serial.print(',');
+            Serial.print(values[i]);
+        }
+        Serial.println();
+    } else {
+        send_status_packet(STATUS_STATS, values, count);
+    }
+}
+
+/**
+ * @brief   Clear every stage timer and health counter.
+ */
+void reset_stats() {
+    for (uint8_t stage = 0; stage < STAGE_COUNT; stage++) {
+        TIMERS[stage].reset();
+    }
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        FILTERS[i].clear_rejections();
+    }
+    ACQUISITION.clear_stats();
+    LATE_FRAMES.reset();
+    frame_count = 0;
+    if (text_output()) {
+        Serial.println(F("Stats reset."));
+    }
+}
+
+/**
+ * @brief   Run one command.
+ * @param   line  Command letter followed by its arguments, null-terminated.
+ */
+void run_command(const char* line) {
+    switch (line[0]) {
+        case 'r': set_mode(STREAM_READINGS); break;
+        case 'c': set_mode(STREAM_COP);      break;
+        case 'a': set_mode(STREAM_ALL);      break;
+        case 'b': set_mode(STREAM_BINARY); Serial.write((uint8_t)0); break;
+        case 'z': tare_all();                break;
+        case 'k': calibrate_all(line + 1);   break;
+        case 'p': capture_placement();       break;
+        case 'e': set_scale_factors(line + 1); break;
+        case 'h': set_mode(IDLE); print_menu();      break;
+        case 's': set_mode(IDLE);            break;
+        case 'd': set_decimation(line + 1);  break;
+        case 'f': set_filter(line + 1);      break;
+        case 'g': set_geometry(line + 1);    break;
+        case 'u': set_units(line + 1);       break;
+        case 'i': report_settings();         break;
+        case 't': report_stats();            break;
+        case 'x': reset_stats();             break;
+    }
+}
+
+/**
+ * @brief   Check whether a command letter expects arguments up to the newline.
+ */
+bool command_has_args(char cmd) {
+    return cmd == 'd' || cmd == 'f' || cmd == 'k' || cmd == 'e' || cmd == 'g' || cmd == 'u';
+}
+
+/**
+ * @brief   Non-blocking command reader.
+ * @details Single-letter commands run as soon as they arrive. Commands that
+ *          take arguments are buffered until the end of the line.
+ */
+void read_commands() {
+    while (Serial.available()) {
+        char c = Serial.read();
+        if (c == '\r' || c == '\n') {
+            if (command_length > 0) {
+                command_line[command_length] = '\0';
+                command_length = 0;
+                run_command(command_line);
+            }
+        } else if (command_length == 0 && !command_has_args(c)) {
+            char line[2] = {c, '\0'};
+            run_command(line);
+        } else if (command_length < COMMAND_BUFFER_SIZE - 1) {
+            command_line[command_length++] = c;
+        }
+    }
 }
 
 /**
  * @brief   Main loop: handle user commands and streaming modes.
  */
 void loop() {
-    // Non-blocking check for new command
-    if (Serial.available()) {
-        char cmd = Serial.read();
-        switch (cmd) {
-            case 'r': mode = STREAM_READINGS; break;
-            case 'c': mode = STREAM_COP;      break;
-            case 'z': mode = IDLE; tare_all();  break;
-            case 'k': mode = IDLE; quick_calibrate(); print_menu(); break;
-            case 'h': mode = IDLE; print_menu();      break;
-            case 's': mode = IDLE;            break; 
+    BENCH_BEGIN(BENCH_LOOP);
+    bool handled = false;
+
+    // Non-blocking check for new commands
+    read_commands();
+
+    // Commit queued settings a byte at a time, only while nothing streams
+    settings_service(mode == IDLE && job == JOB_NONE);
+
+    // Frames are captured by the data-ready interrupt; poll() only covers
+    // boards without pin-change interrupts.
+    ACQUISITION.poll();
+
+    // Drain every buffered frame, even when idle, so the buffer never fills
+    // and the filter windows stay primed
+    Frame frame;
+    while (ACQUISITION.pop(frame)) {
+        frame_count++;
+        handled = true;
+        LATE_FRAMES.update(frame.seq, frame.timestamp);
+
+        uint32_t start = micros();
+        BENCH_BEGIN(BENCH_FILTER);
+        filter_frame(frame);
+        BENCH_END(BENCH_FILTER);
+        TIMERS[STAGE_FILTER].add(micros() - start);
+
+        if (job != JOB_NONE) {
+            run_job(frame);
+        }
+        if (mode == IDLE) {
+            continue;
+        }
+
+        // Integrate-and-dump; only every Nth frame continues
+        if (!DECIMATOR.push(frame, frame)) {
+            continue;
         }
-    }
 
-    // Continuous streaming if in a streaming mode
-    if (mode == STREAM_READINGS || mode == STREAM_COP) {
-        // Get a filtered reading from each scale
-        float wa = get_filtered_reading(&SCALE_A, last_reading_A);
-        float wb = get_filtered_reading(&SCALE_B, last_reading_B);
-        float wc = get_filtered_reading(&SCALE_C, last_reading_C);
-        float wd = get_filtered_reading(&SCALE_D, last_reading_D);
+        // Convert the filtered counts of each scale to weights, then the
+        // total and CoP once for whichever output needs them
+        start = micros();
+        BENCH_BEGIN(BENCH_COP);
+        weight_t weights[NUM_SCALES];
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            weights[i] = SCALES[i]->raw_to_weight(frame.raw[i]);
+        }
+        weight_t total;
+        Coordinate cop = compute_cop(weights, total);
+        BENCH_END(BENCH_COP);
+        TIMERS[STAGE_COP].add(micros() - start);
 
         // Call the appropriate function with the filtered values
+        start = micros();
+        BENCH_BEGIN(BENCH_OUTPUT_IDLE + mode);
         if (mode == STREAM_READINGS) {
-            print_readings(wa, wb, wc, wd);
+            print_readings(frame, weights);
         } else if (mode == STREAM_COP) {
-            print_cop(wa, wb, wc, wd);
+            print_cop(frame, cop);
+        } else if (mode == STREAM_ALL) {
+            print_all(frame, weights, total, cop);
+        } else if (mode == STREAM_BINARY) {
+            print_binary(frame, weights, cop);
+        }
+        BENCH_END(BENCH_OUTPUT_IDLE + mode);
+        TIMERS[STAGE_OUTPUT].add(micros() - start);
+
+        if (micros() - last_sync >= SYNC_INTERVAL_US) {
+            print_sync(frame);
         }
     }
+
+    BENCH_END(handled ? BENCH_LOOP_IDLE + mode : BENCH_LOOP_SPIN);
 }
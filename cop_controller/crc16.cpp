@@ -0,0 +1,27 @@
+/**
+ * @file   crc16.cpp
+ * @brief  Bitwise CRC-16/CCITT-FALSE implementation.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-25
+ */
+
+#include "crc16.h"
+
+/**
+ * @brief  Fold bytes into a running CRC-16/CCITT-FALSE.
+ * @details Bitwise rather than table driven to keep 512 bytes of table out of
+ *          flash; a 30-byte packet costs well under 0.2 ms on a Nano.
+ * @param  crc   Running value; start with CRC16_INIT.
+ * @param  data  Bytes to add.
+ * @param  len   Number of bytes.
+ * @return The updated CRC.
+ */
+uint16_t crc16_update(uint16_t crc, const uint8_t* data, size_t len) {
+    while (len--) {
+        crc ^= static_cast<uint16_t>(*data++) << 8;
+        for (uint8_t i = 0; i < 8; i++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+        }
+    }
+    return crc;
+}
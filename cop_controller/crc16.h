@@ -0,0 +1,25 @@
+/**
+ * @file   crc16.h
+ * @brief  CRC-16/CCITT-FALSE checksum used by the binary stream and settings.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-25
+ */
+
+#ifndef CRC16_H
+#define CRC16_H
+
+#include <Arduino.h>
+
+/// Initial value of a CRC-16/CCITT-FALSE computation.
+#define CRC16_INIT 0xFFFF
+
+/**
+ * @brief  Fold bytes into a running CRC-16/CCITT-FALSE (poly 0x1021).
+ * @param  crc   Running value; start with CRC16_INIT.
+ * @param  data  Bytes to add.
+ * @param  len   Number of bytes.
+ * @return The updated CRC.
+ */
+uint16_t crc16_update(uint16_t crc, const uint8_t* data, size_t len);
+
+#endif // CRC16_H
@@ -0,0 +1,67 @@
+/**
+ * @file   decimator.cpp
+ * @brief  Implementation of the integrate-and-dump decimator.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-09
+ */
+
+#include "decimator.h"
+
+/**
+ * @brief  Set the decimation factor and restart the current window.
+ * @param  factor  Frames per output, clamped to [1, DECIMATION_MAX].
+ */
+void Decimator::set_factor(uint8_t factor) {
+    this->factor = constrain(factor, (uint8_t)1, (uint8_t)DECIMATION_MAX);
+    reset();
+}
+
+/**
+ * @brief  Current decimation factor.
+ */
+uint8_t Decimator::get_factor() const {
+    return factor;
+}
+
+/**
+ * @brief  Discard the partially integrated window.
+ */
+void Decimator::reset() {
+    count = 0;
+}
+
+/**
+ * @brief  Integrate one frame and dump the window once it holds factor frames.
+ * @param  in   Newly acquired frame.
+ * @param  out  Receives the averaged frame; may alias in.
+ * @return true when out holds a new output frame.
+ */
+bool Decimator::push(const Frame& in, Frame& out) {
+    if (factor == 1) {
+        out = in;
+        return true;
+    }
+
+    if (count == 0) {
+        first_timestamp = in.timestamp;
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            sum[i] = 0;
+        }
+    }
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        sum[i] += in.raw[i];
+    }
+    if (++count < factor) {
+        return false;
+    }
+
+    // Round half away from zero so the average has no bias toward zero.
+    long half = factor / 2;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        out.raw[i] = (sum[i] >= 0 ? sum[i] + half : sum[i] - half) / factor;
+    }
+    out.timestamp = first_timestamp + (in.timestamp - first_timestamp) / 2;
+    out.seq = in.seq;
+    count = 0;
+    return true;
+}
@@ -0,0 +1,61 @@
+/**
+ * @file   decimator.h
+ * @brief  Declaration of an integrate-and-dump decimator for acquired frames.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-09
+ */
+
+#ifndef DECIMATOR_H
+#define DECIMATOR_H
+
+#include <Arduino.h>
+#include "acquisition.h"
+
+/// Largest decimation factor; 64 frames of 24-bit counts still fit in a long.
+#define DECIMATION_MAX 64
+
+/**
+ * @class Decimator
+ * @brief Boxcar-averages every N raw frames into one output frame.
+ *
+ * Counts are summed per channel and dumped as their rounded mean once N
+ * frames have arrived, so 80 SPS becomes 80/N SPS with less noise. The output
+ * frame carries the sequence number of the last input frame, so consecutive
+ * outputs normally differ by N, and a timestamp halfway between the first and
+ * last input frames.
+ */
+class Decimator {
+public:
+    /**
+     * @brief Set the decimation factor and restart the current window.
+     * @param factor Frames per output, clamped to [1, DECIMATION_MAX].
+     */
+    void set_factor(uint8_t factor);
+
+    /**
+     * @brief Current decimation factor.
+     */
+    uint8_t get_factor() const;
+
+    /**
+     * @brief Discard the partially integrated window.
+     */
+    void reset();
+
+    /**
+     * @brief Integrate one frame.
+     * @param in  Newly acquired frame.
+     * @param out Receives the averaged frame when a window completes; may be
+     *            the same object as in.
+     * @return true when out holds a new output frame.
+     */
+    bool push(const Frame& in, Frame& out);
+
+private:
+    uint8_t factor = 1;          ///< Frames per output
+    uint8_t count = 0;           ///< Frames integrated in the current window
+    uint32_t first_timestamp;    ///< Timestamp of the window's first frame
+    long sum[NUM_SCALES];        ///< Per-channel sum of raw counts
+};
+
+#endif // DECIMATOR_H
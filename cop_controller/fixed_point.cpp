@@ -0,0 +1,162 @@
+/**
+ * @file   fixed_point.cpp
+ * @brief  Implementation of the fixed-point conversion and ratio helpers.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-02
+ */
+
+#include <math.h>
+#include "fixed_point.h"
+
+/// Denominators are normalized into [2^14, 2^15) before dividing.
+static const int32_t RATIO_DEN_MIN = 1L << 14;
+static const int32_t RATIO_DEN_MAX = 1L << 15;
+
+/// Saturation limits of a Q16.16 weight.
+static const int32_t Q16_MAX = 2147483647L;
+static const int32_t Q16_MIN = -2147483647L - 1;
+
+/**
+ * @brief  Convert to Q16.16, saturating at the int32 range.
+ * @param  value  Weight in calibrated units.
+ * @return The weight times 65536.
+ */
+q16_t float_to_q16(float value) {
+    float scaled = value * 65536.0f;
+    if (scaled >= 2147483647.0f) {
+        return 2147483647L;
+    }
+    if (scaled <= -2147483648.0f) {
+        return -2147483647L - 1;
+    }
+    return static_cast<q16_t>(lround(scaled));
+}
+
+/**
+ * @brief  Convert to Q1.15, saturating at [-1, 1).
+ * @param  value  Normalized CoP component.
+ * @return The component times 32768.
+ */
+q15_t float_to_q15(float value) {
+    long scaled = lround(value * 32768.0f);
+    if (scaled > 32767L) {
+        return 32767;
+    }
+    if (scaled < -32768L) {
+        return -32768;
+    }
+    return static_cast<q15_t>(scaled);
+}
+
+/**
+ * @brief  Precompute the count-to-Q16.16 multiplier for a calibration factor.
+ * @param  scale  Calibration factor in counts per unit.
+ * @param  shift  Receives the right shift to pass to q16_scale().
+ * @return round(2^(16 + shift) / scale), with |gain| in [2^15, 2^16).
+ */
+int32_t q16_gain(float scale, int8_t& shift) {
+    shift = 0;
+    if (scale == 0.0f) {
+        return 0;
+    }
+    // Normalize the magnitude to 16 significant bits. At the shift limits
+    // the multiplier loses bits (huge factors) or saturates (factors below
+    // 2^-6, where any load beyond 512 counts saturates anyway).
+    float gain = fabsf(65536.0f / scale);
+    while (gain < 32768.0f && shift < Q16_SHIFT_MAX) {
+        gain *= 2.0f;
+        shift++;
+    }
+    while (gain >= 65536.0f && shift > Q16_SHIFT_MIN) {
+        gain *= 0.5f;
+        shift--;
+    }
+    // gain < 2^16 has 8 fractional bits in a float, so adding 0.5 is exact
+    int32_t rounded = gain < 65535.5f ? static_cast<int32_t>(gain + 0.5f) : 65535L;
+    if (rounded == 65536L) {
+        rounded = 32768L;
+        shift--;
+    }
+    return scale < 0.0f ? -rounded : rounded;
+}
+
+/**
+ * @brief  Convert tared counts to a Q16.16 weight.
+ * @details Splits the counts into a signed high word and an unsigned low
+ *          byte, so the 40-bit product is built from two 16x16->32 bit
+ *          multiplies, which the AVR does in hardware, instead of a 64-bit
+ *          one. The result is floor(counts * gain / 2^shift) exactly.
+ * @param  counts  Raw count minus the offset; clamped to 24 bits.
+ * @param  gain    Multiplier from q16_gain().
+ * @param  shift   Shift from q16_gain().
+ * @return (counts * gain) >> shift, saturated to the int32 range.
+ */
+q16_t q16_scale(int32_t counts, int32_t gain, int8_t shift) {
+    if (counts > Q16_COUNTS_MAX) {
+        counts = Q16_COUNTS_MAX;
+    } else if (counts < -Q16_COUNTS_MAX) {
+        counts = -Q16_COUNTS_MAX;
+    }
+    if (gain < 0) {
+        counts = -counts;
+        gain = -gain;
+    }
+    uint16_t mult = static_cast<uint16_t>(gain);
+    int16_t high = static_cast<int16_t>(counts >> 8);
+    uint8_t low = static_cast<uint8_t>(counts);
+    int32_t high_product = static_cast<int32_t>(high) * mult;
+    int32_t low_product = static_cast<int32_t>(static_cast<uint32_t>(low) * mult);
+
+    // floor(counts * mult / 256); cannot overflow for 24-bit counts
+    int32_t product = high_product + (low_product >> 8);
+    if (shift >= 8) {
+        return product >> (shift - 8);
+    }
+    // Shift left, bringing in the low byte; it adds less than 2^up
+    uint8_t up = 8 - shift;
+    if (product > (Q16_MAX >> up)) {
+        return Q16_MAX;
+    }
+    if (product < (Q16_MIN >> up)) {
+        return Q16_MIN;
+    }
+    int32_t rest = static_cast<uint8_t>(low_product);
+    rest = shift >= 0 ? rest >> shift : rest * (1L << -shift);
+    return product * (1L << up) + rest;
+}
+
+/**
+ * @brief  Divide two numerators by one positive denominator into Q1.15.
+ * @param  num_x  First numerator.
+ * @param  num_y  Second numerator.
+ * @param  den    Denominator; must be > 0.
+ * @param  x      Receives num_x / den, saturated to [-1, 1).
+ * @param  y      Receives num_y / den, saturated to [-1, 1).
+ */
+void q15_ratio2(int32_t num_x, int32_t num_y, int32_t den, q15_t& x, q15_t& y) {
+    // |ratio| saturates at 1 anyway; clamping first keeps the products small.
+    if (num_x > den) num_x = den;
+    if (num_x < -den) num_x = -den;
+    if (num_y > den) num_y = den;
+    if (num_y < -den) num_y = -den;
+
+    // Bring the denominator to 15 significant bits. The ratio is unchanged
+    // and |num| <= den < 2^15 afterwards, so num * recip stays below 2^31.
+    while (den >= RATIO_DEN_MAX) {
+        den >>= 1;
+        num_x >>= 1;
+        num_y >>= 1;
+    }
+    while (den < RATIO_DEN_MIN) {
+        den *= 2;
+        num_x *= 2;
+        num_y *= 2;
+    }
+
+    int32_t recip = (1L << 30) / den;           // 2^30 / den, in (2^15, 2^16]
+    int32_t rx = (num_x * recip) >> 15;         // ratio * 2^15
+    int32_t ry = (num_y * recip) >> 15;
+
+    x = static_cast<q15_t>(rx > 32767 ? 32767 : (rx < -32768 ? -32768 : rx));
+    y = static_cast<q15_t>(ry > 32767 ? 32767 : (ry < -32768 ? -32768 : ry));
+}
@@ -0,0 +1,131 @@
+/**
+ * @file   fixed_point.h
+ * @brief  Fixed-point types and helpers for the weight and CoP pipeline.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-02
+ *
+ * weight_t and cop_t are the types the sketch computes with. They are float
+ * by default and Q16.16 / Q1.15 integers when COP_FIXED_POINT is set. This
+ * header depends only on <stdint.h> so it also builds on a host compiler.
+ */
+
+#ifndef FIXED_POINT_H
+#define FIXED_POINT_H
+
+#include <stdint.h>
+#include "config.h"
+
+typedef int32_t q16_t;  ///< Signed Q16.16, used for weights
+typedef int16_t q15_t;  ///< Signed Q1.15, used for the normalized CoP
+
+#if COP_FIXED_POINT
+typedef q16_t weight_t; ///< Weight in calibrated units
+typedef q15_t cop_t;    ///< Normalized CoP component
+/// Weight constant in calibrated units, folded at compile time.
+#define WEIGHT_CONST(x) ((weight_t)((x) * 65536.0 + ((x) < 0 ? -0.5 : 0.5)))
+#else
+typedef float weight_t; ///< Weight in calibrated units
+typedef float cop_t;    ///< Normalized CoP component
+/// Weight constant in calibrated units.
+#define WEIGHT_CONST(x) ((weight_t)(x))
+#endif
+
+/**
+ * @brief  Convert to Q16.16, saturating at the int32 range.
+ * @param  value  Weight in calibrated units.
+ * @return The weight times 65536.
+ */
+q16_t float_to_q16(float value);
+
+/**
+ * @brief  Convert to Q1.15, saturating at [-1, 1).
+ * @param  value  Normalized CoP component.
+ * @return The component times 32768.
+ */
+q15_t float_to_q15(float value);
+
+/// Range of the shift q16_gain() returns.
+#define Q16_SHIFT_MIN (-7)
+#define Q16_SHIFT_MAX 39
+
+/// Largest tared count q16_scale() takes; HX711 counts are 24-bit.
+#define Q16_COUNTS_MAX 8388607L
+
+/**
+ * @brief  Precompute the count-to-Q16.16 multiplier for a calibration factor.
+ * @details The multiplier 2^16 / scale is normalized to 16 significant bits
+ *          with a shift, so q16_scale() needs only 16x16-bit multiplies.
+ *          The rounding error is at most 2^-16 of the weight.
+ * @param  scale  Calibration factor in counts per unit.
+ * @param  shift  Receives the right shift to pass to q16_scale().
+ * @return round(2^(16 + shift) / scale), with |gain| in [2^15, 2^16).
+ */
+int32_t q16_gain(float scale, int8_t& shift);
+
+/**
+ * @brief  Convert tared counts to a Q16.16 weight.
+ * @param  counts  Raw count minus the offset; clamped to 24 bits.
+ * @param  gain    Multiplier from q16_gain().
+ * @param  shift   Shift from q16_gain().
+ * @return (counts * gain) >> shift, saturated to the int32 range.
+ */
+q16_t q16_scale(int32_t counts, int32_t gain, int8_t shift);
+
+/**
+ * @brief  Divide two numerators by one positive denominator into Q1.15.
+ * @details Costs one 32-bit division and two multiplies. The operands are
+ *          normalized so the denominator has 15 significant bits; the
+ *          result is within 2^-13 of the exact ratio.
+ * @param  num_x  First numerator.
+ * @param  num_y  Second numerator.
+ * @param  den    Denominator; must be > 0.
+ * @param  x      Receives num_x / den, saturated to [-1, 1).
+ * @param  y      Receives num_y / den, saturated to [-1, 1).
+ */
+void q15_ratio2(int32_t num_x, int32_t num_y, int32_t den, q15_t& x, q15_t& y);
+
+/**
+ * @brief  Weight as a float, for the ASCII formatter.
+ */
+inline float weight_to_float(weight_t w) {
+#if COP_FIXED_POINT
+    return w * (1.0f / 65536.0f);
+#else
+    return w;
+#endif
+}
+
+/**
+ * @brief  Weight as Q16.16, for the binary stream.
+ */
+inline q16_t weight_to_q16(weight_t w) {
+#if COP_FIXED_POINT
+    return w;
+#else
+    return float_to_q16(w);
+#endif
+}
+
+/**
+ * @brief  CoP component as a float, for the ASCII formatter.
+ */
+inline float cop_to_float(cop_t c) {
+#if COP_FIXED_POINT
+    return c * (1.0f / 32768.0f);
+#else
+    return c;
+#endif
+}
+
+/**
+ * @brief  CoP component as Q1.15, for the binary stream.
+ */
+inline q15_t cop_to_q15(cop_t c) {
+#if COP_FIXED_POINT
+    return c;
+#else
+    return float_to_q15(c);
+#endif
+}
+
+#endif // FIXED_POINT_H
@@ -0,0 +1,145 @@
+/**
+ * @file   geometry.cpp
+ * @brief  Implementation of the platform geometry and the physical-unit CoP solver.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-06
+ */
+
+#include <math.h>
+#include "geometry.h"
+
+/**
+ * @brief  Place the load cells on a rectangle centred on the origin.
+ * @param  geometry   Geometry to fill.
+ * @param  spacing_x  Distance between A and B, mm.
+ * @param  spacing_y  Distance between A and D, mm.
+ */
+void geometry_rectangle(PlatformGeometry& geometry, float spacing_x, float spacing_y) {
+    // Same corner signs as calc_cop(): A (-,+), B (+,+), C (+,-), D (-,-)
+    static const int8_t SIGN_X[NUM_SCALES] = {-1, 1, 1, -1};
+    static const int8_t SIGN_Y[NUM_SCALES] = {1, 1, -1, -1};
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        geometry.corner_x[i] = SIGN_X[i] * spacing_x * 0.5f;
+        geometry.corner_y[i] = SIGN_Y[i] * spacing_y * 0.5f;
+    }
+}
+
+/**
+ * @brief  Largest |coordinate| of any load cell; 0 if the geometry is unusable.
+ */
+float geometry_extent(const PlatformGeometry& geometry) {
+    float extent = 0.0f;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        float x = geometry.corner_x[i];
+        float y = geometry.corner_y[i];
+        if (isnan(x) || isinf(x) || isnan(y) || isinf(y)) {
+            return 0.0f;
+        }
+        extent = max(extent, max(fabsf(x), fabsf(y)));
+    }
+    return extent;
+}
+
+/**
+ * @brief  Precompute the per-corner coefficients.
+ * @param  geometry  Load-cell positions.
+ */
+void CopSolver::configure(const PlatformGeometry& geometry) {
+    extent = geometry_extent(geometry);
+    if (extent <= 0.0f) {
+        extent = 1.0f;
+    }
+#if COP_FIXED_POINT
+    // Capped so c * tenths fits 32 bits; packets saturate at 3.2 m anyway.
+    tenths = lround(constrain(extent * 10.0f, 0.0f, 65535.0f));
+#endif
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+#if COP_FIXED_POINT
+        coeff_x[i] = float_to_q15(geometry.corner_x[i] / extent);
+        coeff_y[i] = float_to_q15(geometry.corner_y[i] / extent);
+#else
+        coeff_x[i] = geometry.corner_x[i] / extent;
+        coeff_y[i] = geometry.corner_y[i] / extent;
+#endif
+    }
+}
+
+/**
+ * @brief  Sum the weights and take their position-weighted average.
+ * @param  weights  Weights of scales A-D.
+ * @param  total    Receives the sum of the weights.
+ * @return CoP as a fraction of the extent.
+ */
+Coordinate CopSolver::solve(const weight_t weights[NUM_SCALES], weight_t& total) const {
+#if COP_FIXED_POINT
+    // Sum, and find how far to shift so every weight fits 16 bits; the
+    // 16x16 products and their sum then stay within 32 bits.
+    total = 0;
+    uint32_t largest = 0;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        total += weights[i];
+        uint32_t magnitude = weights[i] < 0 ? -(uint32_t)weights[i] : (uint32_t)weights[i];
+        largest = magnitude > largest ? magnitude : largest;
+    }
+    uint8_t shift = 0;
+    while ((largest >> shift) >= 32768UL) {
+        shift++;
+    }
+    int32_t den = total >> shift;
+    if (den <= 0) {
+        return Coordinate(0, 0);
+    }
+
+    int32_t nx = 0;
+    int32_t ny = 0;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        int16_t w = static_cast<int16_t>(weights[i] >> shift);
+        nx += (static_cast<int32_t>(w) * coeff_x[i] + 16384) >> 15;
+        ny += (static_cast<int32_t>(w) * coeff_y[i] + 16384) >> 15;
+    }
+    cop_t x, y;
+    q15_ratio2(nx, ny, den, x, y);
+    return Coordinate(x, y);
+#else
+    total = 0;
+    float nx = 0.0f;
+    float ny = 0.0f;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        total += weights[i];
+        nx += weights[i] * coeff_x[i];
+        ny += weights[i] * coeff_y[i];
+    }
+    if (total <= 0) {
+        return Coordinate(0, 0);
+    }
+    // One divide per frame; both axes share the reciprocal.
+    float inv_total = 1.0f / total;
+    return Coordinate(nx * inv_total, ny * inv_total);
+#endif
+}
+
+/**
+ * @brief  Largest |coordinate| of any load cell, mm.
+ */
+float CopSolver::get_extent() const {
+    return extent;
+}
+
+/**
+ * @brief  Convert a solved CoP component to millimetres.
+ */
+float CopSolver::to_mm(cop_t c) const {
+    return cop_to_float(c) * extent;
+}
+
+/**
+ * @brief  Convert a solved CoP component to tenths of a millimetre.
+ */
+int16_t CopSolver::to_tenths_mm(cop_t c) const {
+#if COP_FIXED_POINT
+    long value = (static_cast<int32_t>(c) * tenths + 16384) >> 15;
+#else
+    long value = lround(to_mm(c) * 10.0f);
+#endif
+    return static_cast<int16_t>(constrain(value, -32768L, 32767L));
+}
@@ -0,0 +1,96 @@
+/**
+ * @file   geometry.h
+ * @brief  Declaration of the platform geometry and the physical-unit CoP solver.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-06
+ */
+
+#ifndef GEOMETRY_H
+#define GEOMETRY_H
+
+#include "fixed_point.h"
+#include "coordinate.h"
+#include "scale_reader.h"
+
+/// Load-cell spacing of the default geometry, mm.
+#define GEOMETRY_SPACING_DEFAULT 400.0f
+
+/**
+ * @struct PlatformGeometry
+ * @brief  Position of each load cell in millimetres, as persisted in Settings.
+ *
+ * The origin is the platform centre, X points from A towards B and Y from D
+ * towards A, matching the signs of calc_cop(): A is front-left, B
+ * front-right, C back-right and D back-left.
+ */
+struct PlatformGeometry {
+    float corner_x[NUM_SCALES]; ///< X of scales A-D, mm
+    float corner_y[NUM_SCALES]; ///< Y of scales A-D, mm
+};
+
+/**
+ * @brief  Place the load cells on a rectangle centred on the origin.
+ * @param  geometry   Geometry to fill.
+ * @param  spacing_x  Distance between A and B (and between D and C), mm.
+ * @param  spacing_y  Distance between A and D (and between B and C), mm.
+ */
+void geometry_rectangle(PlatformGeometry& geometry, float spacing_x, float spacing_y);
+
+/**
+ * @brief  Largest |coordinate| of any load cell; 0 if the geometry is unusable.
+ * @details NaN and infinite positions also give 0.
+ */
+float geometry_extent(const PlatformGeometry& geometry);
+
+/**
+ * @class CopSolver
+ * @brief Weighted-average CoP over arbitrary load-cell positions.
+ *
+ * Positions are stored as coefficients relative to the extent of the
+ * platform, so the CoP comes out as a cop_t fraction of the extent (Q1.15 in
+ * fixed-point builds) and one multiply turns it into millimetres.
+ */
+class CopSolver {
+public:
+    /**
+     * @brief Precompute the per-corner coefficients.
+     * @param geometry Load-cell positions; geometry_extent() must be > 0.
+     */
+    void configure(const PlatformGeometry& geometry);
+
+    /**
+     * @brief Sum the weights and take their position-weighted average.
+     * @details Total and both numerators are accumulated in one pass over
+     *          the weights, then divided once.
+     * @param weights Weights of scales A-D.
+     * @param total   Receives the sum of the weights.
+     * @return CoP as a fraction of get_extent(); (0, 0) when total <= 0.
+     */
+    Coordinate solve(const weight_t weights[NUM_SCALES], weight_t& total) const;
+
+    /**
+     * @brief Largest |coordinate| of any load cell, mm.
+     */
+    float get_extent() const;
+
+    /**
+     * @brief Convert a solved CoP component to millimetres.
+     */
+    float to_mm(cop_t c) const;
+
+    /**
+     * @brief Convert a solved CoP component to tenths of a millimetre, for
+     *        the binary stream; saturates at the int16 range.
+     */
+    int16_t to_tenths_mm(cop_t c) const;
+
+private:
+    cop_t coeff_x[NUM_SCALES];  ///< corner_x / extent
+    cop_t coeff_y[NUM_SCALES];  ///< corner_y / extent
+    float extent = 1.0f;        ///< Largest |coordinate|, mm
+#if COP_FIXED_POINT
+    int32_t tenths = 10;        ///< Extent in tenths of a millimetre
+#endif
+};
+
+#endif // GEOMETRY_H
@@ -0,0 +1,135 @@
+/**
+ * @file   hampel_filter.cpp
+ * @brief  Implementation of the running-median / Hampel outlier filter.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-16
+ */
+
+#include "hampel_filter.h"
+
+/// Scale from MAD to standard deviation for normally distributed noise.
+static constexpr float MAD_TO_SIGMA = 1.4826f;
+
+/**
+ * @brief  Set the window and threshold and clear the history.
+ * @param  window  Samples in the window; forced odd and into [1, FILTER_WINDOW_MAX].
+ * @param  sigma   Threshold in robust standard deviations; 0 for a pure median.
+ */
+void HampelFilter::configure(uint8_t window, float sigma) {
+    window = constrain(window, (uint8_t)1, (uint8_t)FILTER_WINDOW_MAX);
+    if (window % 2 == 0) {
+        window--;
+    }
+    this->window = window;
+
+    sigma = constrain(sigma, 0.0f, 40.0f);
+    threshold_q8 = static_cast<uint16_t>(sigma * MAD_TO_SIGMA * 256.0f + 0.5f);
+    reset();
+}
+
+/**
+ * @brief  Window length in samples.
+ */
+uint8_t HampelFilter::get_window() const {
+    return window;
+}
+
+/**
+ * @brief  Clear the history.
+ */
+void HampelFilter::reset() {
+    count = 0;
+    next = 0;
+}
+
+/**
+ * @brief  Filter one sample.
+ * @param  sample  New raw count.
+ * @return The sample, or the window median if it is an outlier.
+ */
+long HampelFilter::update(long sample) {
+    if (window == 1) {
+        return sample;
+    }
+
+    // Keep `sorted` ordered: drop the sample leaving the window by shifting
+    // its neighbours over it, then insert the new one in the same pass.
+    uint8_t i;
+    if (count < window) {
+        i = count++;
+    } else {
+        long leaving = history[next];
+        i = 0;
+        while (sorted[i] != leaving) {
+            i++;
+        }
+        while (i + 1 < count) {
+            sorted[i] = sorted[i + 1];
+            i++;
+        }
+    }
+    while (i > 0 && sorted[i - 1] > sample) {
+        sorted[i] = sorted[i - 1];
+        i--;
+    }
+    sorted[i] = sample;
+
+    history[next] = sample;
+    next = (next + 1 == window) ? 0 : next + 1;
+
+    // Not enough history yet to tell an outlier from a step.
+    if (count < 3) {
+        return sample;
+    }
+
+    long median = sorted[count / 2];
+    long deviation = labs(sample - median);
+    unsigned long mad = median_abs_deviation(median);
+    // Stay in 32-bit math: MAD is normally a few counts, but a window holding
+    // a step can make it large.
+    unsigned long limit = (mad < 0x20000UL) ? (mad * threshold_q8) >> 8
+                                            : (mad >> 8) * threshold_q8;
+    if (static_cast<unsigned long>(deviation) > limit) {
+        rejections++;
+        return median;
+    }
+    return sample;
+}
+
+/**
+ * @brief  Median absolute deviation of the window about its median.
+ * @details The deviations of a sorted window grow outward from the median, so
+ *          the k-th smallest is found by merging outward from the middle,
+ *          without sorting them.
+ * @param  median  The window median, sorted[count / 2].
+ * @return The MAD in raw counts.
+ */
+long HampelFilter::median_abs_deviation(long median) const {
+    int8_t left = count / 2 - 1;
+    uint8_t right = count / 2 + 1;
+    long mad = 0;
+
+    // Deviation rank 0 is the median itself; walk up to rank count / 2.
+    for (uint8_t rank = 0; rank < count / 2; rank++) {
+        if (left >= 0 && (right >= count || median - sorted[left] <= sorted[right] - median)) {
+            mad = median - sorted[left--];
+        } else {
+            mad = sorted[right++] - median;
+        }
+    }
+    return mad;
+}
+
+/**
+ * @brief  Number of samples replaced since the counter was last cleared.
+ */
+uint32_t HampelFilter::get_rejections() const {
+    return rejections;
+}
+
+/**
+ * @brief  Clear the rejection counter.
+ */
+void HampelFilter::clear_rejections() {
+    rejections = 0;
+}
@@ -0,0 +1,84 @@
+/**
+ * @file   hampel_filter.h
+ * @brief  Declaration of a windowed running-median / Hampel outlier filter.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-16
+ */
+
+#ifndef HAMPEL_FILTER_H
+#define HAMPEL_FILTER_H
+
+#include <Arduino.h>
+
+/// Largest supported window; windows are odd so the median is a sample.
+#define FILTER_WINDOW_MAX 9
+
+/// Default window length in samples.
+#define FILTER_WINDOW_DEFAULT 5
+
+/// Default outlier threshold in robust standard deviations.
+#define FILTER_SIGMA_DEFAULT 3.0f
+
+/**
+ * @class HampelFilter
+ * @brief Replaces samples that stray too far from the running median.
+ *
+ * The last `window` samples are kept twice: in arrival order, to know which
+ * one leaves next, and sorted, so each update is one O(window) remove/insert
+ * rather than a full sort. A sample further than sigma * 1.4826 * MAD from
+ * the window median is replaced by the median. With sigma set to 0 every
+ * sample is replaced, which makes this a plain running-median filter.
+ *
+ * Unlike a fixed jump threshold, a genuine step (someone stepping on the
+ * platform) is accepted once it fills half the window.
+ */
+class HampelFilter {
+public:
+    /**
+     * @brief Set the window and threshold and clear the history.
+     * @param window Samples in the window; odd, 1 to FILTER_WINDOW_MAX.
+     *               A window of 1 disables the filter.
+     * @param sigma  Threshold in robust standard deviations; 0 for a pure median.
+     */
+    void configure(uint8_t window, float sigma);
+
+    /**
+     * @brief Window length after configure() made it odd and in range.
+     */
+    uint8_t get_window() const;
+
+    /**
+     * @brief Clear the history; the next samples pass through until it refills.
+     */
+    void reset();
+
+    /**
+     * @brief Filter one sample.
+     * @param sample New raw count.
+     * @return The sample, or the window median if it is an outlier.
+     */
+    long update(long sample);
+
+    /**
+     * @brief Number of samples replaced since the counter was last cleared.
+     */
+    uint32_t get_rejections() const;
+
+    /**
+     * @brief Clear the rejection counter.
+     */
+    void clear_rejections();
+
+private:
+    uint8_t window = FILTER_WINDOW_DEFAULT;  ///< Window length
+    uint16_t threshold_q8 = 0;               ///< sigma * 1.4826 in Q8.8
+    uint8_t count = 0;                       ///< Samples currently held
+    uint8_t next = 0;                        ///< Slot in history to overwrite next
+    long history[FILTER_WINDOW_MAX];         ///< Samples in arrival order
+    long sorted[FILTER_WINDOW_MAX];          ///< The same samples, ascending
+    uint32_t rejections = 0;                 ///< Samples replaced by the median
+
+    long median_abs_deviation(long median) const;
+};
+
+#endif // HAMPEL_FILTER_H
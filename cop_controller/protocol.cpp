@@ -0,0 +1,121 @@
+/**
+ * @file   protocol.cpp
+ * @brief  Implementation of the COBS-framed binary stream protocol.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-25
+ */
+
+#include "protocol.h"
+#include "crc16.h"
+
+/// Size of a sample payload, excluding the CRC.
+static constexpr uint8_t SAMPLE_PAYLOAD_SIZE = 28;
+
+/**
+ * @brief  Store a little-endian 16-bit value.
+ * @param  dst    Destination buffer.
+ * @param  value  Value to store.
+ * @return Pointer just past the stored bytes.
+ */
+uint8_t* put_u16(uint8_t* dst, uint16_t value) {
+    *dst++ = value & 0xFF;
+    *dst++ = value >> 8;
+    return dst;
+}
+
+/**
+ * @brief  Store a little-endian 32-bit value.
+ * @param  dst    Destination buffer.
+ * @param  value  Value to store.
+ * @return Pointer just past the stored bytes.
+ */
+uint8_t* put_u32(uint8_t* dst, uint32_t value) {
+    dst = put_u16(dst, value & 0xFFFF);
+    return put_u16(dst, value >> 16);
+}
+
+/**
+ * @brief  Frame a payload with CRC, COBS and a 0x00 delimiter and write it out.
+ * @details The whole packet is encoded into one buffer so it reaches Serial
+ *          with a single write() call.
+ * @param  payload  Packet bytes, starting with the packet type.
+ * @param  len      Payload length; at most PACKET_MAX_PAYLOAD.
+ */
+void send_packet(const uint8_t* payload, uint8_t len) {
+    if (len > PACKET_MAX_PAYLOAD) {
+        return;
+    }
+
+    uint8_t crc_bytes[2];
+    put_u16(crc_bytes, crc16_update(CRC16_INIT, payload, len));
+
+    // COBS: each code byte holds the distance to the next zero. Payloads are
+    // shorter than 254 bytes, so a single pass with no 0xFF blocks suffices.
+    uint8_t out[PACKET_MAX_PAYLOAD + 4];
+    uint8_t code_pos = 0;
+    uint8_t out_len = 1;
+    uint8_t code = 1;
+
+    for (uint8_t i = 0; i < len + 2; i++) {
+        uint8_t b = (i < len) ? payload[i] : crc_bytes[i - len];
+        if (b == 0) {
+            out[code_pos] = code;
+            code_pos = out_len++;
+            code = 1;
+        } else {
+            out[out_len++] = b;
+            code++;
+        }
+    }
+    out[code_pos] = code;
+    out[out_len++] = 0x00;
+
+    Serial.write(out, out_len);
+}
+
+/**
+ * @brief  Build and send a sample packet.
+ * @param  seq        Frame sequence number.
+ * @param  timestamp  Frame timestamp in microseconds.
+ * @param  flags      PACKET_FLAG_* bits.
+ * @param  weights    Weights A-D in Q16.16.
+ * @param  cop_x      CoP X in Q1.15, or tenths of a mm with PACKET_FLAG_MM.
+ * @param  cop_y      CoP Y in Q1.15, or tenths of a mm with PACKET_FLAG_MM.
+ */
+void send_sample_packet(uint16_t seq, uint32_t timestamp, uint8_t flags,
+                        const int32_t weights[NUM_SCALES], int16_t cop_x, int16_t cop_y) {
+    uint8_t payload[SAMPLE_PAYLOAD_SIZE];
+    uint8_t* p = payload;
+
+    *p++ = PACKET_SAMPLE;
+    *p++ = flags;
+    p = put_u16(p, seq);
+    p = put_u32(p, timestamp);
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        p = put_u32(p, static_cast<uint32_t>(weights[i]));
+    }
+    p = put_u16(p, static_cast<uint16_t>(cop_x));
+    put_u16(p, static_cast<uint16_t>(cop_y));
+
+    send_packet(payload, SAMPLE_PAYLOAD_SIZE);
+}
+
+/**
+ * @brief  Build and send a status packet.
+ * @param  code    STATUS_* code.
+ * @param  values  Code-specific 32-bit values (integers or floats, bit for bit).
+ * @param  count   Number of values; at most 17.
+ */
+void send_status_packet(uint8_t code, const uint32_t* values, uint8_t count) {
+    uint8_t payload[PACKET_MAX_PAYLOAD];
+    uint8_t* p = payload;
+
+    count = min(count, (uint8_t)((PACKET_MAX_PAYLOAD - 2) / 4));
+    *p++ = PACKET_STATUS;
+    *p++ = code;
+    for (uint8_t i = 0; i < count; i++) {
+        p = put_u32(p, values[i]);
+    }
+
+    send_packet(payload, p - payload);
+}
@@ -0,0 +1,136 @@
+/**
+ * @file   protocol.h
+ * @brief  Declaration of the COBS-framed binary stream protocol.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-25
+ *
+ * Every packet is a payload followed by its CRC-16 (little-endian), COBS
+ * encoded and terminated by a 0x00 byte. All multi-byte fields are
+ * little-endian. The first payload byte is the packet type.
+ *
+ * Sample packet (PACKET_SAMPLE), 30 bytes before framing:
+ *
+ * | Offset | Size | Field                                   |
+ * | :----- | :--- | :-------------------------------------- |
+ * | 0      | 1    | type = 0x01                             |
+ * | 1      | 1    | flags (PACKET_FLAG_*)                   |
+ * | 2      | 2    | sequence number (uint16)                |
+ * | 4      | 4    | timestamp in microseconds (uint32)      |
+ * | 8      | 16   | weights A-D, int32 Q16.16               |
+ * | 24     | 4    | CoP X, Y, int16 Q1.15 (see below)       |
+ * | 28     | 2    | CRC-16/CCITT-FALSE of bytes 0-27        |
+ *
+ * The CoP is normalized, in Q1.15, unless PACKET_FLAG_MM is set; it is
+ * then in tenths of a millimetre from the platform centre.
+ *
+ * Status packet (PACKET_STATUS) reports the end of a background job:
+ *
+ * | Offset | Size | Field                                   |
+ * | :----- | :--- | :-------------------------------------- |
+ * | 0      | 1    | type = 0x02                             |
+ * | 1      | 1    | status code (STATUS_*)                  |
+ * | 2      | n    | code-specific values, 4 bytes each      |
+ * | 2 + n  | 2    | CRC-16/CCITT-FALSE                      |
+ *
+ * STATUS_TARED carries the four new offsets as int32 counts.
+ * STATUS_CALIBRATED carries six float32 values: the factors of scales A-D,
+ * their spread (largest minus smallest) and the average that was applied.
+ * STATUS_PLACEMENT carries the four averaged net counts as int32.
+ * STATUS_STATS carries sixteen uint32 values: frames processed, buffer
+ * overruns, late frames and filter rejections, then the minimum, mean and
+ * maximum microseconds of the acquire, filter, CoP and output stages.
+ * STATUS_SYNC carries three uint32 values: micros() when the packet was
+ * sent, the sequence number of the last sample and the decimation factor.
+ * It is sent when a stream starts and about once a second after that.
+ * STATUS_SETTINGS carries eleven float32 values: the calibration factor and
+ * offset of scales A-D in turn, then the filter window, filter sigma and
+ * decimation factor. Offsets are 24-bit counts, so float32 holds them exactly.
+ * STATUS_GEOMETRY carries nine float32 values: the CoP units (0 normalized,
+ * 1 millimetres), then the X and Y position of scales A-D in turn, in mm.
+ * STATUS_BUSY carries one uint32 value, the job still running (1 tare,
+ * 2 calibration, 3 placement), when 'z', 'k' or 'p' is refused. The job's
+ * own status packet still follows when it finishes.
+ *
+ * The host-side decoder lives in cop_client/protocol.py.
+ */
+
+#ifndef PROTOCOL_H
+#define PROTOCOL_H
+
+#include <Arduino.h>
+#include "scale_reader.h"
+
+/// Packet type of a streamed sample.
+#define PACKET_SAMPLE 0x01
+/// Packet type of a status report.
+#define PACKET_STATUS 0x02
+
+/// Sample flag: a tare is averaging frames; weights still use the old offsets.
+#define PACKET_FLAG_TARING 0x01
+/// Sample flag: the CoP is in tenths of a millimetre rather than Q1.15.
+#define PACKET_FLAG_MM 0x02
+
+/// Status code: tare finished; values are the new offsets A-D.
+#define STATUS_TARED 0x01
+/// Status code: calibration finished; values are float factors A-D, spread, average.
+#define STATUS_CALIBRATED 0x02
+/// Status code: placement captured; values are net counts A-D as int32.
+#define STATUS_PLACEMENT 0x03
+/// Status code: loop statistics; values are uint32 counters and timings.
+#define STATUS_STATS 0x04
+/// Status code: clock sync; values are micros(), last sequence number, decimation.
+#define STATUS_SYNC 0x05
+/// Status code: settings in use; values are float factor/offset pairs A-D, window, sigma, decimation.
+#define STATUS_SETTINGS 0x06
+/// Status code: platform geometry; values are float units, then X/Y pairs A-D in mm.
+#define STATUS_GEOMETRY 0x07
+/// Status code: a job was refused; the value is the uint32 job still running.
+#define STATUS_BUSY 0x08
+
+/// Largest payload, excluding the CRC, that send_packet() accepts.
+#define PACKET_MAX_PAYLOAD 72
+
+/**
+ * @brief  Append the CRC, COBS encode and write one packet to Serial.
+ * @param  payload  Packet bytes, starting with the packet type.
+ * @param  len      Payload length; at most PACKET_MAX_PAYLOAD.
+ */
+void send_packet(const uint8_t* payload, uint8_t len);
+
+/**
+ * @brief  Build and send a sample packet.
+ * @param  seq        Frame sequence number.
+ * @param  timestamp  Frame timestamp in microseconds.
+ * @param  flags      PACKET_FLAG_* bits.
+ * @param  weights    Weights A-D in Q16.16.
+ * @param  cop_x      CoP X in Q1.15, or tenths of a mm with PACKET_FLAG_MM.
+ * @param  cop_y      CoP Y in Q1.15, or tenths of a mm with PACKET_FLAG_MM.
+ */
+void send_sample_packet(uint16_t seq, uint32_t timestamp, uint8_t flags,
+                        const int32_t weights[NUM_SCALES], int16_t cop_x, int16_t cop_y);
+
+/**
+ * @brief  Build and send a status packet.
+ * @param  code    STATUS_* code.
+ * @param  values  Code-specific 32-bit values (integers or floats, bit for bit).
+ * @param  count   Number of values; at most 17.
+ */
+void send_status_packet(uint8_t code, const uint32_t* values, uint8_t count);
+
+/**
+ * @brief  Write a little-endian 16-bit value.
+ * @param  dst    Destination buffer.
+ * @param  value  Value to store.
+ * @return Pointer just past the stored bytes.
+ */
+uint8_t* put_u16(uint8_t* dst, uint16_t value);
+
+/**
+ * @brief  Write a little-endian 32-bit value.
+ * @param  dst    Destination buffer.
+ * @param  value  Value to store.
+ * @return Pointer just past the stored bytes.
+ */
+uint8_t* put_u32(uint8_t* dst, uint32_t value);
+
+#endif // PROTOCOL_H
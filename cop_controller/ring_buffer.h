@@ -0,0 +1,81 @@
+/**
+ * @file   ring_buffer.h
+ * @brief  Fixed-size single-producer, single-consumer ring buffer.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-18
+ */
+
+#ifndef RING_BUFFER_H
+#define RING_BUFFER_H
+
+#include <Arduino.h>
+
+/**
+ * @class RingBuffer
+ * @brief Lock-free queue for one producer (an ISR) and one consumer (loop()).
+ *
+ * The head and tail indices are single bytes, so reading or writing them is
+ * atomic on AVR. The producer only moves the head and the consumer only moves
+ * the tail. Because an item is larger than a byte, the consumer should copy it
+ * out with interrupts disabled (see Acquisition::pop()).
+ *
+ * @tparam T  Item type.
+ * @tparam N  Capacity; must be a power of two no larger than 128.
+ */
+template <typename T, uint8_t N>
+class RingBuffer {
+    static_assert(N > 0 && N <= 128 && (N & (N - 1)) == 0,
+                  "RingBuffer capacity must be a power of two up to 128");
+
+public:
+    /**
+     * @brief Append an item.
+     * @param item Item to copy into the buffer.
+     * @return false if the buffer was full and the item was dropped.
+     */
+    bool push(const T& item) {
+        uint8_t h = head;
+        if (static_cast<uint8_t>(h - tail) >= N) {
+            return false;
+        }
+        items[h & (N - 1)] = item;
+        head = h + 1;
+        return true;
+    }
+
+    /**
+     * @brief Remove the oldest item.
+     * @param item Receives the removed item.
+     * @return false if the buffer was empty.
+     */
+    bool pop(T& item) {
+        uint8_t t = tail;
+        if (t == head) {
+            return false;
+        }
+        item = items[t & (N - 1)];
+        tail = t + 1;
+        return true;
+    }
+
+    /**
+     * @brief Number of items waiting to be popped.
+     */
+    uint8_t size() const {
+        return static_cast<uint8_t>(head - tail);
+    }
+
+    /**
+     * @brief Discard every queued item. Consumer side only.
+     */
+    void clear() {
+        tail = head;
+    }
+
+private:
+    T items[N];                 ///< Storage
+    volatile uint8_t head = 0;  ///< Free-running write index
+    volatile uint8_t tail = 0;  ///< Free-running read index
+};
+
+#endif // RING_BUFFER_H
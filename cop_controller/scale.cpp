@@ -1,6 +1,6 @@
 /**
  * @file   Scale.cpp
- * @brief  Implementation of the Scale class methods for EEPROM persistence.  
+ * @brief  Implementation of the Scale class methods.
  * @author rickwgarcia@unm.edu
  * @date   2025-07-10
  */
@@ -9,31 +9,43 @@
 #include "scale.h"
 
 /**
- * @brief Constructor for the Scale class.
- * @param address The starting EEPROM address for storing scale settings.
+ * @brief Copies the current scale settings (calibration factor and zero factor).
+ * @param settings Destination for this scale's factors.
  */
-Scale::Scale(int address) {
-  this->eeprom_address = address;
+void Scale::save(ScaleSettings& settings) {
+  settings.calibration_factor = get_scale();
+  settings.zero_factor = get_offset();
 }
 
 /**
- * @brief Saves the current scale settings (calibration factor and zero factor) to EEPROM.
+ * @brief Applies scale settings loaded from the settings record.
+ * @param settings This scale's factors.
  */
-void Scale::save() {
-  Settings settings;
-  settings.calibration_factor = get_scale();
-  settings.zero_factor = get_offset();
-
-  EEPROM.put(this->eeprom_address, settings);
+void Scale::load(const ScaleSettings& settings) {
+  set_scale(settings.calibration_factor);
+  set_offset(settings.zero_factor);
 }
 
 /**
- * @brief Loads the scale settings from EEPROM and applies them.
+ * @brief Sets the calibration factor and, in fixed-point builds, its multiplier.
+ * @param scale Counts per calibrated unit.
  */
-void Scale::load() {
-  Settings settings;
-  EEPROM.get(this->eeprom_address, settings);
+void Scale::set_scale(float scale) {
+  HX711::set_scale(scale);
+#if COP_FIXED_POINT
+  gain = q16_gain(scale, shift);
+#endif
+}
 
-  set_scale(settings.calibration_factor);
-  set_offset(settings.zero_factor);
+/**
+ * @brief Converts a raw count to units using the current offset and scale factor.
+ * @param raw Count read from this scale's module.
+ * @return The weight in calibrated units.
+ */
+weight_t Scale::raw_to_weight(long raw) {
+#if COP_FIXED_POINT
+  return q16_scale(raw - get_offset(), gain, shift);
+#else
+  return (raw - get_offset()) / get_scale();
+#endif
 }
@@ -1,6 +1,6 @@
 /**
  * @file   Scale.h
- * @brief  Declaration of the Scale class extending HX711, with EEPROM persistence.
+ * @brief  Declaration of the Scale class extending HX711, with persistable settings.
  * @author rickwgarcia@unm.edu
  * @date   2025-07-10
  */
@@ -9,41 +9,55 @@
 #define SCALE_H
 
 #include "HX711.h"
-#include <EEPROM.h>
+#include "fixed_point.h"
 
 /**
- * @struct Settings
- * @brief  Stores calibration and offset factors for EEPROM.
+ * @struct ScaleSettings
+ * @brief  Calibration and offset factors of one scale, as persisted in Settings.
  */
-struct Settings {
+struct ScaleSettings {
     float calibration_factor; ///< Scale factor to apply to raw reading
     long zero_factor;         ///< Offset to apply for taring
 };
 
 /**
  * @class Scale
- * @brief Extends HX711 to add EEPROM-backed save/load of calibration settings.
+ * @brief Extends HX711 with fixed-point conversion and settings capture/restore.
  */
 class Scale : public HX711 {
 public:
     /**
-     * @brief Construct a new Scale object.
-     * @param address Starting EEPROM address for this scale’s Settings.
+     * @brief Copy the current calibration and zero factors into a settings record.
+     * @param settings Destination for this scale's factors.
      */
-    explicit Scale(int address);
+    void save(ScaleSettings& settings);
 
     /**
-     * @brief Save current calibration and zero factors to EEPROM.
+     * @brief Apply calibration and zero factors from a settings record.
+     * @param settings This scale's factors.
      */
-    void save();
+    void load(const ScaleSettings& settings);
 
     /**
-     * @brief Load calibration and zero factors from EEPROM and apply them.
+     * @brief Set the calibration factor.
+     * @details Hides HX711::set_scale() so the fixed-point multiplier stays
+     *          in step with the factor.
+     * @param scale Counts per calibrated unit (defaults to 1.0).
      */
-    void load();
+    void set_scale(float scale = 1.f);
+
+    /**
+     * @brief Convert a raw HX711 count to calibrated units.
+     * @param raw Count read from this scale's module.
+     * @return (raw - offset) / scale, the same value get_units() would return.
+     */
+    weight_t raw_to_weight(long raw);
 
 private:
-    int eeprom_address; ///< EEPROM base address for this scale’s Settings
+#if COP_FIXED_POINT
+    int32_t gain = 0;   ///< q16_gain() of the calibration factor
+    int8_t shift = 0;   ///< Its shift for q16_scale()
+#endif
 };
 
 #endif // SCALE_H
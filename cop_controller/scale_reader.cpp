@@ -0,0 +1,148 @@
+/**
+ * @file   scale_reader.cpp
+ * @brief  Implementation of the parallel HX711 reader.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-18
+ */
+
+#include "scale_reader.h"
+
+/// Extra SCK pulses after the data bits: 1 selects channel A, gain 128.
+static constexpr uint8_t GAIN_PULSES = 1;
+
+/**
+ * @brief  Configure the shared clock pin and the data pin of each module.
+ * @param  clk_pin    Shared SCK pin.
+ * @param  dout_pins  DOUT pin of each module, in scale order.
+ */
+void ScaleReader::begin(uint8_t clk_pin, const uint8_t dout_pins[NUM_SCALES]) {
+    this->clk_pin = clk_pin;
+    pinMode(clk_pin, OUTPUT);
+    digitalWrite(clk_pin, LOW);
+
+#if defined(__AVR__)
+    clk_port = portOutputRegister(digitalPinToPort(clk_pin));
+    clk_mask = digitalPinToBitMask(clk_pin);
+    num_ports = 0;
+#endif
+
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        dout_pin[i] = dout_pins[i];
+        pinMode(dout_pins[i], INPUT);
+
+#if defined(__AVR__)
+        // Group the data pins by input register so each clock edge costs one
+        // read per port rather than one per module. On a Nano D7 lives on
+        // PORTD and D8-D10 on PORTB, so this is two reads per edge.
+        volatile uint8_t* port = portInputRegister(digitalPinToPort(dout_pins[i]));
+        uint8_t p = 0;
+        while (p < num_ports && ports[p] != port) {
+            p++;
+        }
+        if (p == num_ports) {
+            ports[num_ports++] = port;
+        }
+        port_index[i] = p;
+        dout_mask[i] = digitalPinToBitMask(dout_pins[i]);
+#endif
+    }
+}
+
+/**
+ * @brief  Check whether every module has finished a conversion.
+ * @return true when all DOUT lines are low.
+ */
+bool ScaleReader::is_ready() {
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+#if defined(__AVR__)
+        if (*ports[port_index[i]] & dout_mask[i]) {
+            return false;
+        }
+#else
+        if (digitalRead(dout_pin[i]) == HIGH) {
+            return false;
+        }
+#endif
+    }
+    return true;
+}
+
+/**
+ * @brief  Wait until every module has a conversion ready.
+ */
+void ScaleReader::wait_ready() {
+    while (!is_ready()) {
+        delay(0);
+    }
+}
+
+/**
+ * @brief  Clock 24 data bits plus the gain pulse out of every module at once.
+ * @param  raw  Receives the sign-extended count of each module.
+ */
+void ScaleReader::read(long raw[NUM_SCALES]) {
+    uint32_t value[NUM_SCALES] = {0};
+
+    // SCK held high for more than 60 us powers the HX711 down, so keep the
+    // burst free of interrupts just like the HX711 library does. The status
+    // register is restored rather than re-enabled so read() is safe to call
+    // from an interrupt handler.
+#if defined(__AVR__)
+    uint8_t sreg = SREG;
+    cli();
+
+    uint8_t snapshot[NUM_SCALES];
+    for (uint8_t bit = 0; bit < 24; bit++) {
+        *clk_port |= clk_mask;
+        // DOUT settles within 0.1 us of the rising edge; the register
+        // write above already takes longer than that at 16 MHz.
+        for (uint8_t p = 0; p < num_ports; p++) {
+            snapshot[p] = *ports[p];
+        }
+        *clk_port &= ~clk_mask;
+
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            value[i] <<= 1;
+            if (snapshot[port_index[i]] & dout_mask[i]) {
+                value[i] |= 1;
+            }
+        }
+    }
+
+    for (uint8_t i = 0; i < GAIN_PULSES; i++) {
+        *clk_port |= clk_mask;
+        delayMicroseconds(1);
+        *clk_port &= ~clk_mask;
+        delayMicroseconds(1);
+    }
+
+    SREG = sreg;
+#else
+    noInterrupts();
+
+    for (uint8_t bit = 0; bit < 24; bit++) {
+        digitalWrite(clk_pin, HIGH);
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            value[i] = (value[i] << 1) | (digitalRead(dout_pin[i]) == HIGH ? 1 : 0);
+        }
+        digitalWrite(clk_pin, LOW);
+    }
+
+    for (uint8_t i = 0; i < GAIN_PULSES; i++) {
+        digitalWrite(clk_pin, HIGH);
+        delayMicroseconds(1);
+        digitalWrite(clk_pin, LOW);
+        delayMicroseconds(1);
+    }
+
+    interrupts();
+#endif
+
+    // Sign-extend the 24-bit two's complement counts.
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        if (value[i] & 0x800000UL) {
+            value[i] |= 0xFF000000UL;
+        }
+        raw[i] = static_cast<int32_t>(value[i]);
+    }
+}
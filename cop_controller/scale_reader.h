@@ -0,0 +1,66 @@
+/**
+ * @file   scale_reader.h
+ * @brief  Declaration of a reader that clocks several HX711 modules in parallel.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-09-18
+ */
+
+#ifndef SCALE_READER_H
+#define SCALE_READER_H
+
+#include <Arduino.h>
+
+/// Number of HX711 modules (load cell corners) on the platform.
+#define NUM_SCALES 4
+
+/**
+ * @class ScaleReader
+ * @brief Reads all HX711 modules that share one SCK line in a single clock burst.
+ *
+ * Every module sees the same 25 SCK pulses, so clocking them one at a time
+ * through the HX711 library throws away the other modules' conversions. This
+ * reader waits until every DOUT line is low, then clocks the 24 data bits once
+ * and samples all data lines together on each edge.
+ */
+class ScaleReader {
+public:
+    /**
+     * @brief Configure the clock and data pins.
+     * @param clk_pin    Shared SCK pin.
+     * @param dout_pins  DOUT pin of each module, in scale order (A, B, C, D).
+     */
+    void begin(uint8_t clk_pin, const uint8_t dout_pins[NUM_SCALES]);
+
+    /**
+     * @brief Check whether every module has a conversion ready.
+     * @return true when all DOUT lines are low.
+     */
+    bool is_ready();
+
+    /**
+     * @brief Block until every module has a conversion ready.
+     */
+    void wait_ready();
+
+    /**
+     * @brief Clock out one conversion from every module.
+     * @details Call only after is_ready() returned true. Selects channel A,
+     *          gain 128 for the next conversion. Safe to call from an ISR.
+     * @param raw Receives the signed 24-bit count of each module.
+     */
+    void read(long raw[NUM_SCALES]);
+
+private:
+    uint8_t clk_pin;                      ///< Shared SCK pin
+    uint8_t dout_pin[NUM_SCALES];         ///< DOUT pin of each module
+#if defined(__AVR__)
+    volatile uint8_t* clk_port;           ///< Output register driving SCK
+    uint8_t clk_mask;                     ///< SCK bit within clk_port
+    volatile uint8_t* ports[NUM_SCALES];  ///< Distinct input registers holding the DOUT pins
+    uint8_t num_ports;                    ///< Number of entries used in ports
+    uint8_t port_index[NUM_SCALES];       ///< Index into ports for each module
+    uint8_t dout_mask[NUM_SCALES];        ///< DOUT bit within its input register
+#endif
+};
+
+#endif // SCALE_READER_H
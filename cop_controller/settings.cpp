@@ -0,0 +1,246 @@
+/**
+ * @file   settings.cpp
+ * @brief  Implementation of the versioned, CRC-protected settings journal.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-23
+ */
+
+#include <EEPROM.h>
+#ifdef __AVR__
+#include <avr/eeprom.h>
+#endif
+#include "settings.h"
+#include "crc16.h"
+#include "hampel_filter.h"
+
+/**
+ * @struct SettingsV1
+ * @brief  Layout of a version 1 record, kept so old journals can be migrated.
+ */
+struct SettingsV1 {
+    uint16_t magic;
+    uint8_t version;
+    uint8_t sequence;
+    ScaleSettings scales[NUM_SCALES];
+    uint8_t filter_window;
+    float filter_sigma;
+    uint8_t decimation;
+    uint16_t crc;
+};
+
+/// Slot holding the newest record, or -1 if none is valid.
+static int8_t newest_slot = -1;
+
+/// Sequence number of the newest record.
+static uint8_t newest_sequence = 0;
+
+/// Latest record passed to settings_save().
+static Settings queued;
+
+/// Record being written, and the next byte of it to write (-1 when idle).
+static Settings staged;
+static int16_t staged_pos = -1;
+
+/// A save is queued, and when it was last changed.
+static bool dirty = false;
+static uint32_t dirty_since = 0;
+
+/**
+ * @brief  Number of record-sized slots that fit in EEPROM.
+ * @param  size  Record size; version 1 records were smaller.
+ */
+static uint8_t slot_count(uint16_t size = sizeof(Settings)) {
+    uint16_t slots = EEPROM.length() / size;
+    return slots > SETTINGS_SLOTS_MAX ? SETTINGS_SLOTS_MAX : slots;
+}
+
+/**
+ * @brief  EEPROM address of one slot.
+ * @param  slot  Slot index.
+ * @param  size  Record size; version 1 records were smaller.
+ */
+static int slot_address(uint8_t slot, uint16_t size = sizeof(Settings)) {
+    return slot * size;
+}
+
+/**
+ * @brief  Check that the EEPROM can take a byte without blocking.
+ */
+static bool eeprom_idle() {
+#ifdef __AVR__
+    return eeprom_is_ready();
+#else
+    return true;
+#endif
+}
+
+/**
+ * @brief  CRC of a record of either version, excluding the crc field itself.
+ */
+template <typename Record>
+static uint16_t settings_crc(const Record& settings) {
+    return crc16_update(CRC16_INIT, reinterpret_cast<const uint8_t*>(&settings),
+                        offsetof(Record, crc));
+}
+
+/**
+ * @brief  Check the header, CRC and calibration factors of a record.
+ * @details Rejects factors that would make every reading NaN or infinite.
+ */
+template <typename Record>
+static bool record_valid(const Record& settings, uint8_t version) {
+    if (settings.magic != SETTINGS_MAGIC || settings.version != version ||
+        settings.crc != settings_crc(settings)) {
+        return false;
+    }
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        float factor = settings.scales[i].calibration_factor;
+        if (isnan(factor) || isinf(factor) || factor == 0.0f) {
+            return false;
+        }
+    }
+    return true;
+}
+
+/**
+ * @brief  Check a current record read from EEPROM, including its geometry.
+ */
+static bool settings_valid(const Settings& settings) {
+    return record_valid(settings, SETTINGS_VERSION) &&
+           geometry_extent(settings.geometry) > 0.0f &&
+           settings.cop_units <= COP_UNITS_MM;
+}
+
+/**
+ * @brief  Find the newest version 1 record and convert it.
+ * @param  settings  Receives the migrated record.
+ * @return false if no version 1 slot is valid.
+ */
+static bool settings_migrate_v1(Settings& settings) {
+    bool found = false;
+    uint8_t sequence = 0;
+    uint8_t slots = slot_count(sizeof(SettingsV1));
+    for (uint8_t slot = 0; slot < slots; slot++) {
+        SettingsV1 old;
+        EEPROM.get(slot_address(slot, sizeof(SettingsV1)), old);
+        if (!record_valid(old, 1)) {
+            continue;
+        }
+        if (!found || static_cast<int8_t>(old.sequence - sequence) > 0) {
+            settings_defaults(settings);
+            memcpy(settings.scales, old.scales, sizeof(settings.scales));
+            settings.filter_window = old.filter_window;
+            settings.filter_sigma = old.filter_sigma;
+            settings.decimation = old.decimation;
+            sequence = old.sequence;
+            found = true;
+        }
+    }
+    return found;
+}
+
+/**
+ * @brief  Fill a record with safe defaults.
+ * @param  settings  Record to fill.
+ */
+void settings_defaults(Settings& settings) {
+    memset(&settings, 0, sizeof(settings));
+    settings.magic = SETTINGS_MAGIC;
+    settings.version = SETTINGS_VERSION;
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        settings.scales[i].calibration_factor = 1.0f;
+        settings.scales[i].zero_factor = 0;
+    }
+    settings.filter_window = FILTER_WINDOW_DEFAULT;
+    settings.filter_sigma = FILTER_SIGMA_DEFAULT;
+    settings.decimation = 1;
+    geometry_rectangle(settings.geometry, GEOMETRY_SPACING_DEFAULT, GEOMETRY_SPACING_DEFAULT);
+    settings.cop_units = COP_UNITS_NORMALIZED;
+}
+
+/**
+ * @brief  Load the newest valid record from the EEPROM journal.
+ * @param  settings  Receives the record, or the defaults if no slot is valid.
+ * @return false if the defaults were used.
+ */
+bool settings_load(Settings& settings) {
+    newest_slot = -1;
+    uint8_t slots = slot_count();
+    for (uint8_t slot = 0; slot < slots; slot++) {
+        Settings candidate;
+        EEPROM.get(slot_address(slot), candidate);
+        if (!settings_valid(candidate)) {
+            continue;
+        }
+        // Sequence numbers wrap, so compare their difference.
+        if (newest_slot < 0 || static_cast<int8_t>(candidate.sequence - newest_sequence) > 0) {
+            settings = candidate;
+            newest_slot = slot;
+            newest_sequence = candidate.sequence;
+        }
+    }
+
+    if (newest_slot < 0) {
+        // The first save after a migration starts the new journal at slot 0.
+        if (settings_migrate_v1(settings)) {
+            return true;
+        }
+        settings_defaults(settings);
+        return false;
+    }
+    return true;
+}
+
+/**
+ * @brief  Queue a record to be saved.
+ * @param  settings  Record to store.
+ */
+void settings_save(const Settings& settings) {
+    queued = settings;
+    dirty = true;
+    dirty_since = millis();
+}
+
+/**
+ * @brief  Advance a queued save by at most one EEPROM byte.
+ * @param  may_write  True when a write cannot disturb streaming.
+ */
+void settings_service(bool may_write) {
+    uint8_t slots = slot_count();
+    if (!may_write || slots == 0 || !eeprom_idle()) {
+        return;
+    }
+
+    if (staged_pos < 0) {
+        if (!dirty || millis() - dirty_since < SETTINGS_HOLDOFF_MS) {
+            return;
+        }
+        // Snapshot the queued record; later changes queue another commit.
+        staged = queued;
+        staged.magic = SETTINGS_MAGIC;
+        staged.version = SETTINGS_VERSION;
+        staged.sequence = newest_sequence + 1;
+        staged.crc = settings_crc(staged);
+        staged_pos = 0;
+        dirty = false;
+    }
+
+    // The crc field is last, so the slot only validates once fully written.
+    uint8_t slot = (newest_slot + 1) % slots;
+    const uint8_t* bytes = reinterpret_cast<const uint8_t*>(&staged);
+    EEPROM.update(slot_address(slot) + staged_pos, bytes[staged_pos]);
+    if (++staged_pos < static_cast<int16_t>(sizeof(Settings))) {
+        return;
+    }
+
+    newest_slot = slot;
+    newest_sequence = staged.sequence;
+    staged_pos = -1;
+}
+
+/**
+ * @brief  Check whether a save is queued or being written.
+ */
+bool settings_pending() {
+    return dirty || staged_pos >= 0;
+}
@@ -0,0 +1,97 @@
+/**
+ * @file   settings.h
+ * @brief  Declaration of the versioned, CRC-protected settings record.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-23
+ */
+
+#ifndef SETTINGS_H
+#define SETTINGS_H
+
+#include <Arduino.h>
+#include "scale.h"
+#include "scale_reader.h"
+#include "geometry.h"
+
+/// Identifies a settings record in EEPROM.
+#define SETTINGS_MAGIC 0x5C0F
+
+/// Layout version; bump it whenever the Settings struct changes.
+#define SETTINGS_VERSION 2
+
+/// Most journal slots used; keeps the 8-bit sequence unambiguous.
+#define SETTINGS_SLOTS_MAX 64
+
+/// Quiet time after the last change before a save is committed, ms.
+#define SETTINGS_HOLDOFF_MS 2000
+
+/// CoP is streamed as a fraction of the half-spacing, in [-1, 1].
+#define COP_UNITS_NORMALIZED 0
+/// CoP is streamed in millimetres from the platform centre.
+#define COP_UNITS_MM 1
+
+/**
+ * @struct Settings
+ * @brief  Everything the controller persists, stored as one record.
+ *
+ * EEPROM is used as a journal of record-sized slots. Each save goes to the
+ * slot after the newest record, wrapping at the end, so wear is spread over
+ * the whole EEPROM and a power cut mid-write leaves the previous record
+ * intact.
+ *
+ * Version 2 added the platform geometry and CoP units; version 1 records
+ * are still read and migrated by settings_load().
+ */
+struct Settings {
+    uint16_t magic;                       ///< SETTINGS_MAGIC
+    uint8_t version;                      ///< SETTINGS_VERSION
+    uint8_t sequence;                     ///< Incremented on every save; newest wins
+    ScaleSettings scales[NUM_SCALES];     ///< Calibration of scales A-D
+    uint8_t filter_window;                ///< Outlier filter window, samples
+    float filter_sigma;                   ///< Outlier filter threshold, robust sigmas
+    uint8_t decimation;                   ///< Stream decimation factor
+    PlatformGeometry geometry;            ///< Load-cell positions, mm
+    uint8_t cop_units;                    ///< COP_UNITS_NORMALIZED or COP_UNITS_MM
+    uint16_t crc;                         ///< CRC-16 of every preceding byte
+};
+
+/**
+ * @brief  Fill a record with safe defaults (unit scale, zero offset, a
+ *         GEOMETRY_SPACING_DEFAULT square, normalized CoP).
+ * @param  settings  Record to fill.
+ */
+void settings_defaults(Settings& settings);
+
+/**
+ * @brief  Load the newest valid record from the EEPROM journal.
+ * @details If the journal holds no current record, the newest version 1
+ *          record is migrated, with the default geometry and units.
+ * @param  settings  Receives the record, or the defaults if no slot is valid.
+ * @return false if the defaults were used.
+ */
+bool settings_load(Settings& settings);
+
+/**
+ * @brief  Queue a record to be saved.
+ * @details Nothing is written yet. Changes made within SETTINGS_HOLDOFF_MS
+ *          of each other are coalesced into one commit by settings_service().
+ * @param  settings  Record to store.
+ */
+void settings_save(const Settings& settings);
+
+/**
+ * @brief  Advance a queued save by at most one EEPROM byte.
+ * @details Call every loop. A save is committed only while @p may_write is
+ *          true; it pauses, without losing its place, while it is false.
+ *          Bytes are written only when the EEPROM is ready, so this never
+ *          waits on the 3.3 ms write cycle. The CRC is written last.
+ * @param  may_write  True when a write cannot disturb streaming.
+ */
+void settings_service(bool may_write);
+
+/**
+ * @brief  Check whether a save is queued or being written.
+ */
+bool settings_pending();
+
+#endif // SETTINGS_H
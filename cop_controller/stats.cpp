@@ -0,0 +1,99 @@
+/**
+ * @file   stats.cpp
+ * @brief  Implementation of loop timing and health counters.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-30
+ */
+
+#include "stats.h"
+
+/**
+ * @brief  Record one duration.
+ * @param  us  Elapsed time in microseconds.
+ */
+void StageTimer::add(uint32_t us) {
+    if (count == 0 || us < shortest) {
+        shortest = us;
+    }
+    if (us > longest) {
+        longest = us;
+    }
+    total += us;
+    count++;
+}
+
+/**
+ * @brief  Forget every recorded duration.
+ */
+void StageTimer::reset() {
+    count = 0;
+    total = 0;
+    shortest = 0;
+    longest = 0;
+}
+
+/**
+ * @brief  Number of durations recorded.
+ */
+uint32_t StageTimer::get_count() const {
+    return count;
+}
+
+/**
+ * @brief  Shortest duration.
+ */
+uint32_t StageTimer::get_min() const {
+    return shortest;
+}
+
+/**
+ * @brief  Longest duration.
+ */
+uint32_t StageTimer::get_max() const {
+    return longest;
+}
+
+/**
+ * @brief  Rounded mean duration.
+ */
+uint32_t StageTimer::get_mean() const {
+    return count ? (total + count / 2) / count : 0;
+}
+
+/**
+ * @brief  Check one frame against the previous one.
+ * @param  seq        Frame sequence number.
+ * @param  timestamp  Frame timestamp in microseconds.
+ */
+void LateFrameCounter::update(uint16_t seq, uint32_t timestamp) {
+    bool consecutive = primed && static_cast<uint16_t>(seq - last_seq) == 1;
+    uint32_t gap = timestamp - last_timestamp;
+    primed = true;
+    last_seq = seq;
+    last_timestamp = timestamp;
+    if (!consecutive) {
+        return;
+    }
+
+    if (period == 0 || gap < period) {
+        period = gap;
+    } else if (gap > period + period / 2) {
+        late++;
+    }
+}
+
+/**
+ * @brief  Forget the period estimate and clear the count.
+ */
+void LateFrameCounter::reset() {
+    primed = false;
+    period = 0;
+    late = 0;
+}
+
+/**
+ * @brief  Number of late frames seen.
+ */
+uint32_t LateFrameCounter::get_late() const {
+    return late;
+}
@@ -0,0 +1,106 @@
+/**
+ * @file   stats.h
+ * @brief  Declaration of loop timing and health counters.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-10-30
+ */
+
+#ifndef STATS_H
+#define STATS_H
+
+#include <Arduino.h>
+
+/// Per-frame processing stages that are timed.
+enum Stage {
+    STAGE_ACQUIRE,   ///< Clocking a frame out of the modules (in the ISR)
+    STAGE_FILTER,    ///< Outlier filter on all four channels
+    STAGE_COP,       ///< Weight conversion, total and CoP
+    STAGE_OUTPUT,    ///< Writing the frame to Serial
+    STAGE_COUNT
+};
+
+/**
+ * @class StageTimer
+ * @brief Minimum, maximum and mean duration of one stage, in microseconds.
+ *
+ * The sum wraps after about 71 minutes of accumulated stage time; reset the
+ * timer before a long measurement.
+ */
+class StageTimer {
+public:
+    /**
+     * @brief Record one duration.
+     * @param us Elapsed time, from the difference of two micros() readings.
+     */
+    void add(uint32_t us);
+
+    /**
+     * @brief Forget every recorded duration.
+     */
+    void reset();
+
+    /**
+     * @brief Number of durations recorded.
+     */
+    uint32_t get_count() const;
+
+    /**
+     * @brief Shortest duration, or 0 if none was recorded.
+     */
+    uint32_t get_min() const;
+
+    /**
+     * @brief Longest duration.
+     */
+    uint32_t get_max() const;
+
+    /**
+     * @brief Rounded mean duration, or 0 if none was recorded.
+     */
+    uint32_t get_mean() const;
+
+private:
+    uint32_t count = 0;          ///< Durations recorded
+    uint32_t total = 0;          ///< Sum of the durations
+    uint32_t shortest = 0;       ///< Shortest duration
+    uint32_t longest = 0;        ///< Longest duration
+};
+
+/**
+ * @class LateFrameCounter
+ * @brief Counts conversions the acquisition ISR missed.
+ *
+ * An HX711 overwrites a conversion that is not read in time, so a missed one
+ * shows up only as a longer gap between two consecutive sequence numbers.
+ * The conversion period is taken as the shortest gap seen so far, and a gap
+ * of more than 1.5 periods counts as late. Frames dropped by a full buffer
+ * skip sequence numbers instead and are not counted here.
+ */
+class LateFrameCounter {
+public:
+    /**
+     * @brief Check one frame against the previous one.
+     * @param seq       Frame sequence number.
+     * @param timestamp Frame timestamp in microseconds.
+     */
+    void update(uint16_t seq, uint32_t timestamp);
+
+    /**
+     * @brief Forget the period estimate and clear the count.
+     */
+    void reset();
+
+    /**
+     * @brief Number of late frames seen.
+     */
+    uint32_t get_late() const;
+
+private:
+    bool primed = false;         ///< A previous frame has been seen
+    uint16_t last_seq = 0;       ///< Sequence number of the previous frame
+    uint32_t last_timestamp = 0; ///< Timestamp of the previous frame
+    uint32_t period = 0;         ///< Shortest consecutive gap, microseconds
+    uint32_t late = 0;           ///< Gaps longer than 1.5 periods
+};
+
+#endif // STATS_H
@@ -0,0 +1,193 @@
+/**
+ * @file   bench.cpp
+ * @brief  Host CPU cost of each stage of the firmware's per-frame path.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-14
+ *
+ * Calls the sketch's own functions on a fixed set of noisy frames and
+ * prints the cost of one call of each, in nanoseconds, as one JSON object:
+ *
+ *     {"variant": "float", "unit": "ns", "stages": {"filter_frame": 61.2, ...}}
+ *
+ * The numbers are for the host CPU, not the Nano; use them to compare two
+ * versions of the code, not to budget the loop. Each stage is timed in
+ * REPEATS runs of at least RUN_NS and the fastest run is kept, which
+ * filters out preemption. Serial runs at a very high baud rate so the
+ * print stages measure formatting rather than the virtual transmit time,
+ * and the data-ready interrupt is held off throughout.
+ *
+ * Built by "make bench" as build/<variant>/cop_bench; bench/firmware.py
+ * runs both variants.
+ */
+
+#include <chrono>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "Arduino.h"
+#include "acquisition.h"
+#include "coordinate.h"
+#include "crc16.h"
+#include "decimator.h"
+#include "geometry.h"
+#include "scale.h"
+#include "sim.h"
+
+/// Runs per stage; the fastest is reported.
+#define REPEATS 5
+
+/// Shortest run, ns.
+#define RUN_NS 20000000.0
+
+/// Distinct input frames, cycled through.
+#define FRAMES 256
+
+// Sketch functions and globals, defined in cop_controller.ino
+Coordinate calc_cop(weight_t wa, weight_t wb, weight_t wc, weight_t wd, weight_t total);
+void filter_frame(Frame& frame);
+void print_readings(const Frame& frame, const weight_t weights[NUM_SCALES]);
+void print_cop(const Frame& frame, const Coordinate& cop);
+void print_binary(const Frame& frame, const weight_t weights[NUM_SCALES], const Coordinate& cop);
+extern Scale SCALE_A, SCALE_B, SCALE_C, SCALE_D;
+extern CopSolver COP_SOLVER;
+extern Decimator DECIMATOR;
+
+// SCALES in the sketch is const, so it is not visible from here
+static Scale* const SCALES[NUM_SCALES] = {&SCALE_A, &SCALE_B, &SCALE_C, &SCALE_D};
+
+static Frame frames[FRAMES];
+static weight_t weights[FRAMES][NUM_SCALES];
+static uint8_t output[1 << 16];
+
+// Keeps results alive so the optimizer cannot drop the work.
+static volatile long sink;
+
+/**
+ * @brief  Noisy raw counts of someone standing off-centre, with spikes.
+ */
+static void make_frames() {
+    srand(1);
+    for (int f = 0; f < FRAMES; f++) {
+        frames[f].timestamp = 12500UL * f;
+        frames[f].seq = f;
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            long noise = rand() % 201 - 100;
+            long spike = (rand() % 50 == 0) ? 40000 : 0;
+            frames[f].raw[i] = 150000L + 20000L * i + noise + spike;
+            weights[f][i] = SCALES[i]->raw_to_weight(frames[f].raw[i]);
+        }
+    }
+}
+
+/**
+ * @brief  Discard the Serial output of the print stages.
+ */
+static void drain() {
+    while (cop_sim_read(output, sizeof output) == sizeof output) {
+    }
+}
+
+/**
+ * @brief  Time calls of @p stage and print "name": ns per call.
+ * @param  first  True for the first stage, which is not preceded by a comma.
+ */
+template <typename Stage>
+static void measure(const char* name, bool first, Stage stage) {
+    typedef std::chrono::steady_clock clock;
+    double best = 1e30;
+    long calls = 1024;
+    for (int r = 0; r < REPEATS; r++) {
+        double ns;
+        while (true) {
+            clock::time_point start = clock::now();
+            for (long n = 0; n < calls; n++) {
+                stage(n % FRAMES);
+            }
+            ns = std::chrono::duration<double, std::nano>(clock::now() - start).count();
+            drain();
+            if (ns >= RUN_NS) {
+                break;
+            }
+            calls *= 2;
+        }
+        if (ns / calls < best) {
+            best = ns / calls;
+        }
+    }
+    printf("%s\"%s\": %.2f", first ? "" : ", ", name, best);
+}
+
+int main() {
+    cop_sim_configure(SIM_RATE_DEFAULT, SIM_LOOP_US_DEFAULT, 0);
+    cop_sim_begin();
+    drain();
+    noInterrupts();
+    Serial.begin(4000000000UL);
+
+    // Stand-in calibration, so weights are of a realistic size
+    for (uint8_t i = 0; i < NUM_SCALES; i++) {
+        SCALES[i]->set_offset(100000L);
+        SCALES[i]->set_scale(1000.0f);
+    }
+    PlatformGeometry geometry;
+    geometry_rectangle(geometry, 400.0f, 400.0f);
+    COP_SOLVER.configure(geometry);
+    DECIMATOR.set_factor(4);
+    make_frames();
+
+    printf("{\"variant\": \"%s\", \"unit\": \"ns\", \"stages\": {", COP_FIXED_POINT ? "fixed" : "float");
+    measure("filter_frame", true, [](long f) {
+        Frame frame = frames[f];
+        filter_frame(frame);
+        sink = frame.raw[0];
+    });
+    measure("raw_to_weight", false, [](long f) {
+        weight_t w[NUM_SCALES];
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            w[i] = SCALES[i]->raw_to_weight(frames[f].raw[i]);
+        }
+        sink = (long)w[3];
+    });
+    measure("decimate", false, [](long f) {
+        Frame out;
+        sink = DECIMATOR.push(frames[f], out);
+    });
+    measure("calc_cop", false, [](long f) {
+        const weight_t* w = weights[f];
+        Coordinate cop = calc_cop(w[0], w[1], w[2], w[3], w[0] + w[1] + w[2] + w[3]);
+        sink = (long)cop.get_x();
+    });
+    measure("cop_solver", false, [](long f) {
+        weight_t total;
+        Coordinate cop = COP_SOLVER.solve(weights[f], total);
+        sink = (long)cop.get_y();
+    });
+    measure("crc16", false, [](long f) {
+        sink = crc16_update(0xFFFF, reinterpret_cast<const uint8_t*>(&frames[f]), sizeof(Frame));
+    });
+    measure("print_readings", false, [](long f) {
+        print_readings(frames[f], weights[f]);
+    });
+    measure("print_cop", false, [](long f) {
+        const weight_t* w = weights[f];
+        print_cop(frames[f], calc_cop(w[0], w[1], w[2], w[3], w[0] + w[1] + w[2] + w[3]));
+    });
+    measure("print_binary", false, [](long f) {
+        const weight_t* w = weights[f];
+        print_binary(frames[f], w, calc_cop(w[0], w[1], w[2], w[3], w[0] + w[1] + w[2] + w[3]));
+    });
+    // The whole path of one binary-streamed frame, as loop() runs it
+    measure("frame_binary", false, [](long f) {
+        Frame frame = frames[f];
+        filter_frame(frame);
+        weight_t w[NUM_SCALES];
+        weight_t total = 0;
+        for (uint8_t i = 0; i < NUM_SCALES; i++) {
+            w[i] = SCALES[i]->raw_to_weight(frame.raw[i]);
+            total += w[i];
+        }
+        print_binary(frame, w, calc_cop(w[0], w[1], w[2], w[3], total));
+    });
+    printf("}}\n");
+    return 0;
+}
@@ -0,0 +1,103 @@
+/**
+ * @file   hx711.cpp
+ * @brief  Implementation of the HX711 library stand-in, after bogde/HX711.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ */
+
+#include <HX711.h>
+
+void HX711::begin(byte dout, byte pd_sck, byte gain) {
+    PD_SCK = pd_sck;
+    DOUT = dout;
+    pinMode(PD_SCK, OUTPUT);
+    pinMode(DOUT, INPUT);
+    set_gain(gain);
+}
+
+bool HX711::is_ready() {
+    return digitalRead(DOUT) == LOW;
+}
+
+void HX711::set_gain(byte gain) {
+    switch (gain) {
+        case 128: GAIN = 1; break;
+        case 64:  GAIN = 3; break;
+        case 32:  GAIN = 2; break;
+    }
+}
+
+long HX711::read() {
+    wait_ready();
+
+    uint32_t value = 0;
+    for (uint8_t i = 0; i < 24; i++) {
+        digitalWrite(PD_SCK, HIGH);
+        delayMicroseconds(1);
+        value = (value << 1) | (digitalRead(DOUT) == HIGH ? 1 : 0);
+        digitalWrite(PD_SCK, LOW);
+        delayMicroseconds(1);
+    }
+    for (uint8_t i = 0; i < GAIN; i++) {
+        digitalWrite(PD_SCK, HIGH);
+        delayMicroseconds(1);
+        digitalWrite(PD_SCK, LOW);
+        delayMicroseconds(1);
+    }
+
+    if (value & 0x800000UL) {
+        value |= 0xFF000000UL;
+    }
+    return static_cast<int32_t>(value);
+}
+
+void HX711::wait_ready(unsigned long delay_ms) {
+    while (!is_ready()) {
+        delay(delay_ms);
+    }
+}
+
+long HX711::read_average(byte times) {
+    long sum = 0;
+    for (byte i = 0; i < times; i++) {
+        sum += read();
+    }
+    return sum / times;
+}
+
+double HX711::get_value(byte times) {
+    return read_average(times) - OFFSET;
+}
+
+float HX711::get_units(byte times) {
+    return get_value(times) / SCALE;
+}
+
+void HX711::tare(byte times) {
+    set_offset(read_average(times));
+}
+
+void HX711::set_scale(float scale) {
+    SCALE = scale;
+}
+
+float HX711::get_scale() {
+    return SCALE;
+}
+
+void HX711::set_offset(long offset) {
+    OFFSET = offset;
+}
+
+long HX711::get_offset() {
+    return OFFSET;
+}
+
+void HX711::power_down() {
+    digitalWrite(PD_SCK, LOW);
+    digitalWrite(PD_SCK, HIGH);
+}
+
+void HX711::power_up() {
+    digitalWrite(PD_SCK, LOW);
+}
@@ -0,0 +1,130 @@
+/**
+ * @file   Arduino.h
+ * @brief  Host stand-in for the Arduino core used by the sketch.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ *
+ * Declares only what the controller uses. Time is virtual and advanced by
+ * the simulator (see sim.h), digital pins are wired to the simulated HX711
+ * modules, and Serial is a pair of byte queues. millis() and micros()
+ * return 32-bit values so they wrap exactly as on the Nano.
+ */
+
+#ifndef ARDUINO_H
+#define ARDUINO_H
+
+#include <math.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <type_traits>
+
+typedef uint8_t byte;
+typedef bool boolean;
+
+#define HIGH 0x1
+#define LOW  0x0
+
+#define INPUT        0x0
+#define OUTPUT       0x1
+#define INPUT_PULLUP 0x2
+
+#define DEC 10
+#define HEX 16
+
+#define bit(b) (1UL << (b))
+
+// The AVR core defines these as macros; templates give the same results
+// without clashing with the C++ standard library.
+template <typename T, typename L, typename H>
+inline typename std::common_type<T, L, H>::type constrain(T amt, L low, H high) {
+    return amt < low ? low : (amt > high ? high : amt);
+}
+template <typename A, typename B>
+inline typename std::common_type<A, B>::type min(A a, B b) {
+    return a < b ? a : b;
+}
+template <typename A, typename B>
+inline typename std::common_type<A, B>::type max(A a, B b) {
+    return a > b ? a : b;
+}
+
+void pinMode(uint8_t pin, uint8_t mode);
+void digitalWrite(uint8_t pin, uint8_t value);
+int digitalRead(uint8_t pin);
+
+uint32_t millis();
+uint32_t micros();
+void delay(unsigned long ms);
+void delayMicroseconds(unsigned int us);
+
+// The simulator delivers the data-ready pin-change interrupt (see sim.h).
+void noInterrupts();
+void interrupts();
+
+class __FlashStringHelper;
+#define F(s) (reinterpret_cast<const __FlashStringHelper*>(s))
+#define PROGMEM
+#define pgm_read_byte(p) (*reinterpret_cast<const uint8_t*>(p))
+#define pgm_read_word(p) (*reinterpret_cast<const uint16_t*>(p))
+
+/**
+ * @class Print
+ * @brief Number and text formatting, matching the Arduino core byte for byte.
+ */
+class Print {
+public:
+    virtual ~Print() {}
+    virtual size_t write(uint8_t b) = 0;
+    size_t write(const uint8_t* buffer, size_t size);
+    size_t write(const char* str);
+
+    size_t print(const __FlashStringHelper* str);
+    size_t print(const char* str);
+    size_t print(char c);
+    size_t print(unsigned char n, int base = DEC);
+    size_t print(int n, int base = DEC);
+    size_t print(unsigned int n, int base = DEC);
+    size_t print(long n, int base = DEC);
+    size_t print(unsigned long n, int base = DEC);
+    size_t print(double n, int digits = 2);
+
+    size_t println();
+    template <typename T>
+    size_t println(T value) {
+        size_t n = print(value);
+        return n + println();
+    }
+    template <typename T>
+    size_t println(T value, int format) {
+        size_t n = print(value, format);
+        return n + println();
+    }
+
+private:
+    size_t print_number(unsigned long n, uint8_t base);
+    size_t print_float(float number, uint8_t digits);
+};
+
+/**
+ * @class HardwareSerial
+ * @brief Serial port backed by the simulator's receive and transmit queues.
+ */
+class HardwareSerial : public Print {
+public:
+    void begin(unsigned long baud);
+    void end() {}
+    int available();
+    int peek();
+    int read();
+    int availableForWrite();
+    void flush() {}
+    size_t write(uint8_t b) override;
+    using Print::write;
+    operator bool() { return true; }
+};
+
+extern HardwareSerial Serial;
+
+#endif // ARDUINO_H
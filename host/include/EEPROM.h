@@ -0,0 +1,53 @@
+/**
+ * @file   EEPROM.h
+ * @brief  Host stand-in for the Arduino EEPROM library.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ *
+ * 1 KB like the ATmega328P, erased to 0xFF. The simulator can load and
+ * save the image so settings persist between runs.
+ */
+
+#ifndef EEPROM_H
+#define EEPROM_H
+
+#include <Arduino.h>
+
+/// EEPROM size of the ATmega328P.
+#define EEPROM_SIZE 1024
+
+/**
+ * @struct EEPROMClass
+ * @brief  Byte array with the read/write/update/get/put interface of the library.
+ */
+struct EEPROMClass {
+    uint8_t data[EEPROM_SIZE];   ///< Current contents
+    uint32_t writes = 0;         ///< Bytes actually changed by write() or update()
+
+    uint8_t read(int address) { return data[address]; }
+    void write(int address, uint8_t value) { data[address] = value; writes++; }
+    void update(int address, uint8_t value) {
+        if (data[address] != value) {
+            write(address, value);
+        }
+    }
+    uint16_t length() { return EEPROM_SIZE; }
+
+    template <typename T>
+    T& get(int address, T& value) {
+        memcpy(&value, &data[address], sizeof(T));
+        return value;
+    }
+    template <typename T>
+    const T& put(int address, const T& value) {
+        const uint8_t* bytes = reinterpret_cast<const uint8_t*>(&value);
+        for (size_t i = 0; i < sizeof(T); i++) {
+            update(address + i, bytes[i]);
+        }
+        return value;
+    }
+};
+
+extern EEPROMClass EEPROM;
+
+#endif // EEPROM_H
@@ -0,0 +1,43 @@
+/**
+ * @file   HX711.h
+ * @brief  Host stand-in for the HX711 library's base class.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ *
+ * Same interface as the bogde/HX711 library. Reads go through digitalRead()
+ * and digitalWrite(), so they talk to the simulated modules bit by bit just
+ * like the ScaleReader burst does.
+ */
+
+#ifndef HX711_H
+#define HX711_H
+
+#include <Arduino.h>
+
+class HX711 {
+public:
+    void begin(byte dout, byte pd_sck, byte gain = 128);
+    bool is_ready();
+    void set_gain(byte gain = 128);
+    long read();
+    void wait_ready(unsigned long delay_ms = 0);
+    long read_average(byte times = 10);
+    double get_value(byte times = 1);
+    float get_units(byte times = 1);
+    void tare(byte times = 10);
+    void set_scale(float scale = 1.f);
+    float get_scale();
+    void set_offset(long offset = 0);
+    long get_offset();
+    void power_down();
+    void power_up();
+
+private:
+    byte PD_SCK = 0;
+    byte DOUT = 0;
+    byte GAIN = 1;
+    long OFFSET = 0;
+    float SCALE = 1;
+};
+
+#endif // HX711_H
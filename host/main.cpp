@@ -0,0 +1,287 @@
+/**
+ * @file   main.cpp
+ * @brief  Command-line runner for the host build of the controller.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ *
+ * Runs the sketch in virtual time with raw counts replayed from a file or
+ * held constant, sends timed commands from a script, and writes everything
+ * the sketch sends on Serial to stdout:
+ *
+ *     cop_host --counts session.txt --script commands.txt > out.bin
+ *
+ * A counts file has one conversion per line, the four raw counts separated
+ * by spaces or commas; '#' starts a comment. A script has one command per
+ * line, prefixed by the virtual time in ms at which to send it, e.g.
+ * "1000 a" or "5000 d 4".
+ */
+
+#include <chrono>
+#include <random>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <string>
+#include <vector>
+#include "sim.h"
+
+/// Virtual time run between checks for script commands and output, us.
+#define CHUNK_US 10000
+
+/**
+ * @struct Options
+ * @brief  Command-line settings.
+ */
+struct Options {
+    const char* counts_path = nullptr;
+    const char* script_path = nullptr;
+    const char* eeprom_path = nullptr;
+    bool loop_counts = false;
+    int32_t load[SIM_MODULES] = {0, 0, 0, 0};
+    double noise = 0;
+    double rate = SIM_RATE_DEFAULT;
+    uint32_t loop_us = SIM_LOOP_US_DEFAULT;
+    uint64_t start_us = 0;
+    double duration_ms = -1;
+    bool bench = false;
+};
+
+/**
+ * @struct Command
+ * @brief  One script line.
+ */
+struct Command {
+    double at_ms;
+    std::string text;
+};
+
+static void usage() {
+    fprintf(stderr,
+            "usage: cop_host [options]\n"
+            "  --counts FILE     replay raw counts, one conversion per line\n"
+            "  --loop            restart the counts file when it ends\n"
+            "  --load A,B,C,D    counts when no file is given (default 0,0,0,0)\n"
+            "  --noise SD        add Gaussian noise to every count\n"
+            "  --script FILE     timed commands, \"<ms> <command>\" per line; - for stdin\n"
+            "  --duration MS     virtual time to run (default: 1 s after the last command)\n"
+            "  --eeprom FILE     load and save the EEPROM image\n"
+            "  --rate SPS        HX711 conversion rate (default 80)\n"
+            "  --loop-us US      virtual time per loop() call (default 20)\n"
+            "  --start-us US     clock at power-up, e.g. 4290000000 to test the micros() wrap\n"
+            "  --bench           report host time and counters on stderr\n");
+}
+
+static bool parse_args(int argc, char** argv, Options& options) {
+    for (int i = 1; i < argc; i++) {
+        std::string arg = argv[i];
+        const char* value = (i + 1 < argc) ? argv[i + 1] : nullptr;
+        if (arg == "--loop") {
+            options.loop_counts = true;
+        } else if (arg == "--bench") {
+            options.bench = true;
+        } else if (!value) {
+            return false;
+        } else {
+            i++;
+            if (arg == "--counts") {
+                options.counts_path = value;
+            } else if (arg == "--script") {
+                options.script_path = value;
+            } else if (arg == "--eeprom") {
+                options.eeprom_path = value;
+            } else if (arg == "--load") {
+                long a, b, c, d;
+                if (sscanf(value, "%ld,%ld,%ld,%ld", &a, &b, &c, &d) != 4) {
+                    return false;
+                }
+                int32_t load[SIM_MODULES] = {(int32_t)a, (int32_t)b, (int32_t)c, (int32_t)d};
+                memcpy(options.load, load, sizeof(load));
+            } else if (arg == "--noise") {
+                options.noise = atof(value);
+            } else if (arg == "--duration") {
+                options.duration_ms = atof(value);
+            } else if (arg == "--rate") {
+                options.rate = atof(value);
+            } else if (arg == "--loop-us") {
+                options.loop_us = strtoul(value, nullptr, 10);
+            } else if (arg == "--start-us") {
+                options.start_us = strtoull(value, nullptr, 10);
+            } else {
+                return false;
+            }
+        }
+    }
+    return options.rate > 0;
+}
+
+/**
+ * @brief  Read a counts file; every non-comment line must hold four integers.
+ */
+static bool read_counts(const char* path, std::vector<std::vector<int32_t>>& rows) {
+    FILE* f = fopen(path, "r");
+    if (!f) {
+        perror(path);
+        return false;
+    }
+    char line[256];
+    int number = 0;
+    while (fgets(line, sizeof(line), f)) {
+        number++;
+        char* hash = strchr(line, '#');
+        if (hash) {
+            *hash = '\0';
+        }
+        for (char* p = line; *p; p++) {
+            if (*p == ',') *p = ' ';
+        }
+        long a, b, c, d;
+        int n = sscanf(line, "%ld %ld %ld %ld", &a, &b, &c, &d);
+        if (n == 4) {
+            rows.push_back({(int32_t)a, (int32_t)b, (int32_t)c, (int32_t)d});
+        } else if (n > 0) {
+            fprintf(stderr, "%s:%d: expected four counts\n", path, number);
+            fclose(f);
+            return false;
+        }
+    }
+    fclose(f);
+    return true;
+}
+
+/**
+ * @brief  Read a script of "<ms> <command>" lines.
+ */
+static bool read_script(const char* path, std::vector<Command>& commands) {
+    FILE* f = strcmp(path, "-") == 0 ? stdin : fopen(path, "r");
+    if (!f) {
+        perror(path);
+        return false;
+    }
+    char line[256];
+    while (fgets(line, sizeof(line), f)) {
+        char* end;
+        double at = strtod(line, &end);
+        if (end == line) {
+            continue;
+        }
+        while (*end == ' ' || *end == '\t') end++;
+        std::string text = end;
+        while (!text.empty() && (text.back() == '\n' || text.back() == '\r')) text.pop_back();
+        commands.push_back({at, text});
+    }
+    if (f != stdin) {
+        fclose(f);
+    }
+    return true;
+}
+
+/**
+ * @brief  Copy everything the sketch sent to stdout.
+ */
+static void drain_output() {
+    uint8_t buffer[4096];
+    size_t n;
+    while ((n = cop_sim_read(buffer, sizeof(buffer))) > 0) {
+        fwrite(buffer, 1, n, stdout);
+    }
+    fflush(stdout);
+}
+
+int main(int argc, char** argv) {
+    Options options;
+    if (!parse_args(argc, argv, options)) {
+        usage();
+        return 2;
+    }
+
+    std::vector<std::vector<int32_t>> rows;
+    std::vector<Command> commands;
+    if (options.counts_path && !read_counts(options.counts_path, rows)) {
+        return 1;
+    }
+    if (options.script_path && !read_script(options.script_path, commands)) {
+        return 1;
+    }
+    double duration_ms = options.duration_ms;
+    if (duration_ms < 0) {
+        duration_ms = commands.empty() ? 10000 : commands.back().at_ms + 1000;
+    }
+
+    if (options.eeprom_path) {
+        FILE* f = fopen(options.eeprom_path, "rb");
+        if (f) {
+            fread(cop_sim_eeprom(), 1, 1024, f);
+            fclose(f);
+        }
+    }
+
+    // Keep enough conversions queued for the next chunk, plus some slack.
+    std::mt19937 rng(1);
+    std::normal_distribution<double> noise(0.0, options.noise > 0 ? options.noise : 1.0);
+    size_t next_row = 0;
+    size_t wanted = 16 + static_cast<size_t>(options.rate * CHUNK_US / 1e6);
+    auto top_up = [&]() {
+        while (cop_sim_queued_counts() < wanted) {
+            const int32_t* base = options.load;
+            if (!rows.empty()) {
+                if (next_row == rows.size()) {
+                    if (!options.loop_counts) {
+                        return;
+                    }
+                    next_row = 0;
+                }
+                base = rows[next_row++].data();
+            } else if (options.noise <= 0) {
+                // Constant counts repeat on their own.
+                int32_t counts[SIM_MODULES];
+                memcpy(counts, base, sizeof(counts));
+                if (cop_sim_conversions() == 0 && cop_sim_queued_counts() == 0) {
+                    cop_sim_push_counts(counts);
+                }
+                return;
+            }
+            int32_t counts[SIM_MODULES];
+            for (uint8_t i = 0; i < SIM_MODULES; i++) {
+                counts[i] = base[i] + (options.noise > 0 ? lround(noise(rng)) : 0);
+            }
+            cop_sim_push_counts(counts);
+        }
+    };
+
+    auto started = std::chrono::steady_clock::now();
+    cop_sim_configure(options.rate, options.loop_us, options.start_us);
+    top_up();
+    cop_sim_begin();
+    drain_output();
+
+    uint64_t end_us = options.start_us + static_cast<uint64_t>(duration_ms * 1000);
+    size_t next_command = 0;
+    while (cop_sim_now_us() < end_us) {
+        uint64_t elapsed_us = cop_sim_now_us() - options.start_us;
+        while (next_command < commands.size() && commands[next_command].at_ms * 1000 <= elapsed_us) {
+            std::string line = commands[next_command++].text + "\n";
+            cop_sim_write(reinterpret_cast<const uint8_t*>(line.data()), line.size());
+        }
+        top_up();
+        uint64_t remaining = end_us - cop_sim_now_us();
+        cop_sim_run(remaining < CHUNK_US ? remaining : CHUNK_US);
+        drain_output();
+    }
+
+    if (options.eeprom_path) {
+        FILE* f = fopen(options.eeprom_path, "wb");
+        if (!f || fwrite(cop_sim_eeprom(), 1, 1024, f) != 1024) {
+            perror(options.eeprom_path);
+            return 1;
+        }
+        fclose(f);
+    }
+
+    if (options.bench) {
+        double host_s = std::chrono::duration<double>(std::chrono::steady_clock::now() - started).count();
+        fprintf(stderr, "virtual %.3f s in %.3f s host (%.0fx), conversions %u, missed %u, "
+                "eeprom writes %u\n", duration_ms / 1000, host_s, duration_ms / 1000 / host_s,
+                cop_sim_conversions(), cop_sim_missed(), cop_sim_eeprom_writes());
+    }
+    return 0;
+}
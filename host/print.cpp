@@ -0,0 +1,124 @@
+/**
+ * @file   print.cpp
+ * @brief  Implementation of the Print formatting, after the Arduino AVR core.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ *
+ * Streams are compared byte for byte against a real controller, so numbers
+ * are formatted exactly as Print.cpp does it, including float rounding in
+ * single precision (double is float on AVR) and "\r\n" line ends.
+ */
+
+#include <Arduino.h>
+
+size_t Print::write(const uint8_t* buffer, size_t size) {
+    size_t n = 0;
+    while (size--) {
+        n += write(*buffer++);
+    }
+    return n;
+}
+
+size_t Print::write(const char* str) {
+    return str ? write(reinterpret_cast<const uint8_t*>(str), strlen(str)) : 0;
+}
+
+size_t Print::print(const __FlashStringHelper* str) {
+    return write(reinterpret_cast<const char*>(str));
+}
+
+size_t Print::print(const char* str) {
+    return write(str);
+}
+
+size_t Print::print(char c) {
+    return write(static_cast<uint8_t>(c));
+}
+
+size_t Print::print(unsigned char n, int base) {
+    return print(static_cast<unsigned long>(n), base);
+}
+
+size_t Print::print(int n, int base) {
+    return print(static_cast<long>(n), base);
+}
+
+size_t Print::print(unsigned int n, int base) {
+    return print(static_cast<unsigned long>(n), base);
+}
+
+size_t Print::print(long n, int base) {
+    if (base == 0) {
+        return write(static_cast<uint8_t>(n));
+    }
+    if (base == 10 && n < 0) {
+        size_t t = print('-');
+        return t + print_number(-static_cast<unsigned long>(n), 10);
+    }
+    return print_number(n, base);
+}
+
+size_t Print::print(unsigned long n, int base) {
+    if (base == 0) {
+        return write(static_cast<uint8_t>(n));
+    }
+    return print_number(n, base);
+}
+
+size_t Print::print(double n, int digits) {
+    return print_float(n, digits);
+}
+
+size_t Print::println() {
+    return write("\r\n");
+}
+
+size_t Print::print_number(unsigned long n, uint8_t base) {
+    char buf[8 * sizeof(long) + 1];
+    char* str = &buf[sizeof(buf) - 1];
+    *str = '\0';
+    if (base < 2) {
+        base = 10;
+    }
+    do {
+        char c = n % base;
+        n /= base;
+        *--str = c < 10 ? c + '0' : c + 'A' - 10;
+    } while (n);
+    return write(str);
+}
+
+size_t Print::print_float(float number, uint8_t digits) {
+    if (isnan(number)) return print("nan");
+    if (isinf(number)) return print("inf");
+    if (number > 4294967040.0f) return print("ovf");
+    if (number < -4294967040.0f) return print("ovf");
+
+    size_t n = 0;
+    if (number < 0.0f) {
+        n += print('-');
+        number = -number;
+    }
+
+    float rounding = 0.5f;
+    for (uint8_t i = 0; i < digits; ++i) {
+        rounding /= 10.0f;
+    }
+    number += rounding;
+
+    // unsigned long is 32 bits on AVR
+    uint32_t int_part = static_cast<uint32_t>(number);
+    float remainder = number - static_cast<float>(int_part);
+    n += print(static_cast<unsigned long>(int_part));
+
+    if (digits > 0) {
+        n += print('.');
+    }
+    while (digits-- > 0) {
+        remainder *= 10.0f;
+        unsigned int to_print = static_cast<unsigned int>(remainder);
+        n += print(to_print);
+        remainder -= to_print;
+    }
+    return n;
+}
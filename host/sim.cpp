@@ -0,0 +1,321 @@
+/**
+ * @file   sim.cpp
+ * @brief  Implementation of the virtual clock, HX711 modules, Serial and EEPROM.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ */
+
+#include <deque>
+#include <vector>
+#include <Arduino.h>
+#include <EEPROM.h>
+#include "sim.h"
+#include "acquisition.h"
+
+void setup();
+void loop();
+
+HardwareSerial Serial;
+EEPROMClass EEPROM;
+
+/**
+ * @struct Module
+ * @brief  One simulated HX711: a latched conversion and its shift state.
+ */
+struct Module {
+    int32_t data = 0;       ///< Latched 24-bit count
+    bool ready = false;     ///< Conversion waiting; DOUT is low
+    uint8_t pulses = 0;     ///< SCK pulses of the read in progress
+    uint8_t dout = HIGH;    ///< Level on DOUT while shifting
+};
+
+/**
+ * @struct Sim
+ * @brief  Whole simulator state.
+ */
+struct Sim {
+    uint64_t now = 0;                           ///< Virtual clock, us
+    double period = 1e6 / SIM_RATE_DEFAULT;     ///< Conversion period, us
+    double next_conversion = 0;                 ///< Time of the next conversion, us
+    uint32_t loop_us = SIM_LOOP_US_DEFAULT;     ///< Clock step per loop() call
+    uint32_t conversions = 0;
+    uint32_t missed = 0;
+
+    Module modules[SIM_MODULES];
+    std::deque<std::vector<int32_t>> counts;    ///< Queued conversions
+    int32_t last[SIM_MODULES] = {0};            ///< Counts repeated when the queue is empty
+    uint8_t clk = LOW;
+
+    bool interrupt_armed = false;               ///< Set once setup() has returned
+    bool interrupts_enabled = true;             ///< Cleared by noInterrupts()
+    bool interrupt_pending = false;             ///< A conversion is waiting for the ISR
+    bool in_interrupt = false;                  ///< The ISR is running
+
+    std::deque<uint8_t> rx;                     ///< Bytes for Serial.read()
+    std::vector<uint8_t> tx;                    ///< Bytes from Serial.write()
+    double byte_us = 0;                         ///< Transmit time per byte; 0 before begin()
+    double tx_done = 0;                         ///< When the transmit buffer drains, us
+};
+
+static Sim sim;
+
+/**
+ * @brief  Erase the EEPROM image before anything can load it.
+ */
+static struct EraseEeprom {
+    EraseEeprom() { memset(EEPROM.data, 0xFF, sizeof(EEPROM.data)); }
+} erase_eeprom;
+
+/**
+ * @brief  Make every conversion that is due by now.
+ * @details A module in the middle of being clocked out keeps its data, and
+ *          one that was never read has its data overwritten.
+ */
+static void update_modules() {
+    while (sim.now >= sim.next_conversion) {
+        if (!sim.counts.empty()) {
+            for (uint8_t i = 0; i < SIM_MODULES; i++) {
+                sim.last[i] = sim.counts.front()[i];
+            }
+            sim.counts.pop_front();
+        }
+        bool overwritten = false;
+        for (uint8_t i = 0; i < SIM_MODULES; i++) {
+            Module& module = sim.modules[i];
+            if (module.pulses > 0) {
+                continue;
+            }
+            overwritten |= module.ready;
+            module.data = sim.last[i];
+            module.ready = true;
+        }
+        sim.missed += overwritten;
+        sim.conversions++;
+        sim.interrupt_pending = true;
+        sim.next_conversion += sim.period;
+    }
+}
+
+/**
+ * @brief  Run the data-ready interrupt handler if it is due and allowed.
+ */
+static void deliver_interrupt() {
+    if (!sim.interrupt_armed || !sim.interrupts_enabled || sim.in_interrupt ||
+        !sim.interrupt_pending) {
+        return;
+    }
+    sim.interrupt_pending = false;
+    sim.in_interrupt = true;
+    ACQUISITION.service();
+    sim.in_interrupt = false;
+}
+
+/**
+ * @brief  Advance the clock, making any conversions that fall due.
+ */
+static void advance(double us) {
+    sim.now += static_cast<uint64_t>(us + 0.5);
+    update_modules();
+    deliver_interrupt();
+}
+
+void noInterrupts() {
+    sim.interrupts_enabled = false;
+}
+
+void interrupts() {
+    sim.interrupts_enabled = true;
+    deliver_interrupt();
+}
+
+/**
+ * @brief  Index of the module on a DOUT pin, or -1.
+ */
+static int module_on(uint8_t pin) {
+    int index = pin - SIM_DOUT_PIN_A;
+    return (index >= 0 && index < SIM_MODULES) ? index : -1;
+}
+
+void pinMode(uint8_t, uint8_t) {}
+
+/**
+ * @brief  Drive a pin; a rising SCK edge shifts every module by one bit.
+ * @details The 25th edge ends the read and DOUT goes high until the next
+ *          conversion; further gain-select edges are ignored.
+ */
+void digitalWrite(uint8_t pin, uint8_t value) {
+    if (pin != SIM_CLK_PIN) {
+        return;
+    }
+    bool rising = (value == HIGH && sim.clk == LOW);
+    sim.clk = value;
+    if (!rising) {
+        return;
+    }
+    for (uint8_t i = 0; i < SIM_MODULES; i++) {
+        Module& module = sim.modules[i];
+        if (!module.ready) {
+            continue;
+        }
+        module.pulses++;
+        if (module.pulses <= 24) {
+            module.dout = (module.data >> (24 - module.pulses)) & 1;
+        } else {
+            module.ready = false;
+            module.pulses = 0;
+        }
+    }
+}
+
+/**
+ * @brief  Read a pin; DOUT is low while a conversion waits, then the data bits.
+ */
+int digitalRead(uint8_t pin) {
+    int index = module_on(pin);
+    if (index < 0) {
+        return LOW;
+    }
+    update_modules();
+    const Module& module = sim.modules[index];
+    if (module.pulses > 0) {
+        return module.dout;
+    }
+    return module.ready ? LOW : HIGH;
+}
+
+uint32_t micros() {
+    return static_cast<uint32_t>(sim.now);
+}
+
+uint32_t millis() {
+    return static_cast<uint32_t>(sim.now / 1000);
+}
+
+/**
+ * @brief  Wait in virtual time; delay(0) still takes a microsecond so
+ *         polling loops make progress.
+ */
+void delay(unsigned long ms) {
+    advance(ms > 0 ? ms * 1000.0 : 1.0);
+}
+
+void delayMicroseconds(unsigned int us) {
+    advance(us);
+}
+
+void HardwareSerial::begin(unsigned long baud) {
+    // 8N1: ten bit times per byte
+    sim.byte_us = 10e6 / baud;
+    sim.tx_done = sim.now;
+}
+
+int HardwareSerial::available() {
+    return sim.rx.size();
+}
+
+int HardwareSerial::peek() {
+    return sim.rx.empty() ? -1 : sim.rx.front();
+}
+
+int HardwareSerial::read() {
+    if (sim.rx.empty()) {
+        return -1;
+    }
+    uint8_t c = sim.rx.front();
+    sim.rx.pop_front();
+    return c;
+}
+
+int HardwareSerial::availableForWrite() {
+    if (sim.byte_us <= 0) {
+        return SIM_TX_BUFFER;
+    }
+    double queued = (sim.tx_done - sim.now) / sim.byte_us;
+    return queued <= 0 ? SIM_TX_BUFFER : SIM_TX_BUFFER - static_cast<int>(queued);
+}
+
+/**
+ * @brief  Queue one byte, waiting in virtual time while the buffer is full.
+ */
+size_t HardwareSerial::write(uint8_t b) {
+    if (sim.byte_us > 0) {
+        double start = sim.tx_done > sim.now ? sim.tx_done : sim.now;
+        double wait = start - SIM_TX_BUFFER * sim.byte_us - sim.now;
+        if (wait > 0) {
+            advance(wait);
+        }
+        sim.tx_done = start + sim.byte_us;
+    }
+    sim.tx.push_back(b);
+    return 1;
+}
+
+extern "C" {
+
+void cop_sim_configure(float rate_sps, uint32_t loop_us, uint64_t start_us) {
+    sim.period = 1e6 / rate_sps;
+    sim.loop_us = loop_us > 0 ? loop_us : 1;
+    sim.now = start_us;
+    sim.next_conversion = start_us + sim.period;
+}
+
+void cop_sim_begin() {
+    if (sim.next_conversion == 0) {
+        sim.next_conversion = sim.now + sim.period;
+    }
+    setup();
+    sim.interrupt_armed = true;
+}
+
+void cop_sim_run(uint32_t us) {
+    uint64_t end = sim.now + us;
+    while (sim.now < end) {
+        loop();
+        advance(sim.loop_us);
+    }
+}
+
+void cop_sim_write(const uint8_t* data, size_t len) {
+    sim.rx.insert(sim.rx.end(), data, data + len);
+}
+
+size_t cop_sim_read(uint8_t* buffer, size_t len) {
+    size_t n = len < sim.tx.size() ? len : sim.tx.size();
+    memcpy(buffer, sim.tx.data(), n);
+    sim.tx.erase(sim.tx.begin(), sim.tx.begin() + n);
+    return n;
+}
+
+void cop_sim_push_counts(const int32_t counts[SIM_MODULES]) {
+    std::vector<int32_t> conversion(SIM_MODULES);
+    for (uint8_t i = 0; i < SIM_MODULES; i++) {
+        conversion[i] = constrain(counts[i], -8388608L, 8388607L);
+    }
+    sim.counts.push_back(conversion);
+}
+
+size_t cop_sim_queued_counts() {
+    return sim.counts.size();
+}
+
+uint64_t cop_sim_now_us() {
+    return sim.now;
+}
+
+uint32_t cop_sim_conversions() {
+    return sim.conversions;
+}
+
+uint32_t cop_sim_missed() {
+    return sim.missed;
+}
+
+uint8_t* cop_sim_eeprom() {
+    return EEPROM.data;
+}
+
+uint32_t cop_sim_eeprom_writes() {
+    return EEPROM.writes;
+}
+
+}  // extern "C"
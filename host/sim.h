@@ -0,0 +1,127 @@
+/**
+ * @file   sim.h
+ * @brief  Declaration of the host simulator that runs the sketch in virtual time.
+ * @author rickwgarcia@unm.edu
+ * @date   2025-11-13
+ *
+ * The simulator owns the virtual clock, the four HX711 modules on the
+ * sketch's pins, the Serial queues and the EEPROM image. Each module
+ * converts at a fixed rate and shifts its count out bit by bit on the SCK
+ * edges the firmware drives, so ScaleReader runs its real non-AVR path.
+ *
+ * Code between loop() calls takes no virtual time: the clock advances by a
+ * fixed step per loop() call, by delay() and delayMicroseconds(), and while
+ * Serial waits for room in its 64-byte transmit buffer at the configured baud
+ * rate. Stage timers therefore show serial stalls but not CPU time.
+ *
+ * When the modules finish a conversion the simulator calls
+ * ACQUISITION.service(), as the pin-change interrupt does on the Nano, unless
+ * interrupts are disabled; then it is delivered by interrupts(). The
+ * interrupt is enabled once setup() has returned.
+ *
+ * The C functions below are the interface used by the command-line runner
+ * (main.cpp) and by cop_client/firmware.py through ctypes.
+ */
+
+#ifndef SIM_H
+#define SIM_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+/// Pins of the sketch: shared SCK and the DOUT of modules A-D.
+#define SIM_CLK_PIN 6
+#define SIM_DOUT_PIN_A 7
+
+/// Modules on the platform.
+#define SIM_MODULES 4
+
+/// HX711 conversion rate with RATE tied high, samples per second.
+#define SIM_RATE_DEFAULT 80.0f
+
+/// Virtual time per loop() call, us; an idle loop() on a Nano takes about this long.
+#define SIM_LOOP_US_DEFAULT 20
+
+/// Transmit buffer of the AVR core's HardwareSerial.
+#define SIM_TX_BUFFER 64
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/**
+ * @brief  Set the conversion rate, loop step and starting clock.
+ * @details Call before cop_sim_begin(). A start time just below 2^32 us
+ *          exercises the micros() wrap within the first minutes.
+ * @param  rate_sps  Conversions per second of every module.
+ * @param  loop_us   Virtual time per loop() call.
+ * @param  start_us  Virtual clock at power-up.
+ */
+void cop_sim_configure(float rate_sps, uint32_t loop_us, uint64_t start_us);
+
+/**
+ * @brief  Run the sketch's setup().
+ */
+void cop_sim_begin();
+
+/**
+ * @brief  Call loop() repeatedly for a span of virtual time.
+ * @param  us  Virtual microseconds to run.
+ */
+void cop_sim_run(uint32_t us);
+
+/**
+ * @brief  Queue bytes for the sketch to read from Serial.
+ */
+void cop_sim_write(const uint8_t* data, size_t len);
+
+/**
+ * @brief  Take bytes the sketch has written to Serial.
+ * @return Number of bytes copied into @p buffer.
+ */
+size_t cop_sim_read(uint8_t* buffer, size_t len);
+
+/**
+ * @brief  Queue the raw counts of the next conversion of each module.
+ * @details Counts are clamped to 24 bits. When the queue is empty every
+ *          conversion repeats the last counts (zero before the first).
+ * @param  counts  Signed counts of modules A-D.
+ */
+void cop_sim_push_counts(const int32_t counts[SIM_MODULES]);
+
+/**
+ * @brief  Conversions queued but not yet made.
+ */
+size_t cop_sim_queued_counts();
+
+/**
+ * @brief  Virtual time since power-up plus the start time, us.
+ */
+uint64_t cop_sim_now_us();
+
+/**
+ * @brief  Conversions made so far.
+ */
+uint32_t cop_sim_conversions();
+
+/**
+ * @brief  Conversions overwritten, on any module, before the firmware
+ *         clocked them out.
+ */
+uint32_t cop_sim_missed();
+
+/**
+ * @brief  The EEPROM image, EEPROM_SIZE bytes; may be read or replaced.
+ */
+uint8_t* cop_sim_eeprom();
+
+/**
+ * @brief  EEPROM bytes changed since power-up.
+ */
+uint32_t cop_sim_eeprom_writes();
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // SIM_H
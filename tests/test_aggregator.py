@@ -0,0 +1,35 @@
+"""Tests of the time alignment of several plates' streams."""
+
+from __future__ import annotations
+
+from cop_client.aggregator import _Track
+from cop_client.text import ReadingsFrame, SyncFrame
+
+PERIOD = 1.0 / 80
+
+
+def reading(seq: int, timestamp_us: int = -1) -> ReadingsFrame:
+    return ReadingsFrame(seq, timestamp_us, (1.0, 1.0, 1.0, 1.0))
+
+
+def test_samples_stay_in_time_order():
+    track = _Track(PERIOD)
+    # Before any sync, samples are placed by arrival
+    track.add([reading(0)], 1.000)
+    track.add([reading(1)], 1.100)
+    # The first sync maps this sample before both of them
+    late = reading(2, 950_000)
+    track.add([SyncFrame(1_000_000, 2, 1), late], 1.0125)
+
+    times = [t for t, _ in track.samples]
+    assert times == sorted(times)
+    assert track.nearest(0.9625) is late
+
+
+def test_nearest_within_one_interval():
+    track = _Track(PERIOD)
+    frames = [reading(n) for n in range(5)]
+    for n, frame in enumerate(frames):
+        track.add([frame], 1.0 + n * PERIOD)
+    assert track.nearest(1.0 + 2.2 * PERIOD) is frames[2]
+    assert track.nearest(1.0 + 10 * PERIOD) is None
@@ -0,0 +1,56 @@
+"""Tests of the NumPy batch decoder against the line-by-line one."""
+
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cop_client.batch import decode_text  # noqa: E402
+from cop_client.protocol import SampleFrame  # noqa: E402
+from cop_client.text import CopFrame, ReadingsFrame, SyncFrame, TextDecoder  # noqa: E402
+
+RECORDING = (
+    b"HX711 Four Scale Controller\r\n"
+    b"System ready.\r\n"
+    b"SYNC,1000,7,1\r\n"
+    b"7,987500,1,10.5,-2.0,3.25,4.0\r\n"
+    b"8,1000000,2,(12.5, -3.5)\r\n"
+    b"9,1012500,0,1.0,2.0,3.0,4.0,10.0,0.125,-0.250\r\n"
+    b"10,1025000,1.0,2.0,3.0,4.0\r\n"
+    b"11,1037500,(0.100, 0.200)\r\n"
+    b"12,1050000,1.0,2.0,3.0,4.0,10.0,0.100,0.200\r\n"
+    b"1.0,2.0,3.0,4.0\r\n"
+    b"(0.100, 0.200)\r\n"
+    b"1.0,2.0,3.0,4.0,10.0,0.100,0.200\r\n"
+    b"CAL,2000.0,2000.0,2000.0,2000.0,0.0,2000.0\r\n"
+    b"13,1062500,0,1.0,2.0"
+)
+
+
+def test_matches_text_decoder():
+    frames = TextDecoder().feed(RECORDING)
+    batch = decode_text(RECORDING)
+
+    readings = [f for f in frames if isinstance(f, ReadingsFrame)]
+    assert batch.readings["seq"].tolist() == [f.seq for f in readings]
+    assert batch.readings["flags"].tolist() == [f.flags for f in readings]
+    assert batch.readings["weights"].tolist() == [list(f.weights) for f in readings]
+
+    cop = [f for f in frames if isinstance(f, CopFrame)]
+    assert batch.cop["timestamp_us"].tolist() == [f.timestamp_us for f in cop]
+    assert batch.cop["flags"].tolist() == [f.flags for f in cop]
+    assert batch.cop["cop_x"].tolist() == [f.cop_x for f in cop]
+    assert batch.cop["cop_y"].tolist() == [f.cop_y for f in cop]
+
+    samples = [f for f in frames if isinstance(f, SampleFrame)]
+    assert batch.samples["seq"].tolist() == [f.seq for f in samples]
+    assert batch.samples["flags"].tolist() == [f.flags for f in samples]
+    assert batch.samples["cop_y"].tolist() == [f.cop_y for f in samples]
+
+    syncs = [f for f in frames if isinstance(f, SyncFrame)]
+    assert batch.syncs.tolist() == [(s.device_us, s.seq, s.decimation) for s in syncs]
+
+
+def test_partial_last_line_is_skipped():
+    assert len(decode_text(b"1,2,0,1.0,2.0,3.0,4.0\r\n3,4,0,1.0").readings) == 1
@@ -0,0 +1,64 @@
+"""Tests of the benchmark runner and the report comparison."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from bench import result
+from bench.compare import compare, main as compare_main
+
+
+def report(**values) -> dict:
+    """A report whose results are ``name=(value, better)``."""
+    return {"quick": False, "commit": None,
+            "results": {name: result(value, "x", better)
+                        for name, (value, better) in values.items()}}
+
+
+def test_regressions_follow_the_better_direction():
+    before = report(rate=(100.0, "higher"), cost=(10.0, "lower"), noise=(50.0, "lower"))
+    after = report(rate=(90.0, "higher"), cost=(8.0, "lower"), noise=(51.0, "lower"))
+    lines, regressions = compare(before, after, threshold=5.0)
+    assert regressions == 1
+    rows = {line.split()[0]: line for line in lines[1:]}
+    assert rows["rate"].endswith("slower") and rows["cost"].endswith("faster")
+    assert rows["noise"].endswith(" x ")
+
+
+def test_results_in_one_report_only_are_listed():
+    before = report(gone=(1.0, "lower"), kept=(1.0, "lower"))
+    after = report(kept=(1.0, "lower"), new=(1.0, "lower"))
+    lines, regressions = compare(before, after, threshold=5.0)
+    assert regressions == 0
+    assert [line.split() for line in lines[-2:]] == [
+        ["gone", "only", "in", "before"], ["new", "only", "in", "after"]]
+
+
+@pytest.mark.parametrize("value, status", [(100.0, 0), (120.0, 1)])
+def test_compare_exit_status(tmp_path, capsys, value, status):
+    paths = []
+    for name, v in (("before", 100.0), ("after", value)):
+        path = tmp_path / (name + ".json")
+        path.write_text(json.dumps(report(cost=(v, "lower"))))
+        paths.append(str(path))
+    assert compare_main(paths + ["--threshold", "10"]) == status
+    assert "cost" in capsys.readouterr().out
+
+
+def test_run_writes_report(tmp_path, capsys):
+    pytest.importorskip("numpy")
+    from bench.run import SCHEMA, main as run_main
+
+    out = tmp_path / "report.json"
+    assert run_main(["decode", "--quick", "--out", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert report["schema"] == SCHEMA and report["quick"] is True
+    assert report["results"]
+    for name, entry in report["results"].items():
+        assert name.startswith("decode.")
+        assert set(entry) == {"value", "unit", "better"}
+        assert entry["value"] > 0 and entry["better"] in ("higher", "lower")
+    # A report compares cleanly against itself
+    assert compare(report, report, 5.0)[1] == 0
@@ -0,0 +1,62 @@
+"""Tests of the multi-placement calibration solver."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from cop_client.calibration import (
+    CORNER_X,
+    CORNER_Y,
+    STANDARD_PLACEMENTS,
+    Placement,
+    solve_crosstalk,
+    solve_per_corner,
+)
+
+#: Counts per unit of scales A-D.
+FACTORS = (2200.0, 2300.0, 2250.0, 2100.0)
+
+#: Known weight, in units.
+WEIGHT = 20.0
+
+
+def counts_at(x: float, y: float, rng: random.Random, noise: float = 30.0):
+    """Net counts of WEIGHT at normalized (x, y), shared bilinearly."""
+    shares = [(1 + x * cx) * (1 + y * cy) / 4 for cx, cy in zip(CORNER_X, CORNER_Y)]
+    return tuple(WEIGHT * s * f + rng.gauss(0, noise) for s, f in zip(shares, FACTORS))
+
+
+def test_standard_placements_recover_factors():
+    rng = random.Random(1)
+    placements = [Placement(counts_at(x, y, rng), WEIGHT, x, y)
+                  for x, y in STANDARD_PLACEMENTS.values()]
+    result = solve_per_corner(placements)
+    assert result.factors == pytest.approx(FACTORS, rel=0.005)
+    assert len(solve_crosstalk(placements)) == 3
+
+
+def test_corners_without_positions_recover_factors():
+    rng = random.Random(2)
+    placements = [Placement(counts_at(STANDARD_PLACEMENTS[k][0], STANDARD_PLACEMENTS[k][1], rng),
+                            WEIGHT) for k in "abcd"]
+    assert solve_per_corner(placements).factors == pytest.approx(FACTORS, rel=0.005)
+
+
+@pytest.mark.parametrize("located", [False, True])
+def test_repeated_placements_are_rejected(located):
+    rng = random.Random(3)
+    placements = [Placement(counts_at(0, 0, rng), WEIGHT, *((0.0, 0.0) if located else ()))
+                  for _ in range(4)]
+    with pytest.raises(ValueError):
+        solve_per_corner(placements)
+
+
+def test_command_has_no_line_ending():
+    rng = random.Random(4)
+    placements = [Placement(counts_at(x, y, rng), WEIGHT, x, y)
+                  for x, y in STANDARD_PLACEMENTS.values()]
+    command = solve_per_corner(placements).command()
+    assert command.startswith("e ") and not command.endswith("\n")
+    assert len(command.split()) == 5
@@ -0,0 +1,132 @@
+"""Tests of the serial clients, against a pseudo-terminal standing in for
+the controller."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import select
+import struct
+from typing import Iterator, Tuple
+
+import pytest
+
+from cop_client.client import AsyncCopClient, CopClient, StreamDecoder
+from cop_client.port import SerialPort
+from cop_client.protocol import (
+    PACKET_STATUS,
+    STATUS_SYNC,
+    SampleFrame,
+    StatusFrame,
+    cobs_encode,
+    crc16,
+    encode_sample,
+)
+from cop_client.text import ReadingsFrame, SyncFrame
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pty")
+
+BOOT = b"HX711 Four Scale Controller\r\nScales tared.\r\nSystem ready.\r\n"
+
+
+def sample(seq: int) -> SampleFrame:
+    return SampleFrame(seq, seq * 12500, 0, (1.0, 2.0, 3.0, 4.0), 0.25, -0.5)
+
+
+def encode_status(frame: StatusFrame) -> bytes:
+    """Encode a status packet of uint32 values, as send_status_packet() does."""
+    payload = struct.pack("<BB%dI" % len(frame.values), PACKET_STATUS, frame.code, *frame.values)
+    return cobs_encode(payload + struct.pack("<H", crc16(payload))) + b"\0"
+
+
+@pytest.fixture
+def pty() -> Iterator[Tuple[int, str]]:
+    """The controller's end of a pty, and the path a client opens."""
+    controller, host = os.openpty()
+    path = os.ttyname(host)
+    try:
+        yield controller, path
+    finally:
+        os.close(controller)
+        os.close(host)
+
+
+def received(fd: int) -> bytes:
+    """Bytes the client wrote, once they have arrived."""
+    select.select([fd], [], [], 1.0)
+    return os.read(fd, 4096)
+
+
+def test_decoder_follows_binary_mode():
+    decoder = StreamDecoder()
+    assert decoder.feed(b"1,12500,0,1.0,2.0,3.0,4.0\r\n") == [
+        ReadingsFrame(1, 12500, (1.0, 2.0, 3.0, 4.0))]
+    decoder.set_binary(True)
+    assert decoder.feed(encode_sample(sample(2))) == [sample(2)]
+
+
+def test_blocking_client(pty):
+    controller, path = pty
+    with CopClient(path) as dev:
+        os.write(controller, BOOT + b"1,12500,1,1.0,2.0,3.0,4.0\r\n")
+        dev.wait_ready(timeout=1.0)
+        # The reading after the ready line is kept for the next read
+        assert dev.read(1.0) == [ReadingsFrame(1, 12500, (1.0, 2.0, 3.0, 4.0), 1)]
+
+        dev.tare()
+        dev.calibrate(25)
+        assert received(controller) == b"z\nk 25\n"
+
+        dev.stream_binary()
+        assert received(controller) == b"b\n"
+        os.write(controller, b"b\r\n" + encode_sample(sample(2)) + encode_sample(sample(3)))
+        frames = []
+        while len(frames) < 2:
+            frames += dev.read(1.0)
+        assert frames == [sample(2), sample(3)]
+
+
+def test_blocking_client_times_out(pty):
+    controller, path = pty
+    with CopClient(path) as dev:
+        os.write(controller, b"HX711 Four Scale Controller\r\n")
+        with pytest.raises(TimeoutError):
+            dev.wait_ready(timeout=0.2)
+
+
+def test_async_client_drops_oldest_when_behind(pty):
+    controller, path = pty
+
+    async def main():
+        dev = AsyncCopClient(SerialPort(path), queue_size=4)
+        try:
+            os.write(controller, b"".join(b"%d,0,0,1.0,2.0,3.0,4.0\r\n" % n for n in range(10)))
+            while dev.dropped + len(dev._queue) < 10:
+                await asyncio.sleep(0.01)
+            frames = await dev.read_batch()
+        finally:
+            dev.close()
+        return dev.dropped, frames
+
+    dropped, frames = asyncio.run(asyncio.wait_for(main(), 5.0))
+    assert dropped == 6
+    assert [f.seq for f in frames] == [6, 7, 8, 9]
+
+
+def test_async_client_waits_for_ready_and_maps_sync(pty):
+    controller, path = pty
+
+    async def main():
+        dev = AsyncCopClient(SerialPort(path))
+        try:
+            os.write(controller, BOOT)
+            await dev.wait_ready(timeout=1.0)
+            dev.stream_binary()
+            sync = StatusFrame(STATUS_SYNC, (1000, 7, 1))
+            os.write(controller, encode_status(sync) + encode_sample(sample(8)))
+            return [await dev.read(), await dev.read()]
+        finally:
+            dev.close()
+
+    assert asyncio.run(main()) == [SyncFrame(1000, 7, 1), sample(8)]
+
@@ -0,0 +1,290 @@
+"""Tests of the controller firmware, run on the host build through
+:class:`cop_client.firmware.Firmware`.
+
+Each test boots its own controller in virtual time, so they need ``make``
+and a C++ compiler but no hardware::
+
+    python -m pytest tests
+"""
+
+from __future__ import annotations
+
+import shutil
+from typing import Iterator, List, Sequence, Tuple
+
+import pytest
+
+from cop_client.client import Frame
+from cop_client.firmware import Firmware
+from cop_client.geometry import Geometry
+from cop_client.protocol import (
+    FLAG_MM,
+    FLAG_TARING,
+    STATUS_BUSY,
+    STATUS_CALIBRATED,
+    STATUS_SYNC,
+    STATUS_TARED,
+    SampleFrame,
+    StatusFrame,
+    decode_packet,
+)
+from cop_client.text import CopFrame, Message, ReadingsFrame, SettingsFrame
+
+pytestmark = pytest.mark.skipif(shutil.which("make") is None, reason="needs make")
+
+#: Raw counts of the empty plate, per module.
+OFFSETS = (84000, -41500, 131000, 17200)
+
+#: Virtual time for ``setup()`` to print the banner and tare.
+BOOT_S = 2.0
+
+
+def loaded(load: Sequence[int]) -> Tuple[int, ...]:
+    """Raw counts with ``load`` counts added to each module."""
+    return tuple(o + n for o, n in zip(OFFSETS, load))
+
+
+def samples(frames: List[Frame]) -> List[SampleFrame]:
+    return [f for f in frames if isinstance(f, SampleFrame)]
+
+
+def messages(frames: List[Frame]) -> List[str]:
+    return [f.text for f in frames if isinstance(f, Message)]
+
+
+@pytest.fixture(params=[False, True], ids=["float", "fixed"])
+def fw(request) -> Iterator[Firmware]:
+    """A booted and tared controller, for each numeric build."""
+    with Firmware(fixed_point=request.param, counts=[OFFSETS] * int(BOOT_S * 80)) as fw:
+        assert messages(fw.run(BOOT_S))[-2:] == ["Scales tared.", "System ready."]
+        yield fw
+
+
+def weights_of(fixed_point: bool, load: Sequence[int], factors=None) -> Tuple[float, ...]:
+    """Weights streamed with 'a' for ``load`` counts on a freshly tared plate."""
+    with Firmware(fixed_point=fixed_point, counts=[OFFSETS] * int(BOOT_S * 80)) as fw:
+        fw.run(BOOT_S)
+        if factors is not None:
+            fw.set_factors(factors)
+        fw.push_counts([loaded(load)])
+        fw.run(0.2)
+        fw.stream_all()
+        return samples(fw.run(0.5))[-1].weights
+
+
+@pytest.mark.parametrize("factors", [None, (1.0, 1.5, 2.0, 250.0), (-420.0, 1000.0, 0.5, 7.25)],
+                         ids=["default", "small", "mixed"])
+def test_fixed_point_matches_float(factors):
+    load = (10000, 3000, 12000, -500)
+    expected = weights_of(False, load, factors)
+    actual = weights_of(True, load, factors)
+    assert actual == pytest.approx(expected, rel=1e-4, abs=1e-3)
+    if factors is None:
+        assert expected == pytest.approx(load)
+
+
+def test_decimation(fw):
+    fw.set_decimation(4)
+    assert "Decimation factor: 4" in messages(fw.run(0.1))
+    fw.stream_all()
+    seqs = [f.seq for f in samples(fw.run(1.0))]
+    assert len(seqs) == pytest.approx(20, abs=1)
+    assert {b - a for a, b in zip(seqs, seqs[1:])} == {4}
+
+
+def test_decimation_is_silent_while_streaming_binary(fw):
+    fw.stream_binary()
+    fw.run(0.2)
+    fw.write(b"d 2\n")
+    raw = fw.run_bytes(0.5)
+    assert b"Decimation" not in raw
+    frames = fw.decoder.feed(raw)
+    assert all(isinstance(f, (SampleFrame, StatusFrame)) for f in frames)
+    seqs = [f.seq for f in samples(frames)]
+    assert seqs[-1] - seqs[-2] == 2
+
+
+def test_filter_rejects_spikes(fw):
+    fw.set_filter(5, 3.0)
+    assert "Filter window: 5, sigma: 3.0" in messages(fw.run(0.1))
+    load = (1000, 1000, 1000, 1000)
+    fw.push_counts([loaded(load)] * 40 + [loaded((50000, 1000, 1000, 1000))]
+                   + [loaded(load)] * 40)
+    fw.stream_readings()
+    weights = [f.weights for f in fw.run(1.0) if isinstance(f, ReadingsFrame)]
+    assert max(w[0] for w in weights) == pytest.approx(1000, abs=1)
+
+
+def test_filter_is_silent_while_streaming_binary(fw):
+    fw.stream_binary()
+    fw.run(0.2)
+    fw.write(b"f 3 2.5\n")
+    raw = fw.run_bytes(0.5)
+    assert b"Filter" not in raw
+    assert all(isinstance(f, (SampleFrame, StatusFrame)) for f in fw.decoder.feed(raw))
+    fw.stop()
+    fw.report_settings()
+    settings = [f for f in fw.run(0.1) if isinstance(f, SettingsFrame)][-1]
+    assert (settings.filter_window, settings.filter_sigma) == (3, 2.5)
+
+
+def test_job_refused_while_another_runs(fw):
+    fw.tare()
+    fw.calibrate(10)
+    text = messages(fw.run(0.5))
+    assert text.count("Scales tared.") == 1
+    assert any(t.startswith("Busy") for t in text)
+    assert not any(t.startswith("Calibrating") for t in text)
+
+
+def test_job_refused_while_streaming_binary(fw):
+    fw.stream_binary()
+    fw.run(0.1)
+    fw.tare()
+    fw.capture_placement()
+    codes = [(f.code, f.values) for f in fw.run(0.5) if isinstance(f, StatusFrame)]
+    assert (STATUS_BUSY, (1,)) in codes
+    assert [c for c, _ in codes].count(STATUS_TARED) == 1
+
+
+def test_tare(fw):
+    load = (1000, 2000, 3000, 4000)
+    fw.push_counts([loaded(load)])
+    fw.run(0.2)
+    fw.stream_all()
+    assert samples(fw.run(0.2))[-1].weights == pytest.approx(load)
+    fw.tare()
+    frames = fw.run(0.5)
+    assert "Scales tared." in messages(frames)
+    assert samples(frames)[-1].weights == pytest.approx((0, 0, 0, 0), abs=1e-3)
+
+
+def test_text_streams_flag_tare(fw):
+    fw.stream_readings()
+    fw.run(0.1)
+    fw.tare()
+    frames = [f for f in fw.run(0.5) if isinstance(f, ReadingsFrame)]
+    assert any(f.taring for f in frames)
+    assert not frames[-1].taring
+
+
+def test_text_streams_flag_mm(fw):
+    fw.set_cop_units(True)
+    fw.stream_cop()
+    frames = [f for f in fw.run(0.2) if isinstance(f, CopFrame)]
+    assert frames and all(f.flags == FLAG_MM and f.cop_in_mm for f in frames)
+
+
+def test_tare_while_streaming_binary(fw):
+    fw.push_counts([loaded((500, 500, 500, 500))])
+    fw.stream_binary()
+    fw.run(0.2)
+    fw.tare()
+    frames = fw.run(0.5)
+    tared = [f for f in frames if isinstance(f, StatusFrame) and f.code == STATUS_TARED]
+    assert [t.values for t in tared] == [tuple(o + 500 for o in OFFSETS)]
+    assert any(f.flags & FLAG_TARING for f in samples(frames))
+    assert not samples(frames)[-1].flags & FLAG_TARING
+    assert samples(frames)[-1].weights == pytest.approx((0, 0, 0, 0), abs=1e-3)
+
+
+def test_calibration(fw):
+    # 10 units in the centre, 2.5 per scale at 2000 counts per unit
+    fw.push_counts([loaded((5000, 5000, 5000, 5000))])
+    fw.run(0.2)
+    fw.calibrate(10)
+    text = messages(fw.run(0.5))
+    assert "Calibrating all..." in text
+    fw.report_settings()
+    settings = [f for f in fw.run(0.1) if isinstance(f, SettingsFrame)][-1]
+    assert settings.factors == pytest.approx((2000, 2000, 2000, 2000))
+    fw.stream_all()
+    assert sum(samples(fw.run(0.2))[-1].weights) == pytest.approx(10, abs=1e-3)
+
+
+def test_calibration_while_streaming_binary(fw):
+    fw.push_counts([loaded((5000, 4000, 6000, 5000))])
+    fw.stream_binary()
+    fw.run(0.2)
+    fw.calibrate(10)
+    reports = [f.values for f in fw.run(0.5)
+               if isinstance(f, StatusFrame) and f.code == STATUS_CALIBRATED]
+    assert len(reports) == 1
+    factors, spread, avg = reports[0][:4], reports[0][4], reports[0][5]
+    assert factors == pytest.approx((2000, 1600, 2400, 2000))
+    assert (spread, avg) == pytest.approx((800, 2000))
+
+
+#: A rectangle, and a trapezoid whose CoP only cop_mm() can convert.
+LAYOUTS = [
+    Geometry.rectangle(420, 380),
+    Geometry((-150.0, 210.0, 190.0, -230.0), (180.0, 180.0, -200.0, -160.0)),
+]
+
+
+@pytest.mark.parametrize("geometry", LAYOUTS, ids=["rectangle", "trapezoid"])
+@pytest.mark.parametrize("load", [(1000, 2000, 3000, 4000), (9000, 500, 200, 300)])
+def test_cop_in_mm_matches_geometry(fw, geometry, load):
+    fw.set_geometry(geometry)
+    fw.set_cop_units(True)
+    replies = [f for f in fw.run(0.1) if isinstance(f, Geometry)]
+    assert replies[-1].cop_in_mm
+    assert replies[-1].corner_x == pytest.approx(geometry.corner_x)
+    assert replies[-1].corner_y == pytest.approx(geometry.corner_y)
+
+    fw.push_counts([loaded(load)])
+    fw.run(0.2)
+    expected = geometry.cop_mm(load)
+    fw.stream_all()
+    text = samples(fw.run(0.2))[-1]
+    assert text.cop_in_mm
+    assert (text.cop_x, text.cop_y) == pytest.approx(expected, abs=0.06)
+    fw.stream_binary()
+    packet = samples(fw.run(0.2))[-1]
+    assert packet.cop_in_mm
+    assert (packet.cop_x, packet.cop_y) == pytest.approx(expected, abs=0.06)
+
+
+def test_normalized_cop_maps_to_mm_on_a_rectangle(fw):
+    geometry = LAYOUTS[0]
+    fw.set_geometry(geometry)
+    fw.push_counts([loaded((1000, 2000, 3000, 4000))])
+    fw.run(0.2)
+    fw.stream_all()
+    frame = samples(fw.run(0.2))[-1]
+    assert not frame.cop_in_mm
+    assert geometry.from_normalized(frame.cop_x, frame.cop_y) == pytest.approx(
+        geometry.cop_mm(frame.weights), abs=0.5)
+
+
+def test_settings_survive_a_reboot(fw):
+    fw.set_factors([1500, 1600, 1700, 1800])
+    fw.set_decimation(2)
+    fw.run(3.0)     # settings are committed once the controller is idle
+    with Firmware(eeprom=fw.eeprom, counts=[OFFSETS] * int(BOOT_S * 80)) as rebooted:
+        rebooted.run(BOOT_S)
+        rebooted.report_settings()
+        settings = [f for f in rebooted.run(0.1) if isinstance(f, SettingsFrame)][-1]
+    assert settings.factors == pytest.approx((1500, 1600, 1700, 1800))
+    assert settings.decimation == 2
+
+
+def test_binary_framing(fw):
+    load = (1000, -250, 3000, 4000)
+    fw.push_counts([loaded(load)])
+    fw.run(0.2)
+    fw.stream_binary()
+    raw = fw.run_bytes(1.0)
+    blocks = raw.split(b"\0")
+    # Every block between delimiters is a whole packet with a valid CRC;
+    # the last one is still being sent
+    frames = [decode_packet(b) for b in blocks[:-1] if b]
+    assert frames and None not in frames
+    sample_frames = [f for f in frames if isinstance(f, SampleFrame)]
+    assert len(sample_frames) == pytest.approx(80, abs=1)
+    seqs = [f.seq for f in sample_frames]
+    assert all(b - a == 1 for a, b in zip(seqs, seqs[1:]))
+    stamps = [f.timestamp_us for f in sample_frames]
+    assert all(b - a == pytest.approx(12500, abs=100) for a, b in zip(stamps, stamps[1:]))
+    assert sample_frames[-1].weights == pytest.approx(load)
+    assert any(isinstance(f, StatusFrame) and f.code == STATUS_SYNC for f in frames)
@@ -0,0 +1,53 @@
+"""Tests of the fixed-point weight conversion and its host model."""
+
+from __future__ import annotations
+
+import random
+import shutil
+
+import pytest
+
+from cop_client.fixed_point import (
+    Q16_COUNTS_MAX,
+    load_firmware_weight,
+    model_weight,
+    q16_gain,
+    q16_scale,
+)
+
+
+def exact(counts: int, gain: int, shift: int) -> int:
+    """floor(counts * gain / 2**shift), saturated to int32."""
+    counts = max(-Q16_COUNTS_MAX, min(Q16_COUNTS_MAX, counts))
+    value = (counts * gain) >> shift if shift >= 0 else (counts * gain) << -shift
+    return max(-(1 << 31), min((1 << 31) - 1, value))
+
+
+def factors_and_counts(count: int = 20000):
+    rng = random.Random(0)
+    for n in range(count):
+        scale = 10 ** rng.uniform(-3, 9) * rng.choice((1, -1))
+        if n % 2:
+            yield scale, rng.randint(-Q16_COUNTS_MAX, Q16_COUNTS_MAX)
+        else:
+            yield scale, rng.randint(-5000, 5000)
+
+
+@pytest.mark.parametrize("scale", [1.0, -1.0, 2000.0, 0.02, 1e6])
+def test_gain_has_16_significant_bits(scale):
+    gain, _ = q16_gain(scale)
+    assert 1 << 15 <= abs(gain) < 1 << 16
+    assert (gain < 0) == (scale < 0)
+
+
+def test_scale_is_exact_floor():
+    for scale, counts in factors_and_counts():
+        gain, shift = q16_gain(scale)
+        assert q16_scale(counts, gain, shift) == exact(counts, gain, shift), (counts, scale)
+
+
+@pytest.mark.skipif(shutil.which("c++") is None, reason="needs a C++ compiler")
+def test_model_matches_firmware():
+    firmware = load_firmware_weight()
+    for scale, counts in factors_and_counts():
+        assert firmware(counts, scale) == model_weight(counts, scale), (counts, scale)
@@ -0,0 +1,39 @@
+"""Tests of the running sway metrics."""
+
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from cop_client.metrics import SwayMetrics
+from cop_client.protocol import FLAG_MM, SampleFrame
+from cop_client.text import CopFrame
+
+PERIOD_US = 12500
+
+
+def circle(count: int, radius: float):
+    """CoP samples on a circle, one per sample period."""
+    for n in range(count):
+        angle = 2 * math.pi * n / count
+        yield n * PERIOD_US, radius * math.cos(angle), radius * math.sin(angle)
+
+
+def test_mm_frames_are_not_scaled_again():
+    normalized = SwayMetrics(window_s=None, width_mm=400, depth_mm=400)
+    mm = SwayMetrics(window_s=None, width_mm=400, depth_mm=400)
+    for n, (t, x, y) in enumerate(circle(80, 0.1)):
+        normalized.add_frame(CopFrame(n, t, x, y))
+        mm.add_frame(SampleFrame(n, t, FLAG_MM, (1.0, 1.0, 1.0, 1.0), x * 200, y * 200))
+    assert mm.stats().path_length == pytest.approx(normalized.stats().path_length)
+    assert mm.stats().range_x == pytest.approx(40.0, rel=1e-3)
+
+
+def test_window_drops_old_samples():
+    sway = SwayMetrics(window_s=1.0)
+    for t, x, y in circle(800, 0.1):
+        sway.add(t, x + (0.5 if t < 5_000_000 else 0.0), y)
+    stats = sway.stats()
+    assert stats.duration_s <= 1.0
+    assert stats.range_x < 0.25
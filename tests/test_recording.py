@@ -0,0 +1,97 @@
+"""Tests of the chunked recording format."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cop_client.protocol import SampleFrame  # noqa: E402
+from cop_client.recording import Recording, RecordingWriter  # noqa: E402
+from cop_client.text import CopFrame, ReadingsFrame, SettingsFrame  # noqa: E402
+
+PERIOD_US = 12500
+CHUNK = 64
+SETTINGS = SettingsFrame((2000.0, 2100.0, 2200.0, 2300.0), (1, -2, 3, -4), 5, 3.0, 1)
+
+
+def frames(count: int, first_seq: int = 65500, first_us: int = (1 << 32) - 500_000):
+    """Samples whose seq and micros() both wrap partway through."""
+    for n in range(count):
+        yield SampleFrame((first_seq + n) & 0xFFFF, (first_us + n * PERIOD_US) & 0xFFFFFFFF,
+                          0, (n, 1.0, 2.0, 3.0), 0.001 * n, -0.001 * n)
+
+
+def write(path, count: int) -> None:
+    with RecordingWriter(str(path), SETTINGS, chunk_rows=CHUNK) as writer:
+        for frame in frames(count):
+            writer.append(frame)
+
+
+def test_round_trip_unwraps_counters(tmp_path):
+    path = tmp_path / "session.cop"
+    write(path, 200)
+    with Recording(str(path), verify=True) as rec:
+        assert len(rec) == 200
+        assert rec.chunk_count == 4
+        assert rec.settings == SETTINGS
+        rows = rec.rows(0, 200)
+        assert np.all(np.diff(rows["seq"]) == 1)
+        assert np.all(np.diff(rows["timestamp_us"]) == PERIOD_US)
+        assert rows["wa"].tolist() == list(range(200))
+
+
+def test_time_slice_spans_chunks(tmp_path):
+    path = tmp_path / "session.cop"
+    write(path, 200)
+    with Recording(str(path)) as rec:
+        start = rec.start_us + 50 * PERIOD_US
+        part = rec.time_slice(start, start + 100 * PERIOD_US)
+        assert part["wa"].tolist() == list(range(50, 150))
+        assert len(rec.time_slice(rec.end_us + 1, rec.end_us + 10**6)["seq"]) == 0
+
+
+def test_other_frame_types_leave_nan(tmp_path):
+    path = tmp_path / "session.cop"
+    with RecordingWriter(str(path), chunk_rows=CHUNK) as writer:
+        writer.append(ReadingsFrame(1, 100, (1.0, 2.0, 3.0, 4.0)))
+        writer.append(CopFrame(2, 200, 0.5, -0.5))
+    with Recording(str(path)) as rec:
+        rows = rec.rows(0, 2)
+        assert np.isnan(rows["cop_x"][0]) and rows["wa"][0] == 1.0
+        assert np.isnan(rows["wa"][1]) and rows["cop_x"][1] == 0.5
+
+
+def test_append_array_matches_append(tmp_path):
+    one, many = tmp_path / "one.cop", tmp_path / "many.cop"
+    write(one, 150)
+    samples = np.zeros(150, dtype=[("seq", "i8"), ("timestamp_us", "i8"),
+                                   ("weights", "f8", (4,)), ("cop_x", "f8"), ("cop_y", "f8")])
+    for i, frame in enumerate(frames(150)):
+        samples[i] = (frame.seq, frame.timestamp_us, frame.weights, frame.cop_x, frame.cop_y)
+    with RecordingWriter(str(many), SETTINGS, chunk_rows=CHUNK) as writer:
+        writer.append_array(samples)
+    with Recording(str(one)) as a, Recording(str(many)) as b:
+        for name, column in a.rows(0, 150).items():
+            assert np.array_equal(column, b.rows(0, 150)[name]), name
+
+
+def test_torn_last_chunk_is_ignored(tmp_path):
+    path = tmp_path / "session.cop"
+    write(path, 3 * CHUNK)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        # Corrupt one byte of the last chunk's data
+        f.seek(size - 8)
+        byte = f.read(1)
+        f.seek(size - 8)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    with Recording(str(path)) as rec:
+        assert len(rec) == 2 * CHUNK
+
+    with open(path, "r+b") as f:
+        f.truncate(size - 100)
+    with Recording(str(path)) as rec:
+        assert len(rec) == 2 * CHUNK
@@ -0,0 +1,122 @@
+"""Tests of the fan-out server, fed by a pseudo-terminal standing in for the
+controller."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import struct
+
+import pytest
+
+from cop_client.client import AsyncCopClient
+from cop_client.port import SerialPort
+from cop_client.server import FanoutServer, Subscriber, Tier
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pty")
+
+
+def line(seq: int, flags: int = 0) -> bytes:
+    """An ``a`` line whose weights and CoP follow ``seq``."""
+    return b"%d,%d,%d,%d.0,1.0,1.0,1.0,%d.0,0.%03d,-0.500\r\n" % (
+        seq, seq * 12500, flags, seq, seq + 3, seq)
+
+
+def queued(sub: Subscriber):
+    return [json.loads(data) for data in sub._queue]
+
+
+def test_tier_averages_every_divisor_samples():
+    tier = Tier(4)
+    sub = Subscriber(None, ("seq", "flags", "wa", "cop_y"), websocket=False)
+    tier.subscribers.add(sub)
+    for seq in range(8):
+        tier.add({"seq": seq, "flags": 1 if seq == 5 else 0, "wa": float(seq), "cop_y": -0.5})
+    assert queued(sub) == [
+        {"seq": 2, "flags": 0, "wa": 1.5, "cop_y": -0.5},
+        {"seq": 6, "flags": 1, "wa": 5.5, "cop_y": -0.5},
+    ]
+
+
+def test_slow_subscriber_drops_oldest():
+    sub = Subscriber(None, ("seq",), websocket=False, queue_size=3)
+    for seq in range(5):
+        sub.push(sub.encode({"seq": seq}))
+    assert sub.dropped == 2
+    assert queued(sub) == [{"seq": 2}, {"seq": 3}, {"seq": 4}]
+
+
+async def http_get(port: int, target: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n" % target.encode())
+    data = await reader.read()
+    writer.close()
+    return data.partition(b"\r\n\r\n")[2]
+
+
+async def websocket_messages(reader: asyncio.StreamReader, count: int):
+    messages = []
+    while len(messages) < count:
+        b0, b1 = await reader.readexactly(2)
+        n = b1 & 0x7F
+        if n == 126:
+            (n,) = struct.unpack("!H", await reader.readexactly(2))
+        payload = await reader.readexactly(n)
+        assert b0 == 0x81
+        messages.append(json.loads(payload))
+    return messages
+
+
+def test_fanout_to_websocket_and_http():
+    controller, host = os.openpty()
+
+    async def main():
+        client = AsyncCopClient(SerialPort(os.ttyname(host)))
+        server = FanoutServer(client)
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            ws_reader, ws_writer = await asyncio.open_connection("127.0.0.1", port)
+            key = base64.b64encode(os.urandom(16))
+            ws_writer.write(b"GET /ws?fields=seq,wa HTTP/1.1\r\nHost: localhost\r\n"
+                            b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                            b"Sec-WebSocket-Key: " + key + b"\r\nSec-WebSocket-Version: 13\r\n\r\n")
+            head = await ws_reader.readuntil(b"\r\n\r\n")
+            assert head.startswith(b"HTTP/1.1 101")
+
+            http_reader, http_writer = await asyncio.open_connection("127.0.0.1", port)
+            http_writer.write(b"GET /stream?rate=20&fields=seq,flags,cop_x HTTP/1.1\r\n"
+                              b"Host: localhost\r\n\r\n")
+            await http_reader.readuntil(b"\r\n\r\n")
+            while len(server.tiers) < 2:
+                await asyncio.sleep(0.01)
+
+            os.write(controller, b"".join(line(seq, 1 if seq == 6 else 0) for seq in range(8)))
+            ws = await asyncio.wait_for(websocket_messages(ws_reader, 8), 5.0)
+            http = [json.loads(await asyncio.wait_for(http_reader.readline(), 5.0))
+                    for _ in range(2)]
+            status = json.loads(await http_get(port, "/"))
+            latest = json.loads(await http_get(port, "/latest"))
+            ws_writer.close()
+            http_writer.close()
+            return ws, http, status, latest
+        finally:
+            server.close()
+            listener.close()
+            client.close()
+
+    try:
+        ws, http, status, latest = asyncio.run(asyncio.wait_for(main(), 10.0))
+    finally:
+        os.close(controller)
+        os.close(host)
+
+    assert ws == [{"seq": seq, "wa": float(seq)} for seq in range(8)]
+    # 20 of 80 samples/s: every 4 averaged, flags of any of them kept
+    assert http == [{"seq": 2, "flags": 0, "cop_x": pytest.approx(0.0015)},
+                    {"seq": 6, "flags": 1, "cop_x": pytest.approx(0.0055)}]
+    assert status["tiers"] == {"1": 1, "4": 1}
+    assert status["samples"] == 8 and status["dropped"] == 0
+    assert latest["seq"] == 7 and latest["total"] == 10.0
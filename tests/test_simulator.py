@@ -0,0 +1,87 @@
+"""Tests of the pty virtual devices, serviced step by step without the
+wall-clock pacing loop."""
+
+from __future__ import annotations
+
+import shutil
+from typing import Iterator
+
+import pytest
+
+from cop_client.client import StreamDecoder
+from cop_client.port import SerialPort
+from cop_client.simulator import PENDING_MAX, VirtualDevice, synthetic_weights
+from cop_client.text import Message, SettingsFrame
+
+pytestmark = pytest.mark.skipif(shutil.which("make") is None, reason="needs make")
+
+STEP_S = 0.05
+
+
+@pytest.fixture
+def device() -> Iterator[VirtualDevice]:
+    with VirtualDevice(synthetic_weights(seed=1)) as dev:
+        yield dev
+
+
+def run(device: VirtualDevice, seconds: float, port: SerialPort = None) -> bytes:
+    """Service the device for ``seconds``, reading its output if ``port`` is given."""
+    out = b""
+    for _ in range(int(round(seconds / STEP_S))):
+        device.service(STEP_S)
+        if port is not None:
+            out += port.read_nowait()
+    return out
+
+
+def texts(data: bytes):
+    return [f.text for f in StreamDecoder().feed(data) if isinstance(f, Message)]
+
+
+def test_opening_the_port_reboots(device):
+    run(device, 0.5)
+    assert device.resets == 0 and not device.connected
+
+    with SerialPort(device.path) as port:
+        boot = run(device, 2.0, port)
+        assert device.connected and device.resets == 1
+        assert texts(boot)[0] == "HX711 Four Scale Controller"
+        assert texts(boot)[-1] == "System ready."
+
+        # Settings are written to EEPROM a moment after the last change
+        port.write(b"d 4\n")
+        run(device, 3.0, port)
+
+    run(device, 0.2)
+    assert not device.connected
+
+    with SerialPort(device.path) as port:
+        run(device, 2.0, port)
+        assert device.resets == 2
+        port.write(b"i\n")
+        frames = StreamDecoder().feed(run(device, 0.2, port))
+        settings = [f for f in frames if isinstance(f, SettingsFrame)]
+        assert settings[-1].decimation == 4
+
+
+def test_output_is_dropped_when_the_host_stops_reading(device):
+    with SerialPort(device.path) as port:
+        received = len(run(device, 2.0, port))
+        port.write(b"a\n")
+        received += len(run(device, 1.0, port))
+        sent = device.bytes_sent
+        assert received == sent and device.bytes_dropped == 0
+
+        # Stop reading: the pty fills up, then the pending buffer
+        run(device, 30.0)
+        assert device.pending == PENDING_MAX
+        assert device.bytes_dropped > 0
+
+        # What the host reads now is exactly what was sent meanwhile
+        backlog = b""
+        while True:
+            chunk = port.read(0.1)
+            if not chunk:
+                break
+            backlog += chunk
+        assert len(backlog) == device.bytes_sent - sent